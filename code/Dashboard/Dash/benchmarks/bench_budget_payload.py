@@ -0,0 +1,112 @@
+"""
+Payload-size regression check for the renter budget box plot.
+
+Builds the budget figure the way update_dashboard used to (px.box over every
+renter budget <= 4000) and the way it does now (precomputed box statistics),
+for a few year/province selections, and compares their JSON sizes. Exits
+non-zero if the compact figure is larger than MAX_COMPACT_BYTES, or if its
+box differs from the one Plotly draws for the legacy figure: its quartiles,
+fences and outliers are recomputed from the legacy trace's data the way
+plotly.js does it for the trace's quartilemethod (the default, 'linear').
+
+Run from anywhere:
+    python bench_budget_payload.py [--repeat 1]
+"""
+import argparse
+import os
+import sys
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CODE_DIR = os.path.join(HERE, '..', 'code')
+sys.path.insert(0, CODE_DIR)
+
+from callbacks import budget_box_figure  # noqa: E402
+from data_loader import load_data  # noqa: E402
+from renter_analytics import BUDGET_PLOT_MAX, RenterAnalytics  # noqa: E402
+
+# The compact figure must stay well under this, whatever the number of renters
+MAX_COMPACT_BYTES = 16 * 1024
+SELECTIONS = [(None, None), (2023, None), (None, 'BC'), (2024, 'ON')]
+
+
+def legacy_budget_figure(df, selected_year, selected_province):
+    """The budget figure as the original update_dashboard built it."""
+    dff = df.copy()
+    dff['Registered Year'] = pd.to_datetime(dff['Registered At'], errors='coerce').dt.year
+    if selected_year is not None and selected_year != 'All':
+        dff = dff[dff['Registered Year'] == selected_year]
+    if selected_province is not None and selected_province != 'All':
+        dff = dff[dff['province_id_upper'] == selected_province]
+    return px.box(dff[dff['Budget'] <= BUDGET_PLOT_MAX], y='Budget', title='Budget Distribution'), dff
+
+
+def _plotly_interp(sorted_values, p):
+    """plotly.js Lib.interp: the value at position p * n - 0.5 of the sorted sample, interpolated."""
+    n = p * len(sorted_values) - 0.5
+    if n < 0:
+        return sorted_values[0]
+    if n > len(sorted_values) - 1:
+        return sorted_values[-1]
+    frac = n % 1
+    return frac * sorted_values[int(np.ceil(n))] + (1 - frac) * sorted_values[int(np.floor(n))]
+
+
+def plotly_box(trace):
+    """
+    The box plotly.js draws for a trace of raw values, as box_stats() keys.
+
+    Only the default quartilemethod ('linear') is implemented, since that is
+    what px.box leaves the legacy trace with.
+    """
+    method = trace.quartilemethod or 'linear'
+    if method != 'linear':
+        raise ValueError(f"quartilemethod {method!r} is not implemented")
+    values = sorted(float(v) for v in trace.y if v is not None and not np.isnan(v))
+    q1, median, q3 = (_plotly_interp(values, p) for p in (0.25, 0.5, 0.75))
+    # Fences: the most extreme values within 1.5 IQR of the box, never inside the box
+    lowerfence = min(q1, next((v for v in values if v >= 2.5 * q1 - 1.5 * q3), q1))
+    upperfence = max(q3, next((v for v in reversed(values) if v <= 2.5 * q3 - 1.5 * q1), q3))
+    outliers = sorted({v for v in values if v < lowerfence or v > upperfence})
+    return {'q1': q1, 'median': median, 'q3': q3, 'lowerfence': lowerfence, 'upperfence': upperfence,
+            'outliers': outliers}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=1, help='tile the renters table this many times')
+    args = parser.parse_args()
+
+    os.chdir(CODE_DIR)
+    df = load_data()[2]
+    df = pd.concat([df] * args.repeat, ignore_index=True)
+    analytics = RenterAnalytics(df)
+
+    failed = False
+    for selected_year, selected_province in SELECTIONS:
+        legacy_fig, dff = legacy_budget_figure(df, selected_year, selected_province)
+        stats = analytics.summary(selected_year, selected_province).budget_box
+        compact_fig = budget_box_figure(stats)
+        legacy_size = len(legacy_fig.to_json())
+        compact_size = len(compact_fig.to_json())
+
+        budgets = dff.loc[dff['Budget'] <= BUDGET_PLOT_MAX, 'Budget'].to_numpy()
+        expected = plotly_box(legacy_fig.data[0])
+        keys = ['q1', 'median', 'q3', 'lowerfence', 'upperfence']
+        box_ok = (np.allclose([expected[k] for k in keys], [stats[k] for k in keys])
+                  and np.array_equal(expected['outliers'], stats['outliers']))
+        size_ok = compact_size <= MAX_COMPACT_BYTES
+        failed |= not (box_ok and size_ok)
+
+        label = f'year={selected_year} province={selected_province}'
+        print(f'{label:>28}: {len(budgets):>7,} budgets  legacy {legacy_size:>9,} B  '
+              f'compact {compact_size:>7,} B  ({legacy_size / compact_size:.0f}x)'
+              f'{"" if box_ok else "  BOX DIFFERS"}{"" if size_ok else "  TOO LARGE"}')
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Compares the bulk list-column parser with the original per-row ast.literal_eval
+version of convert_string_list_columns.
+
+Run from anywhere:
+    python bench_list_parser.py [--repeat 10]
+"""
+import argparse
+import ast
+import os
+import sys
+import time
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, '..', 'code'))
+
+from data_loader import DATA_FILES, LIST_COLUMNS, convert_string_list_columns  # noqa: E402
+from list_parser import parse_list_column  # noqa: E402
+
+# Malformed or unusual values that must keep the original fallback semantics
+EDGE_CASES = [
+    "['a', 'b']", '["Owner\'s pet", \'Desk\']', "[]", "", "'Desk, Lamp'", "Desk, Lamp",
+    "['unterminated", "('a', 'b')", "[1, 2]", "['a\\'b']", " ['lead']", "['a' 'b']",
+    "['x',\n 'y']", None, float('nan'), ['already', 'a', 'list'],
+]
+
+
+def legacy_convert_string_list_columns(df, columns_to_convert):
+    """The original implementation, kept verbatim for comparison."""
+    for col in columns_to_convert:
+        if col in df.columns:
+            def safe_eval(string_list):
+                if isinstance(string_list, str):
+                    try:
+                        return ast.literal_eval(string_list)
+                    except (ValueError, SyntaxError):
+                        cleaned_string = string_list.strip("'")
+                        items = [item.strip().strip("'") for item in cleaned_string.split(', ')]
+                        return items
+                elif isinstance(string_list, list):
+                    return string_list
+                return None
+
+            df[col] = df[col].apply(safe_eval)
+    return df
+
+
+def best_of(fn, runs):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=10, help='tile the properties table this many times')
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    edge = pd.Series(EDGE_CASES, dtype=object)
+    expected = legacy_convert_string_list_columns(pd.DataFrame({'c': edge}), ['c'])['c'].tolist()
+    actual = parse_list_column(edge).to_lists()
+    for raw, want, got in zip(EDGE_CASES, expected, actual):
+        assert want == got and type(want) is type(got), f'{raw!r}: expected {want!r}, got {got!r}'
+
+    properties = pd.read_csv(os.path.join(HERE, '..', 'code', DATA_FILES['properties']))
+    properties = pd.concat([properties] * args.repeat, ignore_index=True)
+    raw = properties[LIST_COLUMNS]
+
+    legacy = legacy_convert_string_list_columns(raw.copy(), LIST_COLUMNS)
+    bulk = convert_string_list_columns(raw.copy(), LIST_COLUMNS)
+    pd.testing.assert_frame_equal(legacy, bulk)
+
+    t_legacy = best_of(lambda: legacy_convert_string_list_columns(raw.copy(), LIST_COLUMNS), args.runs)
+    t_lists = best_of(lambda: convert_string_list_columns(raw.copy(), LIST_COLUMNS), args.runs)
+    t_compact = best_of(lambda: [parse_list_column(raw[c]) for c in LIST_COLUMNS], args.runs)
+    n_items = sum(len(parse_list_column(raw[c]).codes) for c in LIST_COLUMNS)
+
+    print(f'rows: {len(raw):,}  items: {n_items:,}')
+    print(f'legacy literal_eval:          {t_legacy * 1000:8.1f} ms')
+    print(f'bulk parser -> Python lists:  {t_lists * 1000:8.1f} ms  ({t_legacy / t_lists:.1f}x)')
+    print(f'bulk parser -> ListColumn:    {t_compact * 1000:8.1f} ms  ({t_legacy / t_compact:.1f}x)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,353 @@
+"""
+Times load_data, convert_string_list_columns, the DataStore indexes and every
+callback on synthetic data (synthetic_data.py) at several scales, and writes
+the results as JSON so runs can be compared.
+
+Each scale runs in its own process with DASHBOARD_DATA_DIR pointing at its
+data, so module-level state and peak memory are per scale. Callbacks are
+called through Dash's /_dash-update-component route with representative
+filter selections taken from the data; the first call of each selection is
+reported separately because it fills the render and summary caches.
+
+Run from anywhere:
+    python bench_scaling.py [--scales 1 10 100] [--runs 5] [--out results/scaling.json]
+    python bench_scaling.py --compare results/baseline.json [--fail-on-regression]
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from importlib import metadata
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CODE_DIR = os.path.join(HERE, '..', 'code')
+sys.path.insert(0, CODE_DIR)
+
+RESULTS_FORMAT = 1
+PACKAGES = ['pandas', 'numpy', 'pyarrow', 'dash', 'plotly', 'wordcloud']
+# Environment of the timed process: no metrics wrapper, no disk caches, no rent model
+WORKER_ENV = {'CALLBACK_METRICS': '0'}
+WORKER_ENV_REMOVED = ['WORDCLOUD_CACHE_DIR', 'RENT_MODEL_PATH', 'CALLBACK_LOG', 'CALLBACK_PROFILE_MS']
+
+
+def summarize(seconds, first=None):
+    """Median and minimum of the timed runs, in milliseconds."""
+    result = {'ms': round(statistics.median(seconds) * 1000, 3), 'min_ms': round(min(seconds) * 1000, 3)}
+    if first is not None:
+        result['first_ms'] = round(first * 1000, 3)
+    return result
+
+
+def click(x):
+    return {'points': [{'x': x}]}
+
+
+def scenarios(store):
+    """
+    Representative inputs for each callback, by callback name and selection.
+
+    The selections use the most common province, city, year and property
+    type of the data being timed, so they match rows at every scale.
+
+    Returns:
+        dict: {callback name: {selection: {'component-id.property': value}}}.
+    """
+    properties, renters = store.properties, store.df
+    province = properties['Province'].mode()[0]
+    city = properties.loc[properties['Province'] == province, 'City_clean'].mode()[0]
+    years = properties['Year'].dropna().astype(int)
+    year_range = [int(years.min()), int(years.max())]
+    year = int(years.mode()[0])
+    property_type = properties['Property Type'].mode()[0]
+    renter_year = int(renters['Registered At'].dt.year.mode()[0])
+    renter_province = renters['province_id_upper'].mode()[0]
+    kpi = {'default': {'contracts-version.data': store.version}}
+    filters = {
+        'no filter': {},
+        'province': {'province-filter-hierarchical.value': [province]},
+        'province + city': {'province-filter-hierarchical.value': [province],
+                            'city-filter-hierarchical.value': [city]},
+        'province + year + type click': {'province-filter-hierarchical.value': [province],
+                                         'year-filter.value': [year],
+                                         'property-type-bar-chart.clickData': click(property_type)},
+    }
+    return {
+        'poll_data_version': {'new data': {'data-version-poll.n_intervals': 1}},
+        'render_tab_content': {'property': {'main-tabs.value': 'property'},
+                               'renter': {'main-tabs.value': 'renter'}},
+        'update_active_status': kpi,
+        'update_signed_status_monthly': kpi,
+        'update_avg_price': kpi,
+        'update_province_property_count_chart': {
+            'all years': {'year-slider.value': year_range},
+            'latest year': {'year-slider.value': [year_range[1], year_range[1]]},
+        },
+        'update_city_pie_chart': {
+            'no click': {'year-slider.value': year_range},
+            'province click': {'year-slider.value': year_range,
+                               'province-property-count-bar-chart.clickData': click(province)},
+        },
+        'update_city_dropdown': {
+            'one province': {'province-filter-hierarchical.value': [province]},
+            'all provinces': {'province-filter-hierarchical.value': sorted(properties['Province'].dropna().unique())},
+        },
+        'update_price_chart': filters,
+        'update_wordcloud': filters,
+        'update_property_type_chart': {name: inputs for name, inputs in filters.items() if 'click' not in name},
+        'update_dashboard': {
+            'all': {'year-filter.value': 'All', 'province-filter.value': 'All'},
+            'year': {'year-filter.value': renter_year, 'province-filter.value': 'All'},
+            'year + province': {'year-filter.value': renter_year, 'province-filter.value': renter_province},
+        },
+    }
+
+
+def _request(callback_id, spec, values):
+    outputs = callback_id[2:-2].split('...') if callback_id.startswith('..') else [callback_id]
+    outputs = [dict(zip(('id', 'property'), output.rsplit('.', 1))) for output in outputs]
+    inputs, state = (
+        [{'id': i['id'], 'property': i['property'], 'value': values.get(f"{i['id']}.{i['property']}")}
+         for i in spec.get(kind, [])]
+        for kind in ('inputs', 'state')
+    )
+    return {
+        'output': callback_id,
+        'outputs': outputs if callback_id.startswith('..') else outputs[0],
+        'inputs': inputs,
+        'changedPropIds': [f"{i['id']}.{i['property']}" for i in inputs if i['value'] is not None][:1],
+        'state': state,
+    }
+
+
+def time_callbacks(app, store, runs):
+    client = app.server.test_client()
+    selections = scenarios(store)
+    results, uncovered = {}, []
+    for callback_id, spec in app.callback_map.items():
+        func = spec['callback']
+        name = getattr(func, '__wrapped__', func).__name__
+        if name not in selections:
+            uncovered.append(name)
+            continue
+        for selection, values in selections[name].items():
+            body = _request(callback_id, spec, values)
+            seconds, response = [], None
+            for _ in range(runs + 1):
+                start = time.perf_counter()
+                response = client.post('/_dash-update-component', json=body)
+                seconds.append(time.perf_counter() - start)
+            result = summarize(seconds[1:], first=seconds[0])
+            result['bytes'] = len(response.data)
+            if response.status_code not in (200, 204):
+                result['status'] = response.status_code
+            results[f'callback.{name}[{selection}]'] = result
+    return results, uncovered
+
+
+def run_worker(runs, load_runs, out_path):
+    """Times everything for the data in DASHBOARD_DATA_DIR and writes the results to out_path."""
+    os.chdir(CODE_DIR)
+    import pandas as pd
+    import data_store
+    from data_loader import DATA_FILES, LIST_COLUMNS, convert_string_list_columns, load_data
+    from snapshot import sources_digest
+
+    results = {}
+    load_timings = []
+    for _ in range(load_runs):
+        timings, property_lists = {}, {}
+        frames = load_data(timings, property_lists)
+        load_timings.append(timings)
+    for step in load_timings[0]:
+        results[f'load_data.{step}'] = summarize([timings[step] for timings in load_timings])
+
+    raw = pd.read_csv(DATA_FILES['properties'])
+    seconds = []
+    for _ in range(load_runs):
+        copy = raw.copy()
+        start = time.perf_counter()
+        convert_string_list_columns(copy, LIST_COLUMNS)
+        seconds.append(time.perf_counter() - start)
+    results['convert_string_list_columns'] = summarize(seconds)
+
+    # Built from the frames just loaded, so the app does not read a snapshot or the CSVs again
+    timings = {}
+    store = data_store.DataStore(*frames, timings=timings, source_digest=sources_digest(),
+                                 property_lists=property_lists)
+    for step, value in timings.items():
+        results[f'data_store.{step}'] = summarize([value])
+    data_store.swap_store(store)
+
+    import app
+    callback_results, uncovered = time_callbacks(app.app, store, runs)
+    results.update(callback_results)
+
+    output = {
+        'rows': {'properties': len(store.properties), 'contracts': len(store.contracts), 'renters': len(store.df)},
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'uncovered_callbacks': uncovered,
+        'results': results,
+    }
+    with open(out_path, 'w') as f:
+        json.dump(output, f)
+
+
+def environment():
+    def version(package):
+        try:
+            return metadata.version(package)
+        except metadata.PackageNotFoundError:
+            return None
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=HERE, capture_output=True, text=True,
+                                check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'git_commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'packages': {package: version(package) for package in PACKAGES},
+    }
+
+
+def run_scale(scale, args):
+    from synthetic_data import write_dataset
+
+    data_dir = os.path.abspath(os.path.join(args.data_root, f'x{scale:g}-seed{args.seed}'))
+    manifest_path = os.path.join(data_dir, 'synthetic.json')
+    if args.regenerate or not os.path.exists(manifest_path):
+        print(f'x{scale:g}: generating data in {data_dir}')
+        manifest = write_dataset(data_dir, scale, args.seed)
+    else:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+
+    env = {key: value for key, value in os.environ.items() if key not in WORKER_ENV_REMOVED}
+    env.update(WORKER_ENV, DASHBOARD_DATA_DIR=data_dir)
+    with tempfile.NamedTemporaryFile(suffix='.json', delete=False) as f:
+        out_path = f.name
+    try:
+        subprocess.run([sys.executable, os.path.abspath(__file__), '--worker', out_path,
+                        '--runs', str(args.runs), '--load-runs', str(args.load_runs)],
+                       env=env, cwd=CODE_DIR, check=True, stdout=subprocess.DEVNULL)
+        with open(out_path) as f:
+            result = json.load(f)
+    finally:
+        os.remove(out_path)
+    result['scale'] = scale
+    result['generate_seconds'] = manifest['generate_seconds']
+    if result['uncovered_callbacks']:
+        print(f"x{scale:g}: no selections for {', '.join(result['uncovered_callbacks'])}; add them to scenarios()")
+    return result
+
+
+def print_table(scales):
+    names = list(dict.fromkeys(name for scale in scales for name in scale['results']))
+    print(f"{'median ms (first call)':<64}" + ''.join(f"{'x' + format(s['scale'], 'g'):>20}" for s in scales))
+    print(f"{'rows (properties / renters)':<64}" + ''.join(
+        f"{s['rows']['properties'] // 1000:>12}k /{s['rows']['renters'] // 1000:>4}k" for s in scales))
+    for name in names:
+        cells = []
+        for scale in scales:
+            result = scale['results'].get(name)
+            if result is None:
+                cells.append(f"{'-':>20}")
+            elif 'first_ms' in result:
+                cells.append(f"{result['ms']:>9.1f} ({result['first_ms']:>7.1f})")
+            else:
+                cells.append(f"{result['ms']:>9.1f}{'':>10}")
+        print(f'{name[:63]:<64}' + ''.join(cells))
+    print(f"{'peak RSS (MB)':<64}" + ''.join(f"{s['peak_rss_mb']:>9.0f}{'':>11}" for s in scales))
+
+
+def compare(current, baseline, threshold, min_delta_ms):
+    """
+    Prints the timings that changed by more than threshold since baseline.
+
+    Both the median ('ms') and, for callbacks, the first call ('first_ms')
+    are compared. Only results more than min_delta_ms apart count, so
+    sub-millisecond noise is not reported.
+
+    Returns:
+        list: (scale, name, metric, baseline ms, current ms) of the regressions.
+    """
+    if baseline.get('seed') != current.get('seed'):
+        print(f"Warning: baseline used seed {baseline.get('seed')}, this run {current.get('seed')}")
+    previous = {scale['scale']: scale['results'] for scale in baseline['scales']}
+    regressions, improvements = [], []
+    for scale in current['scales']:
+        for name, result in scale['results'].items():
+            before = previous.get(scale['scale'], {}).get(name, {})
+            for metric in ('ms', 'first_ms'):
+                if metric not in result or metric not in before or abs(result[metric] - before[metric]) < min_delta_ms:
+                    continue
+                change = (scale['scale'], name, metric, before[metric], result[metric])
+                ratio = result[metric] / before[metric] if before[metric] else float('inf')
+                if ratio > 1 + threshold:
+                    regressions.append(change)
+                elif ratio < 1 / (1 + threshold):
+                    improvements.append(change)
+    print(f"\ncompared with {baseline.get('created')} ({baseline.get('environment', {}).get('git_commit')}):")
+    for label, changes in (('slower', regressions), ('faster', improvements)):
+        for scale, name, metric, before, after in changes:
+            print(f'  {label} x{scale:g} {name} {metric}: {before:.1f} -> {after:.1f} ({after / before:.2f}x)')
+    if not regressions and not improvements:
+        print(f'  no timing changed by more than {threshold:.0%}')
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=float, nargs='+', default=[1, 10], help='rows per source row')
+    parser.add_argument('--runs', type=int, default=5, help='timed calls per callback selection, after the first')
+    parser.add_argument('--load-runs', type=int, default=3, help='timed load_data calls')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--data-root', default=os.path.join(HERE, '..', 'data', 'synthetic'))
+    parser.add_argument('--regenerate', action='store_true', help='regenerate synthetic data that already exists')
+    parser.add_argument('--out', default=None, help='results file (default: results/scaling-<time>.json)')
+    parser.add_argument('--compare', default=None, help='a previous results file')
+    parser.add_argument('--threshold', type=float, default=0.25, help='relative change reported by --compare')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0, help='smaller changes are never reported')
+    parser.add_argument('--fail-on-regression', action='store_true', help='exit with 1 if --compare finds one')
+    parser.add_argument('--worker', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.runs, args.load_runs, args.worker)
+        return
+
+    created = time.strftime('%Y-%m-%dT%H:%M:%S')
+    output = {
+        'format': RESULTS_FORMAT,
+        'created': created,
+        'seed': args.seed,
+        'runs': args.runs,
+        'load_runs': args.load_runs,
+        'environment': environment(),
+        'scales': [run_scale(scale, args) for scale in args.scales],
+    }
+    out = args.out or os.path.join(HERE, 'results', f"scaling-{created.replace(':', '').replace('-', '')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, 'w') as f:
+        json.dump(output, f, indent=1)
+    print_table(output['scales'])
+    print(f'\nwrote {out}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(output, json.load(f), args.threshold, args.min_delta_ms)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
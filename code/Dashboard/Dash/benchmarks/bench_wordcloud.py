@@ -0,0 +1,98 @@
+"""
+Compares the word cloud's old nested-loop word collection with the
+precomputed property-by-item matrix, for a few representative filters.
+
+Run from anywhere:
+    python bench_wordcloud.py [--repeat 10] [--render]
+"""
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CODE_DIR = os.path.join(HERE, '..', 'code')
+sys.path.insert(0, CODE_DIR)
+
+from data_loader import load_data  # noqa: E402
+from item_matrix import WORDCLOUD_LIST_COLUMNS, build_item_matrix  # noqa: E402
+
+FILTERS = {
+    'no filter': {},
+    'one province': {'provinces': ['BC']},
+    'province + year': {'provinces': ['BC', 'AB'], 'years': [2023, 2024]},
+    'type click': {'property_type': 'House'},
+}
+
+
+def legacy_words(filtered_df):
+    """The word collection loop from the original update_wordcloud."""
+    all_words = []
+    for col in WORDCLOUD_LIST_COLUMNS:
+        for item_list in filtered_df.loc[:, col].dropna():
+            if isinstance(item_list, list):
+                for word in item_list:
+                    all_words.append(str(word).strip())
+    for bed_type in filtered_df['Bed Type'].dropna():
+        all_words.append(str(bed_type).strip())
+    return all_words
+
+
+def filter_mask(properties, provinces=None, years=None, property_type=None):
+    mask = pd.Series(True, index=properties.index)
+    if provinces:
+        mask &= properties['Province'].isin(provinces)
+    if years:
+        mask &= properties['Year'].isin(years)
+    if property_type:
+        mask &= properties['Property Type'] == property_type
+    return mask.to_numpy()
+
+
+def timed(fn, runs=3):
+    best = float('inf')
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=10, help='tile the properties table this many times')
+    parser.add_argument('--render', action='store_true', help='also time WordCloud rendering')
+    args = parser.parse_args()
+
+    os.chdir(CODE_DIR)
+    properties = load_data()[0]
+    # The store builds the matrix from the parsed ListColumns instead of Python lists
+    property_lists = {}
+    compact = build_item_matrix(load_data(property_lists=property_lists)[0], property_lists=property_lists)
+    expected = build_item_matrix(properties)
+    assert all(np.array_equal(getattr(compact, name), getattr(expected, name))
+               for name in ('indptr', 'indices', 'vocab')), 'matrix from ListColumns differs'
+    properties = pd.concat([properties] * args.repeat, ignore_index=True)
+    build_time, matrix = timed(lambda: build_item_matrix(properties), runs=1)
+    print(f'rows: {len(properties):,}  items: {len(matrix.indices):,}  matrix build: {build_time * 1000:.1f} ms')
+
+    for name, filters in FILTERS.items():
+        mask = filter_mask(properties, **filters)
+        t_legacy, words = timed(lambda: legacy_words(properties[mask]))
+        t_matrix, frequencies = timed(lambda: matrix.frequencies(mask))
+        expected = Counter(w for w in words if w)
+        assert frequencies == dict(expected), f'{name}: frequencies differ'
+        print(f'{name:>16}: legacy {t_legacy * 1000:8.2f} ms   matrix {t_matrix * 1000:6.2f} ms')
+
+        if args.render and frequencies:
+            from wordcloud import WordCloud
+            t_text, _ = timed(lambda: WordCloud(width=600, height=300).generate(' '.join(words)), runs=1)
+            t_freq, _ = timed(lambda: WordCloud(width=600, height=300).generate_from_frequencies(frequencies), runs=1)
+            print(f'{"":>16}  render from text {t_text * 1000:8.1f} ms   from frequencies {t_freq * 1000:8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
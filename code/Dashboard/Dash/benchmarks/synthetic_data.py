@@ -0,0 +1,306 @@
+"""
+Generates synthetic copies of the dashboard data at any scale.
+
+Each table is resampled from the shipped snapshot, so the synthetic rows keep
+its schema, file formatting and distributions:
+
+- whole rows are drawn with replacement, which keeps the joint City /
+  Province / postal code / coordinates distributions and every column's
+  share of missing values;
+- all dates of a row move by the same random number of days (row order such
+  as start < end is kept), staying within the source's date range;
+- the amounts of a row are scaled by one random factor and rounded to
+  whole dollars;
+- list-literal columns ("['Desk', 'Lamp']") drop and add items so each
+  item's frequency is unchanged but new combinations appear, as they would
+  with more listings;
+- contracts point at synthetic properties copied from the property they
+  referenced. Every referenced property is copied at least once (when the
+  scale leaves room for them), so contracts link to a property as often as
+  in the source.
+
+city_df.csv is a lookup table and is copied unchanged. The dashboard serves
+the result with DASHBOARD_DATA_DIR=<out>.
+
+Run from anywhere:
+    python synthetic_data.py --scale 10 --out ../data/synthetic/x10 [--seed 0]
+"""
+import argparse
+import ast
+import csv
+import json
+import os
+import shutil
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CODE_DIR = os.path.join(HERE, '..', 'code')
+sys.path.insert(0, CODE_DIR)
+
+from data_loader import DATA_FILES, LIST_COLUMNS  # noqa: E402
+
+# DATA_FILES is relative to the dashboard code directory
+SOURCE_FILES = {name: os.path.join(CODE_DIR, path) for name, path in DATA_FILES.items()}
+
+DATE_FORMAT = '%Y-%m-%d'
+# Dates move by up to this many days either way
+DATE_JITTER_DAYS = 45
+# Standard deviation of the log of the per-row amount factor
+AMOUNT_SIGMA = 0.1
+# Chance that a listed item is dropped from a resampled list
+LIST_DROP_PROBABILITY = 0.1
+
+# How each table is resampled; the tables are generated in this order
+TABLES = {
+    'properties': {
+        'id': 'ID',
+        'dates': ['Available From'],
+        'amounts': ['Price', 'Utilities Fees', 'Total'],
+        'lists': LIST_COLUMNS + ['Facilities', 'Household Items'],
+    },
+    'contracts': {
+        'dates': ['Start Date', 'End Date', 'Created Date', 'Signed Date', 'Contract Termination Date',
+                  'Deadline', 'Created At', 'Updated At'],
+        'amounts': ['Room Rent', 'Room Utilities'],
+        'references': {'Property Id': ('properties', 'ID')},
+    },
+    'df': {
+        'id': 'ID',
+        'dates': ['Registered At', 'Looking For Start'],
+        'amounts': ['Budget'],
+    },
+}
+
+
+def _literal_list(value):
+    """The list of strings value spells, or None if it is anything else."""
+    try:
+        parsed = ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return None
+    if isinstance(parsed, list) and parsed and all(isinstance(item, str) for item in parsed):
+        return parsed
+    return None
+
+
+def _shift_dates(table, columns, rng):
+    """Moves every date of a row by the same number of days, within each column's range."""
+    shift = pd.to_timedelta(rng.integers(-DATE_JITTER_DAYS, DATE_JITTER_DAYS + 1, len(table)), unit='D')
+    for column in columns:
+        dates = pd.to_datetime(table[column], format=DATE_FORMAT, errors='coerce')
+        shifted = dates + shift
+        shifted = shifted.where((shifted >= dates.min()) & (shifted <= dates.max()), dates)
+        # Values that are not dates in DATE_FORMAT are kept as they are
+        table[column] = shifted.dt.strftime(DATE_FORMAT).where(dates.notna(), table[column])
+
+
+def _scale_amounts(table, columns, rng):
+    factor = rng.lognormal(0.0, AMOUNT_SIGMA, len(table))
+    for column in columns:
+        scaled = (table[column] * factor).round()
+        table[column] = scaled.astype(table[column].dtype)
+
+
+class ListColumnModel:
+    """
+    The items of one list-literal column, for resampling its lists.
+
+    Args:
+        values (pd.Series): The source column.
+
+    Attributes:
+        items (list): Every item, in the order they are usually listed.
+        frequency (np.ndarray): Share of the parsed lists containing each item.
+        membership (np.ndarray): Source rows x items, True where a row lists
+            the item. Rows that are not lists have no items.
+        parsed (np.ndarray): True for the source rows holding a list.
+    """
+
+    def __init__(self, values: pd.Series):
+        lists = [_literal_list(v) if isinstance(v, str) else None for v in values]
+        positions = {}
+        for items in lists:
+            for position, item in enumerate(items or []):
+                positions.setdefault(item, []).append(position / len(items))
+        # The form lists its checkboxes in a fixed order; the mean relative position recovers it
+        self.items = sorted(positions, key=lambda item: np.mean(positions[item]))
+        index = {item: i for i, item in enumerate(self.items)}
+        self.parsed = np.array([items is not None for items in lists])
+        self.membership = np.zeros((len(lists), len(self.items)), dtype=bool)
+        for row, items in enumerate(lists):
+            for item in items or []:
+                self.membership[row, index[item]] = True
+        self.frequency = self.membership[self.parsed].mean(axis=0) if self.parsed.any() else np.zeros(0)
+
+    def resample(self, values: pd.Series, rows: np.ndarray, rng) -> pd.Series:
+        """
+        The lists of the source rows `rows`, each with some items dropped or added.
+
+        An item is dropped with LIST_DROP_PROBABILITY (less for items in
+        over half of the lists) and added with the probability that keeps
+        its frequency unchanged. Duplicate items within a list are not kept. Rows that are not
+        lists, or would end up empty, keep their source value.
+
+        Args:
+            values (pd.Series): The source column.
+            rows (np.ndarray): Source row of each synthetic row.
+            rng (np.random.Generator): Random numbers.
+
+        Returns:
+            pd.Series: The synthetic column, as list literals.
+        """
+        result = values.iloc[rows].reset_index(drop=True)
+        targets = np.flatnonzero(self.parsed[rows])
+        if not len(targets) or not self.items:
+            return result
+        # Common items are dropped less often, so adding them back never needs a probability over 1
+        drop_probability = np.minimum(LIST_DROP_PROBABILITY, 1 - self.frequency)
+        absent = np.maximum(1 - self.frequency, 1e-12)
+        add_probability = drop_probability * self.frequency / absent
+        membership = self.membership[rows[targets]]
+        draws = rng.random(membership.shape)
+        membership = np.where(membership, draws >= drop_probability, draws < add_probability)
+        keep = membership.any(axis=1)
+        targets, membership = targets[keep], membership[keep]
+
+        # Format each distinct combination once
+        packed = np.packbits(membership, axis=1)
+        keys = np.ascontiguousarray(packed).view(np.dtype((np.void, packed.shape[1]))).ravel()
+        combinations, inverse = np.unique(keys, return_inverse=True)
+        combinations = np.unpackbits(combinations.view(np.uint8).reshape(len(combinations), -1), axis=1)
+        texts = np.array([repr([self.items[i] for i in np.flatnonzero(row[:len(self.items)])])
+                          for row in combinations], dtype=object)
+        result = result.astype(object)
+        result.iloc[targets] = texts[inverse.ravel()]
+        return result
+
+
+def _link(table, column, source_ids, synthetic_ids, rng):
+    """
+    Points `column` at synthetic rows copied from the source row it referenced.
+
+    synthesize() copies every referenced source row, so a reference only
+    dangles when it dangled in the source; those are moved past the
+    synthetic ids.
+    """
+    order = np.argsort(source_ids, kind='stable')
+    sorted_ids = source_ids[order]
+    wanted = table[column].to_numpy()
+    lo = np.searchsorted(sorted_ids, wanted, side='left')
+    hi = np.searchsorted(sorted_ids, wanted, side='right')
+    found = hi > lo
+    pick = lo + (rng.random(len(wanted)) * (hi - lo)).astype(np.int64)
+    linked = np.where(found, synthetic_ids[order[np.minimum(pick, len(order) - 1)]], wanted + synthetic_ids.max())
+    table[column] = linked.astype(table[column].dtype)
+
+
+def _referenced_rows(sources: dict, name: str) -> np.ndarray:
+    """Positions of the rows of sources[name] that a reference column of another table points at."""
+    referenced = np.zeros(len(sources[name]), dtype=bool)
+    for table, spec in TABLES.items():
+        for column, (target, key) in spec.get('references', {}).items():
+            if target == name:
+                referenced |= sources[name][key].isin(sources[table][column]).to_numpy()
+    return np.flatnonzero(referenced)
+
+
+def _sample_rows(n_source: int, n: int, required: np.ndarray, rng) -> np.ndarray:
+    """
+    n source rows drawn with replacement, including every row of `required`
+    (as many as fit in n), in random order.
+    """
+    required = rng.permutation(required)[:n]
+    rows = np.concatenate([required, rng.integers(0, n_source, n - len(required))])
+    return rng.permutation(rows)
+
+
+def synthesize(sources: dict, scale: float, seed: int = 0) -> tuple:
+    """
+    Synthetic versions of the source tables, `scale` times as many rows.
+
+    Args:
+        sources (dict): The source DataFrames by DATA_FILES name.
+        scale (float): Rows per source row.
+        seed (int): Seed of the random numbers.
+
+    Returns:
+        tuple: The synthetic DataFrames by name, and for each table the
+        source row of every synthetic row.
+    """
+    rng = np.random.default_rng(seed)
+    tables, source_rows = {}, {}
+    for name, spec in TABLES.items():
+        source = sources[name]
+        n = max(1, round(len(source) * scale))
+        rows = _sample_rows(len(source), n, _referenced_rows(sources, name), rng)
+        table = source.iloc[rows].reset_index(drop=True)
+        if 'id' in spec:
+            table[spec['id']] = np.arange(1, n + 1, dtype=source[spec['id']].dtype)
+        _shift_dates(table, spec.get('dates', []), rng)
+        _scale_amounts(table, spec.get('amounts', []), rng)
+        for column in spec.get('lists', []):
+            table[column] = ListColumnModel(source[column]).resample(source[column], rows, rng)
+        for column, (target, key) in spec.get('references', {}).items():
+            _link(table, column, sources[target][key].to_numpy()[source_rows[target]],
+                  tables[target][key].to_numpy(), rng)
+        tables[name], source_rows[name] = table, rows
+    return tables, source_rows
+
+
+def read_sources(data_files=SOURCE_FILES) -> dict:
+    return {name: pd.read_csv(data_files[name]) for name in TABLES}
+
+
+def _write_like(table, source_path, path):
+    """Writes table with the quoting and integer formatting of the source CSV."""
+    with open(source_path, encoding='utf-8') as f:
+        quote_all = f.readline().startswith('"')
+    # Float columns (ints with missing values) the source writes without decimals
+    text = pd.read_csv(source_path, dtype=str)
+    table = table.copy()
+    for column in table.columns[table.dtypes == np.float64]:
+        if not text[column].dropna().str.contains(r'\.', regex=True).any():
+            table[column] = table[column].round().astype('Int64')
+    table.to_csv(path, index=False, quoting=csv.QUOTE_ALL if quote_all else csv.QUOTE_MINIMAL)
+
+
+def write_dataset(out_dir: str, scale: float, seed: int = 0, data_files=SOURCE_FILES) -> dict:
+    """
+    Generates the synthetic tables and writes them to out_dir under the source file names.
+
+    Returns:
+        dict: The dataset's manifest, also written to out_dir/synthetic.json.
+    """
+    start = time.perf_counter()
+    tables, _ = synthesize(read_sources(data_files), scale, seed)
+    os.makedirs(out_dir, exist_ok=True)
+    for name, table in tables.items():
+        _write_like(table, data_files[name], os.path.join(out_dir, os.path.basename(data_files[name])))
+    shutil.copyfile(data_files['city_df'], os.path.join(out_dir, os.path.basename(data_files['city_df'])))
+    manifest = {
+        'scale': scale,
+        'seed': seed,
+        'rows': {name: len(table) for name, table in tables.items()},
+        'generate_seconds': round(time.perf_counter() - start, 3),
+    }
+    with open(os.path.join(out_dir, 'synthetic.json'), 'w') as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scale', type=float, default=10, help='rows per source row')
+    parser.add_argument('--out', required=True, help='directory for the synthetic CSVs')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    manifest = write_dataset(args.out, args.scale, args.seed)
+    rows = ', '.join(f'{name} {count:,}' for name, count in manifest['rows'].items())
+    print(f"wrote {rows} rows to {args.out} in {manifest['generate_seconds']:.1f} s")
+
+
+if __name__ == '__main__':
+    main()
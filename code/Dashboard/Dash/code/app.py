@@ -2,32 +2,78 @@
 import dash
 from dash import html, dcc
 import dash_bootstrap_components as dbc
-from dash.dependencies import Input, Output
+from dash.dependencies import Input, Output, State
+from dash.exceptions import PreventUpdate
 from style import *
-from data_loader import load_data
+from data_store import DATA_RELOAD_SECONDS, get_store, start_reloader
 from callbacks import register_callbacks 
+from callback_metrics import instrument_app
+from rent_suggestion import enabled as rent_suggestion_enabled, get_predictor, register_rent_callbacks, suggestion_layout
 
 app = dash.Dash(__name__,external_stylesheets=[dbc.themes.BOOTSTRAP])
 app.config.suppress_callback_exceptions = True
-properties, contracts, df, city_df = load_data()
-min_year = int(properties['Year'].min())
-max_year = int(properties['Year'].max())
-year_options_slider = {'step': 1, 'marks': {str(year): str(year) for year in range(min_year, max_year + 1)}}
+server = app.server
+# Load the rent model up front, like the data, so the first suggestion is not slow
+get_predictor()
+# Load the data at import as well, so a preloading server shares it with its workers
+get_store()
 
-available_provinces = sorted(properties['Province'].dropna().unique())
+_filter_options = {}
 
-#TODAY = datetime.date.today() # Get today's date (adjust based on your data)
 
-# years = sorted(df['Registered At'].dropna().unique())
-# year_options = [{'label': 'All', 'value': 'All'}] + [{'label': str(y), 'value': y} for y in years]
+def filter_options(store):
+    """
+    The year ranges and dropdown options of the tabs, for store's data.
 
+    Computed once per data version: switching tabs does not rescan the
+    frames, and after a reload the tabs offer the new data's years and
+    provinces.
+    """
+    options = _filter_options.get(store.version)
+    if options is not None:
+        return options
+    properties, df = store.properties, store.df
+    min_year = int(properties['Year'].min())
+    max_year = int(properties['Year'].max())
+    year_options_slider = {'step': 1, 'marks': {str(year): str(year) for year in range(min_year, max_year + 1)}}
+
+    available_provinces = sorted(properties['Province'].dropna().unique())
+    property_years = sorted(properties['Year'].dropna().astype(int).unique())
+
+    #TODAY = datetime.date.today() # Get today's date (adjust based on your data)
+
+    # years = sorted(df['Registered At'].dropna().unique())
+    # year_options = [{'label': 'All', 'value': 'All'}] + [{'label': str(y), 'value': y} for y in years]
+
+
+    years = sorted(df['Registered At'].dt.year.dropna().unique())
+    year_options = [{'label': 'All', 'value': 'All'}] + [
+        {'label': str(y), 'value': int(y)} for y in years
+    ]
+    provinces = sorted(df['province_id_upper'].dropna().unique())
+    province_options = [{'label': 'All', 'value': 'All'}] + [{'label': p, 'value': p} for p in provinces]
+    options = {
+        'min_year': min_year,
+        'max_year': max_year,
+        'year_options_slider': year_options_slider,
+        'available_provinces': available_provinces,
+        'property_years': property_years,
+        'year_options': year_options,
+        'province_options': province_options,
+    }
+    # Only the newest version is kept
+    _filter_options.clear()
+    _filter_options[store.version] = options
+    return options
+
+
+def data_version(store):
+    """
+    Identifies the data in the browser: its digest, since each server worker
+    numbers its own reloads.
+    """
+    return store.source_digest or store.version
 
-years = sorted(df['Registered At'].dt.year.dropna().unique())
-year_options = [{'label': 'All', 'value': 'All'}] + [
-    {'label': str(y), 'value': int(y)} for y in years
-]
-provinces = sorted(df['province_id_upper'].dropna().unique())
-province_options = [{'label': 'All', 'value': 'All'}] + [{'label': p, 'value': p} for p in provinces]
 
 app.layout = html.Div([
     dbc.Row(className="mb-3", style=logo_row_style, children=[
@@ -37,14 +83,41 @@ app.layout = html.Div([
     dcc.Tabs(id='main-tabs', value='property', children=[
         dcc.Tab(label='Property Overview', value='property'),
         dcc.Tab(label='Renter Overview', value='renter'),
-    ]),
-    html.Div(id='tab-content')
+    ] + ([dcc.Tab(label='Suggested Rent', value='rent')] if rent_suggestion_enabled() else [])),
+    html.Div(id='tab-content'),
+    # With DATA_RELOAD_SECONDS set, open pages refresh their KPI cards after a reload
+    dcc.Interval(id='data-version-poll', interval=max(DATA_RELOAD_SECONDS, 1) * 1000,
+                 disabled=DATA_RELOAD_SECONDS <= 0),
 ])
+
+
+@server.before_request
+def start_data_reloader():
+    # Threads do not survive a pre-forking server's fork, so each worker starts its own
+    start_reloader()
+
+
+@app.callback(
+    Output('contracts-version', 'data'),
+    Input('data-version-poll', 'n_intervals'),
+    State('contracts-version', 'data'),
+)
+def poll_data_version(n_intervals, current):
+    version = data_version(get_store())
+    if version == current:
+        raise PreventUpdate
+    return version
+
+
 @app.callback(
     Output('tab-content', 'children'),
     Input('main-tabs', 'value')
 )
 def render_tab_content(tab):
+    # One store for the whole layout, even if a reload swaps it meanwhile
+    store = get_store()
+    options = filter_options(store)
+    min_year, max_year = options['min_year'], options['max_year']
     if tab == 'property':
         return  html.Div(style={'padding': '20px'}, children=[
             dbc.Row(style={'marginBottom': '20px'}, children=[
@@ -70,7 +143,7 @@ def render_tab_content(tab):
                         min=min_year,
                         max=max_year,
                         value=[min_year, max_year],
-                        **year_options_slider
+                        **options['year_options_slider']
                     )
                 ]),
 
@@ -89,7 +162,7 @@ def render_tab_content(tab):
                         html.Label('Filter by Province:'),
                         dcc.Dropdown(
                             id='province-filter-hierarchical',
-                            options=[{'label': p, 'value': p} for p in available_provinces],
+                            options=[{'label': p, 'value': p} for p in options['available_provinces']],
                             placeholder='Select Province(s)',
                             multi=True
                         ),
@@ -106,7 +179,7 @@ def render_tab_content(tab):
                         html.Label('Select Year(s):'),
                         dcc.Dropdown(
                             id='year-filter',
-                            options=[{'label': str(y), 'value': y} for y in sorted(properties['Year'].dropna().astype(int).unique())],
+                            options=[{'label': str(y), 'value': y} for y in options['property_years']],
                             placeholder='Select Year(s)',
                             multi=True
                         ),
@@ -136,9 +209,12 @@ def render_tab_content(tab):
                         dcc.Graph(id='property-type-bar-chart')
                     ])
                 ]),
-                dcc.Store(id='contracts-df', data=contracts.to_dict('records'))
+                # Only the data version goes to the browser; the KPI cards read contracts server-side
+                dcc.Store(id='contracts-version', data=data_version(store))
             ])
         ])
+    elif tab == 'rent':
+        return suggestion_layout()
     elif tab == 'renter':
         return html.Div(
     style={
@@ -191,7 +267,7 @@ def render_tab_content(tab):
             html.Div(style=year_dropdown_style, children=[
                 dcc.Dropdown(
                     id='year-filter',
-                    options=year_options,
+                    options=options['year_options'],
                     value=None,
                     clearable=False,
                     placeholder='Select Year'
@@ -201,12 +277,15 @@ def render_tab_content(tab):
 
             html.Div(style=province_dropdown_style, children=[
                 dcc.Dropdown(id='province-filter',
-                             options=province_options, value=None, clearable=False, placeholder='Select Province')
+                             options=options['province_options'], value=None, clearable=False, placeholder='Select Province')
             ])
 
         ])
     
 register_callbacks(app)
+register_rent_callbacks(app)
+# Wraps every callback above; /_metrics serves their latency and payload histograms
+instrument_app(app)
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,440 @@
+import bisect
+import functools
+import inspect
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from dash.exceptions import PreventUpdate
+from flask import Response, request
+
+# Set CALLBACK_METRICS=0 to serve the callbacks unwrapped
+METRICS_ENABLED = os.environ.get('CALLBACK_METRICS', '1') != '0'
+# Path of a JSON-lines log with one record per callback call
+CALLBACK_LOG = os.environ.get('CALLBACK_LOG')
+# Profile callbacks slower than this many milliseconds (unset: profiler off)
+PROFILE_THRESHOLD_MS = os.environ.get('CALLBACK_PROFILE_MS')
+PROFILE_DIR = os.environ.get('CALLBACK_PROFILE_DIR', 'callback_profiles')
+PROFILE_INTERVAL_MS = float(os.environ.get('CALLBACK_PROFILE_INTERVAL_MS', '5'))
+# Serve the metrics to other hosts too, not only to direct requests from this machine.
+# Without it, requests that came through a proxy (see _FORWARDING_HEADERS) are refused:
+# a reverse proxy on this machine connects from 127.0.0.1 whoever the client is.
+METRICS_PUBLIC = os.environ.get('CALLBACK_METRICS_PUBLIC') == '1'
+
+# Histogram bucket upper bounds
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (1_000, 10_000, 50_000, 100_000, 250_000, 500_000, 1_000_000, 5_000_000, 10_000_000)
+
+_LOCAL_ADDRESSES = {'127.0.0.1', '::1', 'localhost'}
+# Headers a proxy adds when passing a request on
+_FORWARDING_HEADERS = ('Forwarded', 'X-Forwarded-For', 'X-Real-IP')
+
+logger = logging.getLogger('dash_callbacks')
+
+
+class Histogram:
+    """Counts of observations per bucket, plus their sum and maximum."""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        # The last count is the +Inf bucket
+        self.counts = [0] * (len(bounds) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.total += value
+        self.count += 1
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-quantile (the maximum for the last bucket)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'max': self.max,
+            'p50': self.quantile(0.5),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'buckets': {str(b): c for b, c in zip(list(self.bounds) + ['+Inf'], _cumulative(self.counts))},
+        }
+
+
+def _cumulative(counts):
+    total, result = 0, []
+    for count in counts:
+        total += count
+        result.append(total)
+    return result
+
+
+class CallbackStats:
+    """Everything recorded about one callback."""
+
+    def __init__(self, name, outputs, inputs):
+        self.name = name
+        self.outputs = outputs
+        self.inputs = inputs
+        self.calls = 0
+        self.errors = 0
+        self.prevented = 0
+        self.seconds = Histogram(SECONDS_BUCKETS)
+        self.bytes = Histogram(BYTES_BUCKETS)
+
+    def to_dict(self):
+        return {
+            'outputs': self.outputs,
+            'inputs': self.inputs,
+            'calls': self.calls,
+            'errors': self.errors,
+            'prevented': self.prevented,
+            'seconds': self.seconds.to_dict(),
+            'bytes': self.bytes.to_dict(),
+        }
+
+
+class SlowCallbackProfiler:
+    """
+    Sampling profiler for callbacks that turn out to be slow.
+
+    One background thread samples the stack of every thread currently inside
+    an instrumented callback every `interval` seconds. When a callback takes
+    at least `threshold` seconds, its samples are written to `out_dir` as
+    collapsed stacks ("frame;frame;frame count" per line), which flamegraph.pl
+    and speedscope read. Faster calls discard theirs.
+    """
+
+    def __init__(self, threshold, out_dir, interval=0.005):
+        self.threshold = threshold
+        self.out_dir = out_dir
+        self.interval = interval
+        self._active = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def _ensure_thread(self):
+        # Started on first use, so each forked server worker gets its own sampler
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='callback-profiler', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, samples in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[_collapse(frame)] += 1
+
+    def start(self):
+        """Starts sampling the calling thread; returns the token to pass to stop()."""
+        thread_id = threading.get_ident()
+        with self._lock:
+            self._active[thread_id] = Counter()
+            self._ensure_thread()
+        return thread_id
+
+    def stop(self, token, name, seconds):
+        """
+        Stops sampling and, if the call was slow, writes its profile.
+
+        Returns:
+            str or None: The profile's path, if one was written.
+        """
+        with self._lock:
+            samples = self._active.pop(token, None)
+        if not samples or seconds < self.threshold:
+            return None
+        os.makedirs(self.out_dir, exist_ok=True)
+        path = os.path.join(self.out_dir, f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-{name}-'
+                                          f'{seconds * 1000:.0f}ms.folded')
+        try:
+            with open(path, 'w') as f:
+                for stack, count in samples.most_common():
+                    f.write(f'{stack} {count}\n')
+        except OSError as e:
+            print(f"Could not write callback profile to '{path}': {e}")
+            return None
+        return path
+
+
+def _collapse(frame):
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(stack))
+
+
+class CallbackMetrics:
+    """
+    Per-callback latency and payload histograms for one server process.
+
+    The recorded time is the wall time of the whole Dash callback wrapper:
+    the callback itself plus the JSON serialization of its outputs, whose
+    length is the recorded payload size. Under gunicorn every worker keeps
+    its own metrics; the endpoints report the worker that answers, with its
+    pid.
+
+    Attributes:
+        callbacks (dict): CallbackStats by callback function name.
+        caches (dict): Objects with a stats() method (e.g. RenderCache) by name.
+        profiler (SlowCallbackProfiler or None): The opt-in slow-call profiler.
+    """
+
+    def __init__(self, profiler=None):
+        self.callbacks = {}
+        self.caches = {}
+        self.profiler = profiler
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+    def register_cache(self, name, cache):
+        self.caches[name] = cache
+
+    def add_callback(self, name, outputs, inputs):
+        if name in self.callbacks:
+            name = f'{name}[{outputs}]'
+        self.callbacks[name] = CallbackStats(name, outputs, inputs)
+        return self.callbacks[name]
+
+    def record(self, stats, seconds, size, status, profile=None):
+        with self._lock:
+            stats.calls += 1
+            stats.seconds.observe(seconds)
+            if status == 'ok':
+                stats.bytes.observe(size)
+            elif status == 'error':
+                stats.errors += 1
+            else:
+                stats.prevented += 1
+        if logger.isEnabledFor(logging.INFO):
+            record = {
+                'ts': round(time.time(), 3),
+                'pid': os.getpid(),
+                'callback': stats.name,
+                'outputs': stats.outputs,
+                'inputs': stats.inputs,
+                'triggered': _triggered(),
+                'status': status,
+                'ms': round(seconds * 1000, 3),
+                'bytes': size,
+            }
+            if profile:
+                record['profile'] = profile
+            logger.info(json.dumps(record))
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'started_at': self.started_at,
+                'callbacks': {name: stats.to_dict() for name, stats in self.callbacks.items()},
+                'caches': {name: cache.stats() for name, cache in self.caches.items()},
+            }
+
+    def to_prometheus(self):
+        """The metrics in the Prometheus text exposition format."""
+        snapshot = self.to_dict()
+        lines = []
+        for metric, key, unit in (('dash_callback_seconds', 'seconds', 'Wall time'),
+                                  ('dash_callback_response_bytes', 'bytes', 'Serialized output size')):
+            lines.append(f'# HELP {metric} {unit} of Dash callbacks.')
+            lines.append(f'# TYPE {metric} histogram')
+            for name, stats in snapshot['callbacks'].items():
+                label = f'callback="{_escape(name)}"'
+                for bound, count in stats[key]['buckets'].items():
+                    lines.append(f'{metric}_bucket{{{label},le="{bound}"}} {count}')
+                lines.append(f'{metric}_sum{{{label}}} {stats[key]["sum"]}')
+                lines.append(f'{metric}_count{{{label}}} {stats[key]["count"]}')
+        for metric, key in (('dash_callback_errors_total', 'errors'), ('dash_callback_prevented_total', 'prevented')):
+            lines.append(f'# TYPE {metric} counter')
+            for name, stats in snapshot['callbacks'].items():
+                lines.append(f'{metric}{{callback="{_escape(name)}"}} {stats[key]}')
+        for name, stats in snapshot['caches'].items():
+            for key, value in stats.items():
+                lines.append(f'dash_cache_{key}{{cache="{_escape(name)}"}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+
+def _triggered():
+    try:
+        from dash import callback_context
+        return [t['prop_id'] for t in callback_context.triggered]
+    except Exception:
+        return []
+
+
+def _describe(callback_id, spec):
+    # Multi-output callbacks are keyed '..a.prop...b.prop..'
+    if callback_id.startswith('..'):
+        outputs = callback_id[2:-2].split('...')
+    else:
+        outputs = [callback_id]
+    inputs = [f"{i['id']}.{i['property']}" for i in spec.get('inputs', [])]
+    return outputs, inputs
+
+
+def _response_size(response):
+    if isinstance(response, (str, bytes)):
+        return len(response)
+    try:
+        from dash._utils import to_json
+        return len(to_json(response))
+    except Exception:
+        return 0
+
+
+def _wrap(func, stats, metrics):
+    profiler = metrics.profiler
+
+    def finish(start, token, response, status):
+        seconds = time.perf_counter() - start
+        profile = profiler.stop(token, stats.name, seconds) if token is not None else None
+        metrics.record(stats, seconds, _response_size(response) if status == 'ok' else 0, status, profile)
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def instrumented(*args, **kwargs):
+            token = profiler.start() if profiler else None
+            start = time.perf_counter()
+            status, response = 'error', None
+            try:
+                response = await func(*args, **kwargs)
+                status = 'ok'
+                return response
+            except PreventUpdate:
+                status = 'prevented'
+                raise
+            finally:
+                finish(start, token, response, status)
+        return instrumented
+
+    @functools.wraps(func)
+    def instrumented(*args, **kwargs):
+        token = profiler.start() if profiler else None
+        start = time.perf_counter()
+        status, response = 'error', None
+        try:
+            response = func(*args, **kwargs)
+            status = 'ok'
+            return response
+        except PreventUpdate:
+            status = 'prevented'
+            raise
+        finally:
+            finish(start, token, response, status)
+    return instrumented
+
+
+def instrument_callbacks(app, metrics):
+    """
+    Wraps every callback registered on app so its calls are recorded in metrics.
+
+    Call after all callbacks are registered.
+    """
+    for callback_id, spec in app.callback_map.items():
+        func = spec['callback']
+        if getattr(func, '_callback_metrics', None) is metrics:
+            continue
+        outputs, inputs = _describe(callback_id, spec)
+        name = getattr(func, '__wrapped__', func).__name__
+        stats = metrics.add_callback(name, outputs, inputs)
+        wrapped = _wrap(func, stats, metrics)
+        wrapped._callback_metrics = metrics
+        spec['callback'] = wrapped
+
+
+def register_metrics_endpoint(server, metrics, path='/_metrics'):
+    """
+    Serves metrics on the Flask server: Prometheus text at `path`, JSON at `path`.json.
+
+    Unless CALLBACK_METRICS_PUBLIC=1, only requests made directly from this
+    machine are answered: a local address alone is not enough, since a
+    reverse proxy on the same machine also connects from one, so requests
+    carrying a proxy's forwarding headers are refused too. Scrape the
+    metrics from the server's own port, not through the proxy.
+    """
+    def allowed():
+        if METRICS_PUBLIC:
+            return True
+        forwarded = any(header in request.headers for header in _FORWARDING_HEADERS)
+        return request.remote_addr in _LOCAL_ADDRESSES and not forwarded
+
+    def prometheus():
+        if not allowed():
+            return Response('Not Found', status=404)
+        return Response(metrics.to_prometheus(), mimetype='text/plain; version=0.0.4')
+
+    def as_json():
+        if not allowed():
+            return Response('Not Found', status=404)
+        return Response(json.dumps(metrics.to_dict(), indent=1), mimetype='application/json')
+
+    server.add_url_rule(path, 'callback_metrics', prometheus)
+    server.add_url_rule(f'{path}.json', 'callback_metrics_json', as_json)
+
+
+def _configure_log(path):
+    handler = logging.FileHandler(path)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    logger.addHandler(handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+_metrics = None
+
+
+def get_metrics():
+    """
+    Returns the process-wide CallbackMetrics, configured from the environment.
+
+    CALLBACK_LOG turns on the JSON-lines log and CALLBACK_PROFILE_MS the
+    slow-call profiler (see the constants above).
+    """
+    global _metrics
+    if _metrics is None:
+        profiler = None
+        if PROFILE_THRESHOLD_MS:
+            profiler = SlowCallbackProfiler(float(PROFILE_THRESHOLD_MS) / 1000, PROFILE_DIR,
+                                            PROFILE_INTERVAL_MS / 1000)
+        if CALLBACK_LOG and not logger.handlers:
+            _configure_log(CALLBACK_LOG)
+        _metrics = CallbackMetrics(profiler)
+    return _metrics
+
+
+def instrument_app(app):
+    """Instruments every callback of app and serves the metrics, unless CALLBACK_METRICS=0."""
+    if not METRICS_ENABLED:
+        return None
+    metrics = get_metrics()
+    instrument_callbacks(app, metrics)
+    register_metrics_endpoint(app.server, metrics)
+    return metrics
@@ -3,21 +3,54 @@ from dash import html
 from dash.dependencies import Input, Output
 from wordcloud import WordCloud
 import io
+import os
 import base64
 import plotly.express as px
-from data_loader import load_data
+import plotly.graph_objects as go
+from data_store import get_store
+from render_cache import VersionedRenderCache, filter_cache_key
+from callback_metrics import get_metrics
+
+# Set to a directory to keep rendered word clouds across restarts
+WORDCLOUD_CACHE_DIR = os.environ.get('WORDCLOUD_CACHE_DIR')
+
+def budget_box_figure(stats):
+    """
+    Builds the budget box plot from precomputed statistics.
+
+    Only the five box values and the distinct outliers are sent to the browser,
+    instead of every budget for Plotly to summarize client-side.
+    """
+    fig = go.Figure()
+    if stats is not None:
+        fig.add_trace(go.Box(
+            x=[' '], q1=[stats['q1']], median=[stats['median']], q3=[stats['q3']],
+            lowerfence=[stats['lowerfence']], upperfence=[stats['upperfence']],
+            name='', boxpoints=False, showlegend=False,
+        ))
+        fig.add_trace(go.Scatter(
+            x=[' '] * len(stats['outliers']), y=stats['outliers'], mode='markers',
+            name='', showlegend=False, hovertemplate='Budget=%{y}<extra></extra>',
+        ))
+    fig.update_layout(title='Budget Distribution', yaxis_title='Budget')
+    return fig
 
 def register_callbacks(app):
-    properties, contracts, df, city_df = load_data()
+    # Every callback takes the DataStore once per call and reads only from it, so a
+    # reload swapping in new data (data_store.reload_store) never mixes two versions.
+    # Rendered images are only valid for one version of the data, so the cache is
+    # per version, and disk entries live under the data's digest
+    wordcloud_cache = VersionedRenderCache(max_entries=512, max_bytes=64 * 1024 * 1024,
+                                           cache_dir=WORDCLOUD_CACHE_DIR)
+    get_metrics().register_cache('wordcloud', wordcloud_cache)
     @app.callback(
         Output("active-status-card", "children"),
-        [Input("contracts-df", "data")], 
+        [Input("contracts-version", "data")], 
     )
-    def update_active_status(data):
-        df = pd.DataFrame(data).copy()
-        active_df = df[df['Status'] == 'Active']
-        active_count = len(active_df)
-        total_count = len(df)
+    def update_active_status(version):
+        contract_kpis = get_store().contract_kpis
+        active_count = contract_kpis.status_count('Active')
+        total_count = contract_kpis.total
         active_percentage = f"{(active_count / total_count * 100):.2f}%" if total_count > 0 else "0%"
         return [
             html.H4("Active", className="card-title"),
@@ -27,26 +60,19 @@ def register_callbacks(app):
 
     @app.callback(
         Output("signed-status-card", "children"),
-        [Input("contracts-df", "data")],
+        [Input("contracts-version", "data")],
     )
-    def update_signed_status_monthly(data):
-        df = pd.DataFrame(data).copy()
-        df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
-        df_valid_dates = df.dropna(subset=['Date'])
+    def update_signed_status_monthly(version):
+        contract_kpis = get_store().contract_kpis
+        latest_month = contract_kpis.latest_month()
 
-        if not df_valid_dates.empty:
-            df_valid_dates['YearMonth'] = df_valid_dates['Date'].dt.to_period('M')
-            latest_month = df_valid_dates['YearMonth'].max()
-            latest_df = df_valid_dates[df_valid_dates['YearMonth'] == latest_month]
-            signed_count = len(latest_df[latest_df['Status'] == 'Signed'])
-
-            previous_months = df_valid_dates[df_valid_dates['YearMonth'] < latest_month]['YearMonth'].unique()
-            previous_month = previous_months.max() if len(previous_months) > 0 else None
+        if latest_month is not None:
+            signed_count = contract_kpis.status_count('Signed', latest_month)
+            previous_month = contract_kpis.previous_month(latest_month)
 
             mom_change_element = html.P("No previous month data", className="card-text")
             if previous_month:
-                previous_df = df_valid_dates[df_valid_dates['YearMonth'] == previous_month]
-                signed_previous = len(previous_df[previous_df['Status'] == 'Signed'])
+                signed_previous = contract_kpis.status_count('Signed', previous_month)
                 change = signed_count - signed_previous
                 change_percentage_value = (change / signed_previous * 100) if signed_previous > 0 else None
 
@@ -75,25 +101,19 @@ def register_callbacks(app):
 
     @app.callback(
         Output("avg-price-card", "children"),
-        [Input("contracts-df", "data")],
+        [Input("contracts-version", "data")],
     )
-    def update_avg_price(data):
-        df = pd.DataFrame(data).copy()
-        df['Date'] = pd.to_datetime(df['Date'], errors='coerce')
-        df_valid_dates = df.dropna(subset=['Date'])
-
-        df_valid_dates['YearMonth'] = df_valid_dates['Date'].dt.to_period('M')
+    def update_avg_price(version):
+        contract_kpis = get_store().contract_kpis
+        latest_month = contract_kpis.latest_month()
 
-        if not df_valid_dates.empty:
-            latest_month = df_valid_dates['YearMonth'].max()
-            latest_df = df_valid_dates[df_valid_dates['YearMonth'] == latest_month]
-            avg_price_latest = latest_df['Room Rent'].mean()
+        if latest_month is not None:
+            avg_price_latest = contract_kpis.average_rent(latest_month)
 
             previous_month = latest_month - 1
-            previous_df = df_valid_dates[df_valid_dates['YearMonth'] == previous_month]
 
-            if not previous_df.empty:
-                avg_price_previous = previous_df['Room Rent'].mean()
+            if contract_kpis.has_month(previous_month):
+                avg_price_previous = contract_kpis.average_rent(previous_month)
                 price_change = avg_price_latest - avg_price_previous
                 change_percentage_value = (price_change / avg_price_previous * 100) if avg_price_previous != 0 else None
 
@@ -126,12 +146,11 @@ def register_callbacks(app):
         [Input('year-slider', 'value')]
     )
     def update_province_property_count_chart(selected_year_range):
+        property_filter = get_store().property_filter
         start_year, end_year = selected_year_range
-        filtered_df = properties[
-            (properties['Year'] >= start_year) & (properties['Year'] <= end_year)
-        ].copy()
+        mask = property_filter.mask(year_range=(start_year, end_year))
 
-        province_counts = filtered_df['Province'].value_counts().reset_index()
+        province_counts = property_filter.value_counts('Province', mask).reset_index()
         province_counts.columns = ['Province', 'count']
         fig = px.bar(province_counts, x='Province', y='count',
                     title='Number of Properties by Province')
@@ -144,20 +163,19 @@ def register_callbacks(app):
         Input('year-slider', 'value')]
     )
     def update_city_pie_chart(province_click_data, selected_year_range):
+        property_filter = get_store().property_filter
         start_year, end_year = selected_year_range
-        filtered_df = properties[
-            (properties['Year'] >= start_year) & (properties['Year'] <= end_year)
-        ].copy()
         if province_click_data:
             clicked_province = province_click_data['points'][0]['x']
-            filtered_df = filtered_df [filtered_df ['Province'] == clicked_province]
-            city_counts = filtered_df['City_clean'].value_counts().reset_index()
+            mask = property_filter.mask({'Province': [clicked_province]}, year_range=(start_year, end_year))
+            city_counts = property_filter.value_counts('City_clean', mask).reset_index()
             city_counts.columns = ['City_clean', 'count']
             fig = px.pie(city_counts, names='City_clean', values='count',
                         title=f'Property Count by City in {clicked_province}'
                         )
         else:
-            city_counts = filtered_df ['City_clean'].value_counts().reset_index()
+            mask = property_filter.mask(year_range=(start_year, end_year))
+            city_counts = property_filter.value_counts('City_clean', mask).reset_index()
             city_counts.columns = ['City_clean', 'count']
             fig = px.pie(city_counts, names='City_clean', values='count',
                         title='Overall Property Count by City'
@@ -172,10 +190,12 @@ def register_callbacks(app):
         [Input('province-filter-hierarchical', 'value')]
     )
     def update_city_dropdown(selected_provinces):
+        property_filter = get_store().property_filter
         if not selected_provinces:
             return [], True
         else:
-            filtered_cities = properties[properties['Province'].isin(selected_provinces)]['City_clean'].dropna().unique()
+            mask = property_filter.mask({'Province': selected_provinces})
+            filtered_cities = property_filter.value_counts('City_clean', mask).index
             city_options = [{'label': c, 'value': c} for c in sorted(filtered_cities)]
             return city_options, False
 
@@ -187,21 +207,19 @@ def register_callbacks(app):
         Input('property-type-bar-chart', 'clickData')]
     )
     def update_price_chart(selected_provinces, selected_cities, selected_years, bar_click_data):
-        filtered_df = properties.copy()
-
-        if selected_years:
-            filtered_df = filtered_df[filtered_df['Year'].isin(selected_years)]
+        price_cube = get_store().price_cube
+        filters = {'Year': selected_years}
 
         if selected_cities:
-            filtered_df = filtered_df[filtered_df['City_clean'].isin(selected_cities)]
+            filters['City_clean'] = selected_cities
             group_col = 'City'
             title_prefix = 'Average Monthly Price by City'
         elif selected_provinces and len(selected_provinces) > 1:
-            filtered_df = filtered_df[filtered_df['Province'].isin(selected_provinces)]
+            filters['Province'] = selected_provinces
             group_col = 'Province'
             title_prefix = 'Average Monthly Price by Province'
         elif selected_provinces and len(selected_provinces) == 1:
-            filtered_df = filtered_df[filtered_df['Province'].isin(selected_provinces)]
+            filters['Province'] = selected_provinces
             group_col = None
             title_prefix = f'Average Monthly Price in {selected_provinces[0]}'
         else:
@@ -211,18 +229,14 @@ def register_callbacks(app):
         selected_property_type = None
         if bar_click_data:
             selected_property_type = bar_click_data['points'][0]['x']
-            filtered_df = filtered_df[filtered_df['Property Type'] == selected_property_type]
+            filters['Property Type'] = [selected_property_type]
             title_prefix += f' - Type: {selected_property_type}'
 
-        filtered_df['Date'] = pd.to_datetime(filtered_df['Date'], errors='coerce')
-        filtered_df.dropna(subset=['Date'], inplace=True)
-        filtered_df['YearMonth'] = filtered_df['Date'].dt.to_period('M').dt.to_timestamp()
+        monthly_avg_price = price_cube.monthly_average(filters, group_col)
 
         if group_col:
-            monthly_avg_price = filtered_df.groupby(['YearMonth', group_col])['Price'].mean().reset_index()
             fig = px.line(monthly_avg_price, x='YearMonth', y='Price', color=group_col, title=title_prefix)
         else:
-            monthly_avg_price = filtered_df.groupby('YearMonth')['Price'].mean().reset_index()
             fig = px.line(monthly_avg_price, x='YearMonth', y='Price', title=title_prefix)
 
         fig.update_layout(xaxis_title='Month', yaxis_title='Average Price')
@@ -238,41 +252,28 @@ def register_callbacks(app):
         Input('year-filter', 'value')]
     )
     def update_wordcloud(bar_click_data, selected_provinces, selected_cities, selected_years):
-        filtered_df = properties.copy()
-
-        if selected_provinces:
-            filtered_df = filtered_df[filtered_df['Province'].isin(selected_provinces)]
-
-        if selected_cities:
-            filtered_df = filtered_df[filtered_df['City'].isin(selected_cities)]
-
-        if selected_years:
-            filtered_df = filtered_df[filtered_df['Year'].isin(selected_years)]
-
-        selected_property_type = None
-        if bar_click_data:
-            selected_property_type = bar_click_data['points'][0]['x']
-            filtered_df = filtered_df[filtered_df['Property Type'] == selected_property_type]
-
-        all_words = []
-        columns_to_process_list = ['Household Items', 'Furnishings', 'Safety Features', 'Amenities', 'House Rules']
-        for col in columns_to_process_list:
-            for item_list in filtered_df.loc[:, col].dropna():
-                if isinstance(item_list, list):
-                    for word in item_list:
-                        cleaned_word = str(word).strip()
-                        all_words.append(cleaned_word)
-
-        for bed_type in filtered_df['Bed Type'].dropna():
-            cleaned_bed_type = str(bed_type).strip()
-            all_words.append(cleaned_bed_type)
-
-        if not all_words:
+        selected_property_type = bar_click_data['points'][0]['x'] if bar_click_data else None
+        key = filter_cache_key(selected_provinces, selected_cities, selected_years, selected_property_type)
+        store = get_store()
+        return wordcloud_cache.get_or_render(store.version, store.source_digest or '', key,
+                                             lambda: render_wordcloud(store, *key))
+
+    def render_wordcloud(store, selected_provinces, selected_cities, selected_years, selected_property_type):
+        mask = store.property_filter.mask({
+            'Province': selected_provinces,
+            'City': selected_cities,
+            'Year': selected_years,
+            'Property Type': [selected_property_type] if selected_property_type is not None else None,
+        })
+
+        # Item counts come straight from the precomputed property-by-item matrix
+        frequencies = store.wordcloud_items.frequencies(mask)
+
+        if not frequencies:
             transparent_gif = "data:image/gif;base64,R0lGODlhAQABAIAAAAAAAP///ywAAAAAAQABAAACAkQBADs="
             return transparent_gif
         else:
-            text = ' '.join(all_words)
-            wordcloud = WordCloud(width=600, height=300, background_color=None, mode="RGBA").generate(text)
+            wordcloud = WordCloud(width=600, height=300, background_color=None, mode="RGBA").generate_from_frequencies(frequencies)
             img = io.BytesIO()
             wordcloud.to_image().save(img, format='PNG')
             img.seek(0)
@@ -286,31 +287,32 @@ def register_callbacks(app):
         Input('year-filter', 'value')]
     )
     def update_property_type_chart(selected_provinces, selected_cities, selected_years):
-        filtered_df = properties.copy()
-
-        if selected_years:
-            filtered_df = filtered_df[filtered_df['Year'].isin(selected_years)]
+        store = get_store()
+        property_filter = store.property_filter
+        filters = {'Year': selected_years}
 
         if selected_cities:
-            filtered_df = filtered_df[filtered_df['City_clean'].isin(selected_cities)]
+            filters['City_clean'] = selected_cities
             color_col = 'City'
             title = 'Number of Properties by Type (by City)'
         elif selected_provinces and len(selected_provinces) > 1:
-            filtered_df = filtered_df[filtered_df['Province'].isin(selected_provinces)]
+            filters['Province'] = selected_provinces
             color_col = 'Province'
             title = 'Number of Properties by Type (by Province)'
         elif selected_provinces and len(selected_provinces) == 1:
-            filtered_df = filtered_df[filtered_df['Province'].isin(selected_provinces)]
+            filters['Province'] = selected_provinces
             color_col = None
             title = f'Number of Properties by Type in {selected_provinces[0]}'
         else:
             color_col = None
             title = 'Overall Number of Properties by Type'
 
-        property_counts = filtered_df['Property Type'].value_counts().reset_index()
+        mask = property_filter.mask(filters)
+        property_counts = property_filter.value_counts('Property Type', mask).reset_index()
         property_counts.columns = ['Property Type', 'count']
 
         if color_col:
+            filtered_df = store.properties.loc[mask, ['Property Type', color_col]]
             property_type_province = filtered_df.groupby(['Property Type', color_col]).size().reset_index(name='count')
             fig = px.bar(property_type_province, x='Property Type', y='count', color=color_col,
                         title=title)
@@ -335,39 +337,11 @@ def register_callbacks(app):
         Input('province-filter', 'value')]
     )
     def update_dashboard(selected_year, selected_province):
-        dff = df.copy() 
-        dff['Registered At'] = pd.to_datetime(dff['Registered At'], errors='coerce')  
-        dff['Registered Year'] = dff['Registered At'].dt.year
-        if selected_year is not None and selected_year != 'All':
-            dff = dff[dff['Registered Year'] == selected_year]
-     
-        # Filter by province
-        if selected_province is not None and selected_province != 'All':
-            dff = dff[dff['province_id_upper'] == selected_province]
-
-        # KPI 1: Top City
-        city_counts = dff['City_extracted'].value_counts()
-        if not city_counts.empty:
-            top_city = city_counts.idxmax()
-            top_count = int(city_counts.max())
-            kpi_city = f"{top_city} ({top_count})"
-        else:
-            kpi_city = "N/A (0)"
-
-        # KPI 2: Unique Renters
-        kpi_renters = f"{dff['ID'].nunique():,}"
-
-        # KPI 3: Avg Budget
-        avg_budget = dff['Budget'].mean()
-        kpi_budget = f"{avg_budget:.1f}" if pd.notna(avg_budget) else "N/A"
+        summary = get_store().renter_analytics.summary(selected_year, selected_province)
+        kpi_city, kpi_renters, kpi_budget = summary.kpi_city, summary.kpi_renters, summary.kpi_budget
 
         # City-level map
-        city_counts_df = (
-            dff.groupby(['City_extracted', 'Latitude', 'Longitude'])
-            .size()
-            .reset_index(name='Registrations')
-            .dropna(subset=['Latitude', 'Longitude'])
-        )
+        city_counts_df = summary.geo
 
         title_suffix = f" - {selected_province}" if selected_province != 'All' else ""
         map_fig = px.scatter_geo(
@@ -395,11 +369,7 @@ def register_callbacks(app):
 
 
         # Budget box (≤4000)
-        budget_fig = px.box(
-            dff[dff['Budget'] <= 4000],
-            y='Budget',
-            title='Budget Distribution'
-        ).update_layout(
+        budget_fig = budget_box_figure(summary.budget_box).update_layout(
             margin={'l': 60, 'r': 10, 't': 30, 'b': 40},
             title={'text': 'Budget Distribution', 'x': 0.5, 'xanchor': 'center'},
             title_x=0.6,
@@ -409,11 +379,8 @@ def register_callbacks(app):
         budget_fig.update_traces(marker_color="#19B9F3")
 
 
-        # Lease term bar
-        dff['Year'] = pd.to_datetime(dff['Registered At'], errors='coerce').dt.year
-
-# Group by Year and Lease Term
-        lease_df = dff.groupby(['Year', 'Lease Term']).size().reset_index(name='Count')
+        # Lease term bar, grouped by registration year and lease term
+        lease_df = summary.lease
 
         # Create line chart with multiple lines, one for each Lease Term
         lease_fig = px.line(
@@ -433,8 +400,7 @@ def register_callbacks(app):
         lease_fig.update_traces(mode='lines+markers')
 
 
-        preference_df = dff['Prefer Live With'].value_counts().sort_values(ascending=False).reset_index()
-        preference_df.columns = ['Prefer Live With', 'Count']
+        preference_df = summary.preference
         preference_fig = px.bar(
             preference_df,
             x='Prefer Live With',
@@ -448,14 +414,7 @@ def register_callbacks(app):
             title_x=0.55)
         preference_fig.update_traces(marker_color='#EF553B')
     
-        renter_city_df = (
-            dff['city']
-            .value_counts()
-            .nlargest(5)
-            .reset_index())
-
-
-        renter_city_df.columns = ['city', 'Count']
+        renter_city_df = summary.top_cities
         renter_city_fig = px.bar(
             renter_city_df,
             x='city',
@@ -1,11 +1,29 @@
+import os
 import pandas as pd
-import ast
+import time
+from list_parser import parse_list_column
+
+# Set to serve another copy of the data, e.g. one made by benchmarks/synthetic_data.py
+DATA_DIR = os.environ.get('DASHBOARD_DATA_DIR', '../data')
+
+DATA_FILES = {
+    'properties': os.path.join(DATA_DIR, 'properties_clean_list.csv'),
+    'contracts': os.path.join(DATA_DIR, 'contracts.csv'),
+    'df': os.path.join(DATA_DIR, 'cleaned_renters.csv'),
+    'city_df': os.path.join(DATA_DIR, 'city_df.csv'),
+}
+
+# List-like string columns in properties that are parsed into lists
+LIST_COLUMNS = ['Furnishings', 'Safety Features', 'Amenities', 'House Rules']
 
 def convert_string_list_columns(df, columns_to_convert):
     """
     Converts string representations of lists in the specified columns of a DataFrame
     to actual Python lists.
 
+    Each column is parsed in bulk by list_parser.parse_list_column; malformed
+    strings still fall back to splitting on ', '.
+
     Args:
         df (pd.DataFrame): The DataFrame to process.
         columns_to_convert (list): A list of column names to convert.
@@ -15,43 +33,77 @@ def convert_string_list_columns(df, columns_to_convert):
     """
     for col in columns_to_convert:
         if col in df.columns:
-            def safe_eval(string_list):
-                """Safely evaluates a string, returning a list or None."""
-                if isinstance(string_list, str):
-                    try:
-                        # Attempt to use ast.literal_eval
-                        return ast.literal_eval(string_list)
-                    except (ValueError, SyntaxError):
-                        # If not a valid literal, attempt string splitting
-                        cleaned_string = string_list.strip("'")
-                        items = [item.strip().strip("'") for item in cleaned_string.split(', ')]
-                        return items
-                elif isinstance(string_list, list):
-                    return string_list  # If already a list, no conversion needed
-                return None  # Return None for other types
-
-            df[col] = df[col].apply(safe_eval)
+            df[col] = pd.Series(parse_list_column(df[col]).to_lists(), index=df.index, dtype=object)
         else:
             print(f"Column '{col}' not found in DataFrame.")
     return df
 
-def load_data():
+def parse_list_columns(df, columns_to_parse):
+    """
+    Parses the list-like string columns of a DataFrame into compact ListColumns.
+
+    Unlike convert_string_list_columns the DataFrame is left unchanged, so
+    no Python list is built per row.
+
+    Args:
+        df (pd.DataFrame): The DataFrame to read.
+        columns_to_parse (list): A list of column names to parse.
+
+    Returns:
+        dict: Column name -> ListColumn, for the columns present in df.
+    """
+    parsed = {}
+    for col in columns_to_parse:
+        if col in df.columns:
+            parsed[col] = parse_list_column(df[col])
+        else:
+            print(f"Column '{col}' not found in DataFrame.")
+    return parsed
+
+def load_data(timings=None, property_lists=None):
+    """
+    Loads the dashboard CSVs and prepares them for the callbacks.
+
+    Args:
+        timings (dict, optional): If given, filled with the wall time in
+            seconds spent in each loading step.
+        property_lists (dict, optional): If given, the LIST_COLUMNS of the
+            properties are parsed into it as ListColumns and stay strings in
+            the frame. Otherwise the frame's columns hold Python lists.
+
+    Returns:
+        tuple: The properties, contracts, renters and city DataFrames.
+    """
+    if timings is None:
+        timings = {}
+    start = time.perf_counter()
+
     # Load raw CSVs
-    properties = pd.read_csv('../data/properties_clean_list.csv')
-    contracts = pd.read_csv('../data/contracts.csv')
-    df = pd.read_csv('../data/cleaned_renters.csv', parse_dates=['Registered At'])
-    city_df = pd.read_csv('../data/city_df.csv')
+    properties = pd.read_csv(DATA_FILES['properties'])
+    contracts = pd.read_csv(DATA_FILES['contracts'])
+    df = pd.read_csv(DATA_FILES['df'], parse_dates=['Registered At'])
+    city_df = pd.read_csv(DATA_FILES['city_df'])
+    timings['read_csv'] = time.perf_counter() - start
 
     # Merge city info
+    step = time.perf_counter()
     df = df.merge(city_df, how='left', left_on='City_extracted', right_on='City')
+    timings['merge_cities'] = time.perf_counter() - step
 
     # Convert date columns and extract year
+    step = time.perf_counter()
     properties['Date'] = pd.to_datetime(properties['Available From'])
     properties['Year'] = properties['Date'].dt.year
     contracts['Date'] = pd.to_datetime(contracts['Signed Date'])
+    timings['parse_dates'] = time.perf_counter() - step
 
     # Process list-like string columns in properties
-    columns_to_process = ['Furnishings', 'Safety Features', 'Amenities', 'House Rules']
-    properties = convert_string_list_columns(properties, columns_to_process)
+    step = time.perf_counter()
+    if property_lists is None:
+        properties = convert_string_list_columns(properties, LIST_COLUMNS)
+    else:
+        property_lists.update(parse_list_columns(properties, LIST_COLUMNS))
+    timings['list_columns'] = time.perf_counter() - step
 
+    timings['total'] = time.perf_counter() - start
     return properties, contracts, df, city_df
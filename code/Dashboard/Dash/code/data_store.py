@@ -0,0 +1,236 @@
+import gc
+import os
+import threading
+import time
+from data_loader import DATA_FILES
+from filter_engine import PropertyFilter
+from item_matrix import build_item_matrix
+from kpi_aggregates import ContractKPIs
+from price_cube import PriceCube
+from renter_analytics import RenterAnalytics
+from snapshot import load_prepared, snapshot_lock, sources_digest
+
+# Check the source CSVs for changes this often, in seconds (0: never reload)
+DATA_RELOAD_SECONDS = float(os.environ.get('DATA_RELOAD_SECONDS', '0'))
+
+
+class DataStore:
+    """
+    Holds the prepared dashboard DataFrames for the lifetime of a process.
+
+    Attributes:
+        properties (pd.DataFrame): Property listings with parsed dates; the columns in
+            property_lists stay list-literal strings here.
+        property_lists (dict): The properties' list columns by name, as
+            ListColumns. Their Python lists are only built by callers that
+            need them (ListColumn.to_lists()).
+        contracts (pd.DataFrame): Contracts with a parsed 'Date' column.
+        df (pd.DataFrame): Renters merged with city coordinates.
+        city_df (pd.DataFrame): City coordinates.
+        property_filter (PropertyFilter): Row indexes for the property-tab filters.
+        price_cube (PriceCube): Monthly price sums and counts for the price chart.
+        renter_analytics (RenterAnalytics): Renter-tab aggregates per year and province.
+        wordcloud_items (ItemMatrix): Property-by-item counts for the word cloud.
+        contract_kpis (ContractKPIs): Monthly contract aggregates for the KPI cards.
+        timings (dict): Seconds spent in each loading step, plus 'total'.
+        source_digest (str): Hash of the source CSVs the frames were built from.
+        version (int): Data version, sent to the browser instead of the data itself.
+        loaded_at (float): Unix timestamp of when the data was loaded.
+    """
+
+    def __init__(self, properties, contracts, df, city_df, timings, source_digest=None, version=1,
+                 property_lists=None):
+        self.properties = properties
+        self.property_lists = property_lists or {}
+        self.contracts = contracts
+        self.df = df
+        self.city_df = city_df
+        self.timings = timings
+        self.source_digest = source_digest
+        self.version = version
+
+        step = time.perf_counter()
+        self.property_filter = PropertyFilter(properties)
+        timings['property_filter'] = time.perf_counter() - step
+
+        step = time.perf_counter()
+        self.price_cube = PriceCube(properties)
+        timings['price_cube'] = time.perf_counter() - step
+
+        step = time.perf_counter()
+        self.wordcloud_items = build_item_matrix(properties, property_lists=self.property_lists)
+        timings['wordcloud_items'] = time.perf_counter() - step
+
+        step = time.perf_counter()
+        self.renter_analytics = RenterAnalytics(df)
+        timings['renter_analytics'] = time.perf_counter() - step
+
+        step = time.perf_counter()
+        self.contract_kpis = ContractKPIs(contracts)
+        timings['contract_kpis'] = time.perf_counter() - step
+        self.loaded_at = time.time()
+
+    def frames(self):
+        """Returns the frames in the same order as load_data()."""
+        return self.properties, self.contracts, self.df, self.city_df
+
+
+_store = None
+_store_lock = threading.Lock()
+_reload_lock = threading.Lock()
+_reloader = None
+_reloader_lock = threading.Lock()
+
+
+def _build_store(version):
+    timings = {}
+    # Digest first: if a CSV changes during the load, the next check sees it and reloads again
+    digest = sources_digest()
+    property_lists = {}
+    frames = load_prepared(timings, property_lists=property_lists)
+    return DataStore(*frames, timings=timings, source_digest=digest, version=version,
+                     property_lists=property_lists)
+
+
+def get_store():
+    """
+    Returns the process-wide DataStore, loading the data on first use.
+
+    Every caller in the process shares the same frames, so app.py and
+    register_callbacks no longer parse the CSVs separately. The frames come
+    from the Arrow snapshot when it matches the CSVs (see snapshot.py).
+
+    A reload replaces the store with a new one rather than changing it, so
+    a caller that takes the store once per request sees one consistent
+    version of the data for the whole request.
+
+    Returns:
+        DataStore: The shared data store.
+    """
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = _build_store(version=1)
+    return _store
+
+
+def swap_store(store):
+    """Makes store the one get_store() returns; requests already running keep the old one."""
+    global _store
+    with _store_lock:
+        _store = store
+
+
+def reload_store(force=False):
+    """
+    Rebuilds the store if the source CSVs changed, and swaps it in.
+
+    The new frames and indexes are built while the current store keeps
+    serving, so for the duration of a reload both are in memory.
+
+    Args:
+        force (bool): Rebuild even if the CSVs are unchanged.
+
+    Returns:
+        DataStore or None: The new store, or None if the data was unchanged.
+    """
+    with _reload_lock:
+        current = get_store()
+        with snapshot_lock():
+            if not force and sources_digest() == current.source_digest:
+                return None
+            start = time.perf_counter()
+            store = _build_store(version=current.version + 1)
+        swap_store(store)
+        print(f"Reloaded dashboard data as version {store.version} in {time.perf_counter() - start:.1f} s")
+        return store
+
+
+class DataReloader(threading.Thread):
+    """
+    Reloads the data in the background when a source CSV changes.
+
+    Every `interval` seconds the CSVs' sizes and modification times are
+    checked. A change is loaded once they have stayed the same for a whole
+    interval, so a file that is still being written is not read.
+
+    Args:
+        interval (float): Seconds between checks.
+    """
+
+    def __init__(self, interval):
+        super().__init__(name='data-reloader', daemon=True)
+        self.interval = interval
+        self.pid = os.getpid()
+        self._stop_event = threading.Event()
+
+    @staticmethod
+    def _signature():
+        try:
+            return tuple((os.stat(path).st_size, os.stat(path).st_mtime_ns) for path in DATA_FILES.values())
+        except OSError:
+            # A file is being replaced; check again next time
+            return None
+
+    def run(self):
+        # None: compare the store with the files once at start, in case they changed since it was loaded
+        checked, pending = None, None
+        while not self._stop_event.wait(self.interval):
+            signature = self._signature()
+            if signature is None or signature == checked:
+                continue
+            if signature != pending:
+                pending = signature
+                continue
+            checked = signature
+            try:
+                reload_store()
+            except Exception as e:
+                # Keep serving the current data; the next change to the files is tried again
+                print(f"Warning: could not reload dashboard data, still serving version {get_store().version}: {e}")
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def start_reloader(interval=DATA_RELOAD_SECONDS):
+    """
+    Starts the background reloader of this process, unless it is running.
+
+    Threads do not survive a fork, so a pre-forking server needs one per
+    worker: app.py calls this at the first request each process serves.
+
+    Args:
+        interval (float): Seconds between checks; 0 disables reloading.
+
+    Returns:
+        DataReloader or None: The running reloader.
+    """
+    global _reloader
+    if interval <= 0:
+        return None
+    if _reloader is None or _reloader.pid != os.getpid() or not _reloader.is_alive():
+        with _reloader_lock:
+            if _reloader is None or _reloader.pid != os.getpid() or not _reloader.is_alive():
+                _reloader = DataReloader(interval)
+                _reloader.start()
+    return _reloader
+
+
+def preload():
+    """
+    Loads the data in the current process and freezes it for forked workers.
+
+    Call this from a pre-fork server (e.g. gunicorn with preload_app) so the
+    frames are built once in the master. gc.freeze() moves the loaded objects
+    out of the collector's generations, which keeps the workers' garbage
+    collection from touching (and therefore copying) the shared pages.
+
+    Returns:
+        DataStore: The shared data store.
+    """
+    store = get_store()
+    gc.collect()
+    gc.freeze()
+    return store
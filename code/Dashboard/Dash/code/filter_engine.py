@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+# Property columns the property-tab filters and charts select on
+PROPERTY_FILTER_COLUMNS = ['Province', 'City', 'City_clean', 'Year', 'Property Type']
+
+
+class ColumnIndex:
+    """
+    Categorical codes and per-value row positions for one column.
+
+    Attributes:
+        codes (np.ndarray): int32 code of each row; -1 for missing values.
+        categories (pd.Index): Distinct values in order of first appearance.
+        positions (dict): Value -> sorted int64 array of the rows holding it.
+    """
+
+    def __init__(self, values):
+        codes, categories = pd.factorize(values)
+        self.codes = codes.astype(np.int32)
+        self.categories = categories
+        order = np.argsort(self.codes, kind='stable')
+        bounds = np.searchsorted(self.codes[order], np.arange(len(categories) + 1))
+        self.positions = {
+            value: order[bounds[i]:bounds[i + 1]]
+            for i, value in enumerate(categories)
+        }
+
+    def rows(self, values):
+        """Returns the sorted rows holding any of `values` (unknown values match nothing)."""
+        parts = [self.positions[v] for v in values if v in self.positions]
+        if not parts:
+            return np.empty(0, dtype=np.int64)
+        return parts[0] if len(parts) == 1 else np.sort(np.concatenate(parts))
+
+
+class PropertyFilter:
+    """
+    Resolves property-tab filter selections to row masks without copying the frame.
+
+    Each filter column is indexed once at load time. A selection is the OR of
+    its values' row sets, and selections on different columns are ANDed, which
+    matches chaining `isin` masks on the frame.
+    """
+
+    def __init__(self, properties, columns=PROPERTY_FILTER_COLUMNS):
+        self.n_rows = len(properties)
+        self.indexes = {col: ColumnIndex(properties[col]) for col in columns if col in properties.columns}
+
+    def mask(self, filters=None, year_range=None):
+        """
+        Builds a boolean row mask for a selection.
+
+        Args:
+            filters (dict, optional): Column -> selected values. None or empty
+                selections do not filter.
+            year_range (tuple, optional): Inclusive (start, end) on 'Year'.
+
+        Returns:
+            np.ndarray: Boolean mask over the properties rows.
+        """
+        mask = np.ones(self.n_rows, dtype=bool)
+        selections = [(col, values) for col, values in (filters or {}).items() if values]
+        if year_range is not None:
+            start, end = year_range
+            years = self.indexes['Year'].categories
+            selections.append(('Year', years[(years >= start) & (years <= end)]))
+
+        for col, values in selections:
+            selected = np.zeros(self.n_rows, dtype=bool)
+            selected[self.indexes[col].rows(values)] = True
+            mask &= selected
+        return mask
+
+    def value_counts(self, column, mask=None):
+        """
+        Counts the values of `column` over the masked rows.
+
+        Returns:
+            pd.Series: Counts in the same order as Series.value_counts().
+        """
+        index = self.indexes[column]
+        codes = index.codes if mask is None else index.codes[mask]
+        codes = codes[codes >= 0]
+        present, first_seen, counts = np.unique(codes, return_index=True, return_counts=True)
+        # Ties keep first-appearance order within the selection, as value_counts does
+        order = np.lexsort((first_seen, -counts))
+        values = index.categories[present[order]].rename(column)
+        return pd.Series(counts[order], index=values, name='count')
@@ -0,0 +1,14 @@
+# Gunicorn settings for serving the dashboard: gunicorn app:server
+# preload_app imports app.py once in the master, so the CSVs are parsed a
+# single time and the workers share the frames through copy-on-write.
+# With DATA_RELOAD_SECONDS set, every worker reloads changed CSVs on its own,
+# without a restart; frames loaded that way are no longer shared.
+from data_store import preload
+
+bind = "0.0.0.0:8050"
+workers = 4
+preload_app = True
+
+
+def on_starting(server):
+    preload()
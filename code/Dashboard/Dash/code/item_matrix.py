@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+
+# Property columns whose items feed the word cloud
+WORDCLOUD_LIST_COLUMNS = ['Household Items', 'Furnishings', 'Safety Features', 'Amenities', 'House Rules']
+WORDCLOUD_SCALAR_COLUMNS = ['Bed Type']
+
+
+class ItemMatrix:
+    """
+    A sparse property-by-item count matrix in CSR layout.
+
+    Row i counts the items of property i: vocab[indices[indptr[i]:indptr[i + 1]]].
+    An item that appears twice for a property appears twice in its row.
+
+    Attributes:
+        indptr (np.ndarray): int64 row offsets of length n_rows + 1.
+        indices (np.ndarray): int32 item codes into vocab.
+        vocab (np.ndarray): Object array of distinct items.
+    """
+
+    def __init__(self, indptr, indices, vocab):
+        self.indptr = indptr
+        self.indices = indices
+        self.vocab = vocab
+
+    def __len__(self):
+        return len(self.indptr) - 1
+
+    def counts(self, rows=None):
+        """
+        Sums the matrix over a set of rows.
+
+        Args:
+            rows (np.ndarray, optional): A boolean mask over the rows, or an
+                array of row positions. All rows if None.
+
+        Returns:
+            np.ndarray: The count of each vocab item over the selected rows.
+        """
+        if rows is None:
+            return np.bincount(self.indices, minlength=len(self.vocab))
+        rows = np.asarray(rows)
+        if rows.dtype == bool:
+            weights = np.repeat(rows, np.diff(self.indptr))
+            return np.bincount(self.indices, weights=weights, minlength=len(self.vocab)).astype(np.int64)
+        starts, ends = self.indptr[rows], self.indptr[rows + 1]
+        lengths = ends - starts
+        # Positions of every item in the selected rows, without a Python loop
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        return np.bincount(self.indices[positions], minlength=len(self.vocab))
+
+    def frequencies(self, rows=None):
+        """
+        Returns the item frequencies over a set of rows, for WordCloud.
+
+        Args:
+            rows (np.ndarray, optional): A boolean mask or row positions.
+
+        Returns:
+            dict: Item -> count, for items with a non-zero count.
+        """
+        counts = self.counts(rows)
+        nonzero = np.flatnonzero(counts)
+        return dict(zip(self.vocab[nonzero].tolist(), counts[nonzero].tolist()))
+
+
+def _list_items(column):
+    """Row positions and items of a ListColumn, as build_item_matrix collects them."""
+    vocab = np.array([str(word).strip() for word in column.vocab], dtype=object)
+    rows = [np.repeat(np.arange(len(column), dtype=np.int64), column.lengths)]
+    items = [vocab[column.codes]]
+    # Rows that parsed to something other than a list of strings; only lists count
+    for i, value in sorted(column.overrides.items()):
+        if isinstance(value, list):
+            rows.append(np.full(len(value), i, dtype=np.int64))
+            items.append(np.array([str(word).strip() for word in value], dtype=object))
+    return rows, items
+
+
+def build_item_matrix(properties, list_columns=WORDCLOUD_LIST_COLUMNS, scalar_columns=WORDCLOUD_SCALAR_COLUMNS,
+                      property_lists=None):
+    """
+    Builds the word cloud's item matrix from the prepared properties frame.
+
+    Items are collected the way update_wordcloud used to: every element of the
+    list-valued cells in `list_columns` (cells that are not lists, such as the
+    unparsed 'Household Items' strings, are skipped) plus every non-null value
+    of `scalar_columns`, each converted with str() and stripped. Empty items
+    are dropped since WordCloud would never draw them.
+
+    Columns found in `property_lists` are read from their ListColumn, without
+    building a Python list per row.
+
+    Args:
+        properties (pd.DataFrame): The prepared properties frame.
+        list_columns (list): Columns holding lists of items.
+        scalar_columns (list): Columns holding a single item.
+        property_lists (dict, optional): Parsed list columns by name, as
+            filled by load_data().
+
+    Returns:
+        ItemMatrix: The property-by-item count matrix.
+    """
+    property_lists = property_lists or {}
+    rows, items = [], []
+    for col in list_columns:
+        if col in property_lists:
+            col_rows, col_items = _list_items(property_lists[col])
+            rows.extend(col_rows)
+            items.extend(col_items)
+            continue
+        if col not in properties.columns:
+            continue
+        col_rows, col_items = [], []
+        for i, item_list in enumerate(properties[col].tolist()):
+            if isinstance(item_list, list):
+                col_rows.extend([i] * len(item_list))
+                col_items.extend(str(word).strip() for word in item_list)
+        rows.append(np.array(col_rows, dtype=np.int64))
+        items.append(np.array(col_items, dtype=object))
+    for col in scalar_columns:
+        if col not in properties.columns:
+            continue
+        values = properties[col]
+        present = np.flatnonzero(values.notna().to_numpy())
+        rows.append(present.astype(np.int64))
+        items.append(np.array([str(value).strip() for value in values.iloc[present]], dtype=object))
+
+    rows = np.concatenate(rows) if rows else np.empty(0, dtype=np.int64)
+    items = np.concatenate(items) if items else np.empty(0, dtype=object)
+    keep = items != ''
+    rows, items = rows[keep], items[keep]
+    order = np.argsort(rows, kind='stable')
+    codes, vocab = pd.factorize(items[order])
+    indptr = np.zeros(len(properties) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=len(properties)), out=indptr[1:])
+    return ItemMatrix(indptr, codes.astype(np.int32), np.asarray(vocab, dtype=object))
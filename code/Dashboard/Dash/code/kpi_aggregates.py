@@ -0,0 +1,68 @@
+import bisect
+import math
+import pandas as pd
+
+
+class ContractKPIs:
+    """
+    Monthly contract aggregates behind the Active / Signed / Avg. Price cards.
+
+    For each month of 'Date' it keeps the row count, the count per 'Status'
+    and the sum and count of non-null 'Room Rent', so the cards are dictionary
+    lookups for any month instead of scans over the contracts frame. The
+    aggregates are built once; new data gets a new DataStore and with it a
+    new ContractKPIs.
+
+    Args:
+        contracts (pd.DataFrame): Contracts with 'Date', 'Status' and 'Room Rent'.
+
+    Attributes:
+        months (list): Sorted pd.Period months that have at least one contract.
+        total (int): Number of contracts, including ones without a date.
+        status_totals (dict): Status -> number of contracts, over all dates.
+    """
+
+    def __init__(self, contracts):
+        dates = pd.to_datetime(contracts['Date'], errors='coerce')
+        valid = contracts.assign(YearMonth=dates.dt.to_period('M')).dropna(subset=['YearMonth'])
+        rows = valid.groupby('YearMonth').size()
+        status = valid.groupby(['YearMonth', 'Status']).size()
+        rent = valid.groupby('YearMonth')['Room Rent'].agg(['sum', 'count'])
+
+        self.total = len(contracts)
+        self.status_totals = {key: int(count) for key, count in contracts['Status'].value_counts().items()}
+        self._by_month = {
+            month: {
+                'rows': int(count), 'status': {},
+                'rent_sum': float(rent.at[month, 'sum']), 'rent_count': int(rent.at[month, 'count']),
+            }
+            for month, count in rows.items()
+        }
+        for (month, key), count in status.items():
+            self._by_month[month]['status'][key] = int(count)
+        self.months = sorted(self._by_month)
+
+    def latest_month(self):
+        """Returns the most recent month with contracts, or None."""
+        return self.months[-1] if self.months else None
+
+    def previous_month(self, month):
+        """Returns the most recent month with contracts before `month`, or None."""
+        i = bisect.bisect_left(self.months, month)
+        return self.months[i - 1] if i > 0 else None
+
+    def has_month(self, month):
+        return month in self._by_month
+
+    def status_count(self, status, month=None):
+        """Number of contracts with `status` in `month`, or over all dates if None."""
+        if month is None:
+            return self.status_totals.get(status, 0)
+        return self._by_month.get(month, {}).get('status', {}).get(status, 0)
+
+    def average_rent(self, month):
+        """Mean non-null 'Room Rent' in `month`; NaN if there is none."""
+        entry = self._by_month.get(month)
+        if not entry or entry['rent_count'] == 0:
+            return math.nan
+        return entry['rent_sum'] / entry['rent_count']
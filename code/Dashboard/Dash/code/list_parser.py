@@ -0,0 +1,141 @@
+import ast
+import re
+import numpy as np
+import pandas as pd
+
+# A quoted item with no escapes, newlines or record separators; anything fancier takes the slow path
+_ITEM = r"""(?:'[^'\\\n\x1e]*'|"[^"\\\n\x1e]*")"""
+# A well-formed list literal made only of such items, e.g. "['a', "b's"]"
+_SIMPLE_LIST_RE = re.compile(rf"\[\s*(?:{_ITEM}\s*(?:,\s*{_ITEM}\s*)*,?\s*)?\]")
+# One token per quoted item (quotes included), plus the record separator between rows
+_TOKEN_RE = re.compile(r"""'[^'\\\n\x1e]*'|"[^"\\\n\x1e]*"|\x1e""")
+
+
+def safe_eval(string_list):
+    """Safely evaluates a string, returning a list or None."""
+    if isinstance(string_list, str):
+        try:
+            # Attempt to use ast.literal_eval
+            return ast.literal_eval(string_list)
+        except (ValueError, SyntaxError):
+            # If not a valid literal, attempt string splitting
+            cleaned_string = string_list.strip("'")
+            items = [item.strip().strip("'") for item in cleaned_string.split(', ')]
+            return items
+    elif isinstance(string_list, list):
+        return string_list  # If already a list, no conversion needed
+    return None  # Return None for other types
+
+
+class ListColumn:
+    """
+    A column of string lists stored as offsets into one array of item codes.
+
+    Row i holds the items vocab[codes[offsets[i]:offsets[i + 1]]]. This is the
+    CSR layout of a row-by-item count matrix, so it can be summed over a row
+    mask without building Python lists.
+
+    Attributes:
+        offsets (np.ndarray): int64 array of length n_rows + 1.
+        codes (np.ndarray): int32 item codes into vocab.
+        vocab (np.ndarray): Object array of distinct item strings.
+        is_null (np.ndarray): Boolean array marking rows that evaluated to None.
+        overrides (dict): Row position -> value for rows that did not evaluate to
+            a list of strings (e.g. a tuple literal); those rows have no codes.
+    """
+
+    def __init__(self, offsets, codes, vocab, is_null, overrides=None):
+        self.offsets = offsets
+        self.codes = codes
+        self.vocab = vocab
+        self.is_null = is_null
+        self.overrides = overrides or {}
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def lengths(self):
+        """Number of items in each row."""
+        return np.diff(self.offsets)
+
+    def to_lists(self):
+        """
+        Rebuilds the Python objects convert_string_list_columns used to produce.
+
+        Returns:
+            list: One list (or None, or the override value) per row.
+        """
+        items = self.vocab[self.codes].tolist()
+        bounds = self.offsets.tolist()
+        rows = [items[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+        for i in np.flatnonzero(self.is_null):
+            rows[i] = None
+        for i, value in self.overrides.items():
+            rows[i] = value
+        return rows
+
+
+def _is_str_list(value):
+    return isinstance(value, list) and all(isinstance(item, str) for item in value)
+
+
+def parse_list_column(values):
+    """
+    Parses a column of list literals such as "['Desk', 'Lamp']" in bulk.
+
+    Well-formed literals of plain quoted strings are tokenized together with a
+    single regex pass over the joined text and interned with pd.factorize.
+    Everything else (malformed strings, escapes, existing lists, non-strings)
+    goes through safe_eval row by row, so the result matches
+    convert_string_list_columns exactly.
+
+    Args:
+        values (pd.Series or sequence): The raw column values.
+
+    Returns:
+        ListColumn: The parsed column.
+    """
+    values = pd.Series(values, copy=False).to_numpy(dtype=object)
+    n = len(values)
+    is_fast = np.fromiter(
+        (isinstance(v, str) and _SIMPLE_LIST_RE.fullmatch(v) is not None for v in values),
+        dtype=bool, count=n,
+    )
+
+    # Fast path: one regex pass over all well-formed literals joined by \x1e.
+    # Tokens are interned with their quotes; only the small vocabulary is unquoted.
+    fast_idx = np.flatnonzero(is_fast)
+    fast_rows = np.empty(0, dtype=np.int64)
+    fast_codes = np.empty(0, dtype=np.int64)
+    fast_vocab = np.empty(0, dtype=object)
+    if len(fast_idx):
+        tokens = np.array(_TOKEN_RE.findall('\x1e'.join(values[fast_idx])), dtype=object)
+        is_sep = tokens == '\x1e'
+        fast_rows = fast_idx[np.cumsum(is_sep)[~is_sep]]
+        fast_codes, quoted = pd.factorize(tokens[~is_sep])
+        fast_vocab = np.array([token[1:-1] for token in quoted], dtype=object)
+
+    # Slow path: the original per-row semantics
+    is_null = np.zeros(n, dtype=bool)
+    overrides = {}
+    slow_rows, slow_items = [], []
+    for i in np.flatnonzero(~is_fast):
+        parsed = safe_eval(values[i])
+        if parsed is None:
+            is_null[i] = True
+        elif _is_str_list(parsed):
+            slow_rows.extend([i] * len(parsed))
+            slow_items.extend(parsed)
+        else:
+            overrides[i] = parsed
+
+    # Intern both paths into one vocabulary, then put the codes in row order
+    slow_items = np.array(slow_items, dtype=object)
+    vocab_codes, vocab = pd.factorize(np.concatenate([fast_vocab, slow_items]))
+    item_rows = np.concatenate([fast_rows, np.array(slow_rows, dtype=np.int64)])
+    item_codes = np.concatenate([vocab_codes[fast_codes], vocab_codes[len(fast_vocab):]])
+    order = np.argsort(item_rows, kind='stable')
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(item_rows, minlength=n), out=offsets[1:])
+    return ListColumn(offsets, item_codes[order].astype(np.int32), np.asarray(vocab, dtype=object), is_null, overrides)
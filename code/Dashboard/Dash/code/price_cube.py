@@ -0,0 +1,54 @@
+import numpy as np
+import pandas as pd
+
+# Dimensions the price chart can filter or group on
+PRICE_CUBE_DIMENSIONS = ['Year', 'Province', 'City_clean', 'City', 'Property Type']
+
+
+class PriceCube:
+    """
+    Monthly price sums and counts over every filter combination of the price chart.
+
+    The cube has one row per (YearMonth, Year, Province, City_clean, City,
+    Property Type) combination present in the data, with the sum and count of
+    non-null 'Price'. A chart query filters the cube and re-aggregates it, so
+    averages are exact (sum / count) and the cost depends on the number of
+    combinations rather than on the number of properties.
+
+    Attributes:
+        cube (pd.DataFrame): The aggregated rows, with 'price_sum' and 'price_count'.
+    """
+
+    def __init__(self, properties):
+        dates = pd.to_datetime(properties['Date'], errors='coerce')
+        valid = properties.loc[dates.notna(), PRICE_CUBE_DIMENSIONS + ['Price']]
+        valid = valid.assign(YearMonth=dates[dates.notna()].dt.to_period('M').dt.to_timestamp())
+        self.cube = (
+            valid.groupby(['YearMonth'] + PRICE_CUBE_DIMENSIONS, dropna=False, sort=False)['Price']
+            .agg(price_sum='sum', price_count='count')
+            .reset_index()
+        )
+
+    def monthly_average(self, filters=None, group_col=None):
+        """
+        Average 'Price' per month for a selection, optionally split by a column.
+
+        Args:
+            filters (dict, optional): Column -> selected values; None or empty
+                selections do not filter.
+            group_col (str, optional): A dimension to split the lines by.
+
+        Returns:
+            pd.DataFrame: 'YearMonth', the group column if any, and 'Price',
+                matching a groupby(...)['Price'].mean() over the filtered rows.
+        """
+        cube = self.cube
+        mask = np.ones(len(cube), dtype=bool)
+        for col, values in (filters or {}).items():
+            if values:
+                mask &= cube[col].isin(values).to_numpy()
+
+        keys = ['YearMonth'] + ([group_col] if group_col else [])
+        totals = cube.loc[mask].groupby(keys)[['price_sum', 'price_count']].sum()
+        price = totals['price_sum'] / totals['price_count'].where(totals['price_count'] > 0)
+        return price.rename('Price').reset_index()
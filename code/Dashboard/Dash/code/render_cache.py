@@ -0,0 +1,227 @@
+import hashlib
+import os
+import shutil
+import threading
+from collections import OrderedDict
+
+
+def filter_cache_key(selected_provinces, selected_cities, selected_years, selected_type):
+    """
+    Canonicalizes a filter selection so equivalent selections share a key.
+
+    Multi-select values are de-duplicated and sorted (so ['AB', 'BC'] and
+    ['BC', 'AB'] match), years are normalized to int, and an empty selection
+    is treated like no selection.
+
+    Returns:
+        tuple: A hashable key for the selection.
+    """
+    return (
+        tuple(sorted(set(selected_provinces or ()))),
+        tuple(sorted(set(selected_cities or ()))),
+        tuple(sorted({int(y) for y in selected_years or ()})),
+        selected_type,
+    )
+
+
+class RenderCache:
+    """
+    A thread-safe LRU cache of rendered images (data URI strings).
+
+    The cache is bounded both by entry count and by the total size of the
+    cached strings. With `cache_dir` set, entries are also written to disk, one
+    file per key, so a warm cache survives restarts. The files are bounded by
+    `max_disk_bytes` (max_bytes if not given): when a write goes over it, the
+    least recently used files (oldest modification time; a disk hit touches
+    its file) are deleted, including files other processes wrote.
+
+    Attributes:
+        hits (int): Lookups answered from memory or disk.
+        misses (int): Lookups that required rendering.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024, cache_dir=None, namespace='',
+                 max_disk_bytes=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_bytes if max_disk_bytes is None else max_disk_bytes
+        self.cache_dir = os.path.join(cache_dir, namespace) if cache_dir and namespace else cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # Cache files, least recently used first, with their sizes
+        self._files = OrderedDict()
+        self._disk_bytes = 0
+        self._disk_lock = threading.Lock()
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with self._disk_lock:
+                self._scan_disk()
+
+    def _path(self, key):
+        digest = hashlib.sha256(repr(key).encode()).hexdigest()
+        return os.path.join(self.cache_dir, f'{digest}.txt')
+
+    def _store(self, key, value):
+        if key in self._entries:
+            self._bytes -= len(self._entries.pop(key))
+        self._entries[key] = value
+        self._bytes += len(value)
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted)
+
+    def _scan_disk(self):
+        """Re-reads the cache files and their sizes from cache_dir, oldest first."""
+        files = []
+        try:
+            with os.scandir(self.cache_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith('.txt'):
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue
+                        files.append((stat.st_mtime_ns, entry.path, stat.st_size))
+        except OSError:
+            return
+        files.sort()
+        self._files = OrderedDict((path, size) for _, path, size in files)
+        self._disk_bytes = sum(self._files.values())
+
+    def _record_file(self, path, size):
+        """Marks a cache file as most recently used, then trims the directory to max_disk_bytes."""
+        with self._disk_lock:
+            self._disk_bytes += size - self._files.pop(path, 0)
+            self._files[path] = size
+            if self._disk_bytes <= self.max_disk_bytes:
+                return
+            # Other processes may share the directory: trim what is actually there
+            self._scan_disk()
+            while self._files and self._disk_bytes > self.max_disk_bytes:
+                oldest, size = self._files.popitem(last=False)
+                self._disk_bytes -= size
+                try:
+                    os.remove(oldest)
+                except OSError:
+                    pass
+
+    def get(self, key):
+        """Returns the cached value for `key`, or None on a miss."""
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+        if self.cache_dir:
+            path = self._path(key)
+            try:
+                with open(path) as f:
+                    value = f.read()
+            except OSError:
+                value = None
+            if value is not None:
+                try:
+                    os.utime(path)
+                except OSError:
+                    pass
+                self._record_file(path, len(value))
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._store(key, value)
+        return value
+
+    def put(self, key, value):
+        """Caches `value` under `key`, evicting least recently used entries."""
+        with self._lock:
+            self._store(key, value)
+        if self.cache_dir:
+            path = self._path(key)
+            tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            try:
+                with open(tmp_path, 'w') as f:
+                    f.write(value)
+                os.replace(tmp_path, path)
+                self._record_file(path, len(value))
+            except FileNotFoundError:
+                # The directory was deleted because newer data replaced this cache
+                pass
+            except OSError as e:
+                print(f"Could not persist cached image to '{path}': {e}")
+
+    def get_or_render(self, key, render):
+        """Returns the cached value for `key`, calling render() on a miss."""
+        value = self.get(key)
+        if value is None:
+            value = render()
+            self.put(key, value)
+        return value
+
+    def stats(self):
+        """Returns hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'disk_bytes': self._disk_bytes,
+            }
+
+
+class VersionedRenderCache:
+    """
+    One RenderCache per data version, for images rendered from the DataStore.
+
+    The cache of a version is created when a request first uses that
+    version and replaces the previous version's, whose entries are then
+    dropped, on disk too: the previous namespace's directory is deleted.
+    Requests still running on a replaced version render without caching,
+    so they never fill the new cache with old images.
+
+    Args:
+        **cache_args: Passed to each RenderCache (max_entries, cache_dir, ...).
+    """
+
+    def __init__(self, **cache_args):
+        self.cache_args = cache_args
+        self.version = None
+        self.cache = None
+        self._lock = threading.Lock()
+
+    def for_version(self, version, namespace=''):
+        """
+        Returns the cache of a data version, or None if a newer version replaced it.
+
+        Args:
+            version (int): DataStore.version of the data being rendered.
+            namespace (str): Subdirectory of cache_dir for this data, e.g.
+                its source digest, so disk entries are never shared across
+                different data.
+        """
+        with self._lock:
+            if self.version is None or version > self.version:
+                previous = self.cache
+                self.version = version
+                self.cache = RenderCache(**self.cache_args, namespace=namespace)
+                if previous is not None and previous.cache_dir and previous.cache_dir != self.cache.cache_dir:
+                    shutil.rmtree(previous.cache_dir, ignore_errors=True)
+            return self.cache if version == self.version else None
+
+    def get_or_render(self, version, namespace, key, render):
+        cache = self.for_version(version, namespace)
+        return cache.get_or_render(key, render) if cache is not None else render()
+
+    def stats(self):
+        """The current version's cache stats, with the version (0 before the first use)."""
+        cache = self.cache
+        stats = cache.stats() if cache is not None else RenderCache().stats()
+        return {**stats, 'version': self.version or 0}
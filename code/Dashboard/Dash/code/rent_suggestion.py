@@ -0,0 +1,143 @@
+import os
+import sys
+import threading
+import datetime
+import pandas as pd
+from dash import html, dcc
+from dash.dependencies import Input, Output
+from style import dashboard_style
+
+# Set to a model saved by code/PricePredictions/rent_predictor.py to show the Suggested Rent tab
+RENT_MODEL_PATH = os.environ.get('RENT_MODEL_PATH')
+# The saved model needs the PricePredictions modules to unpickle and derive its features
+PRICE_PREDICTIONS_DIR = os.environ.get(
+    'PRICE_PREDICTIONS_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..', 'PricePredictions'),
+)
+
+# Home Details list fields, keyed by the prefix of their feature columns
+ITEM_FIELDS = {'Furnishing': 'Furnishings', 'Safety': 'Safety Features', 'Amenity': 'Amenities'}
+
+_predictor = None
+_predictor_lock = threading.Lock()
+_load_failed = False
+
+
+def enabled():
+    return bool(RENT_MODEL_PATH)
+
+
+def get_predictor():
+    """
+    Returns the saved RentPredictor, loading it on first use.
+
+    The model is loaded once per process and shared by every request, so a
+    suggestion only encodes and scores one listing.
+
+    Returns:
+        RentPredictor or None: None when RENT_MODEL_PATH is unset or the
+        model cannot be loaded.
+    """
+    global _predictor, _load_failed
+    if _predictor is None and enabled() and not _load_failed:
+        with _predictor_lock:
+            if _predictor is None and not _load_failed:
+                try:
+                    if PRICE_PREDICTIONS_DIR not in sys.path:
+                        sys.path.append(PRICE_PREDICTIONS_DIR)
+                    from rent_predictor import RentPredictor
+                    _predictor = RentPredictor.load(RENT_MODEL_PATH)
+                except Exception as e:
+                    # Any unreadable model (truncated, from another version, ...) disables the tab
+                    print(f"Warning: Suggested Rent disabled, could not load {RENT_MODEL_PATH}: "
+                          f"{type(e).__name__}: {e}")
+                    _load_failed = True
+    return _predictor
+
+
+def item_options(predictor):
+    """The Home Details items the model knows, as {list field: [items]}."""
+    options = {field: [] for field in ITEM_FIELDS.values()}
+    for column in predictor.encoder.numeric_columns:
+        prefix, _, item = column.partition(': ')
+        if prefix in ITEM_FIELDS and item:
+            options[ITEM_FIELDS[prefix]].append(item)
+    return options
+
+
+def listing_from_form(city, months, utilities, items, start=None):
+    """Builds a listing in the contracts export's format from the form's values."""
+    start = start or datetime.date.today()
+    end = (pd.Timestamp(start) + pd.DateOffset(months=int(months))).date()
+    details = ''.join(f"{field}: {', '.join(values)};\n" for field, values in items.items() if values)
+    return {
+        'City': city,
+        'Room Utilities': utilities,
+        'Home Details': details,
+        'Start Date': start.isoformat(),
+        'End Date': end.isoformat(),
+        'Created Date': start.isoformat(),
+    }
+
+
+def suggestion_layout():
+    predictor = get_predictor()
+    if predictor is None:
+        return html.Div(style={'padding': '20px'}, children=[
+            html.P("No rent model is loaded; set RENT_MODEL_PATH to a model saved by rent_predictor.py.")
+        ])
+    cities = sorted(predictor.encoder.cities or getattr(predictor.encoder, 'city_means', {}))
+    options = item_options(predictor)
+    return html.Div(style={'padding': '20px'}, children=[
+        html.Div(style=dashboard_style, children=[
+            html.H4("Suggested Rent", className="mb-3", style={'textAlign': 'center'}),
+            html.Div(style={'display': 'flex', 'marginBottom': '20px'}, children=[
+                html.Div(style={'width': '34%', 'paddingRight': '10px'}, children=[
+                    html.Label('City:'),
+                    dcc.Dropdown(id='rent-city', options=[{'label': c, 'value': c} for c in cities],
+                                 placeholder='Select City'),
+                ]),
+                html.Div(style={'width': '33%', 'paddingRight': '10px'}, children=[
+                    html.Label('Contract length (months):'),
+                    dcc.Input(id='rent-months', type='number', min=1, max=36, step=1, value=12),
+                ]),
+                html.Div(style={'width': '33%'}, children=[
+                    html.Label('Utilities ($/month):'),
+                    dcc.Input(id='rent-utilities', type='number', min=0, step=10, value=0),
+                ]),
+            ]),
+            html.Div(style={'display': 'flex', 'marginBottom': '20px'}, children=[
+                html.Div(style={'width': f'{100 // len(options)}%', 'paddingRight': '10px'}, children=[
+                    html.Label(f'{field}:'),
+                    dcc.Dropdown(id=f'rent-items-{i}', options=[{'label': v, 'value': v} for v in values],
+                                 multi=True, placeholder=f'Select {field}'),
+                ])
+                for i, (field, values) in enumerate(options.items())
+            ]),
+            html.H2(id='rent-suggestion', style={'textAlign': 'center'}),
+            html.P(f"{predictor.metadata.get('model', '')} model trained {predictor.metadata.get('trained_at', '')} "
+                   f"on {predictor.metadata.get('training_rows', '?')} contracts",
+                   style={'textAlign': 'center', 'color': '#6c757d'}),
+        ])
+    ])
+
+
+def register_rent_callbacks(app):
+    if not enabled():
+        return
+    fields = list(ITEM_FIELDS.values())
+
+    @app.callback(
+        Output('rent-suggestion', 'children'),
+        [Input('rent-city', 'value'), Input('rent-months', 'value'), Input('rent-utilities', 'value')]
+        + [Input(f'rent-items-{i}', 'value') for i in range(len(fields))],
+    )
+    def update_rent_suggestion(city, months, utilities, *items):
+        predictor = get_predictor()
+        if predictor is None or not city:
+            return "Select a city"
+        if not months or months <= 0:
+            return "Enter a contract length"
+        listing = listing_from_form(city, months, utilities,
+                                    {field: values or [] for field, values in zip(fields, items)})
+        return f"${predictor.predict_one(listing):,.0f} / month"
@@ -0,0 +1,186 @@
+import threading
+import numpy as np
+import pandas as pd
+
+# Renter budgets above this are left out of the budget box plot
+BUDGET_PLOT_MAX = 4000
+
+
+def _group_codes(df, keys):
+    """
+    Returns each row's group number and the group keys of df.groupby(keys).
+
+    Group numbers follow groupby's sorted key order; rows with a missing key
+    get -1, as groupby drops them.
+    """
+    grouped = df.groupby(keys)
+    codes = grouped.ngroup().fillna(-1).to_numpy(dtype=np.int64)
+    return codes, grouped.size().index
+
+
+def _value_counts(codes, categories, rows, name):
+    """Series.value_counts() of a factorized column over `rows`, in the same order."""
+    codes = codes[rows]
+    codes = codes[codes >= 0]
+    present, first_seen, counts = np.unique(codes, return_index=True, return_counts=True)
+    order = np.lexsort((first_seen, -counts))
+    return pd.Series(counts[order], index=categories[present[order]].rename(name), name='count')
+
+
+def _group_sizes(codes, keys, rows, name):
+    """df.groupby(keys).size().reset_index(name=name) over `rows`."""
+    counts = np.bincount(codes[rows][codes[rows] >= 0], minlength=len(keys))
+    present = np.flatnonzero(counts)
+    return pd.Series(counts[present], index=keys[present], name=name).reset_index()
+
+
+def box_stats(values):
+    """
+    Box plot statistics computed the way Plotly's box trace does it.
+
+    Quartiles use Plotly's default 'linear' method, which interpolates at
+    position p * n - 0.5 of the sorted values (numpy's 'hazen' method). The
+    whiskers end at the most extreme values within 1.5 IQR of the box, and
+    values beyond them are outliers. Repeated outliers are kept once since
+    they plot on the same spot.
+
+    Args:
+        values (np.ndarray): The sample, without NaNs.
+
+    Returns:
+        dict or None: 'q1', 'median', 'q3', 'lowerfence', 'upperfence' and
+            'outliers' (sorted distinct values), or None for an empty sample.
+    """
+    if len(values) == 0:
+        return None
+    values = np.sort(values)
+    q1, median, q3 = np.quantile(values, [0.25, 0.5, 0.75], method='hazen')
+    iqr = q3 - q1
+    inside = values[(values >= q1 - 1.5 * iqr) & (values <= q3 + 1.5 * iqr)]
+    lowerfence = min(q1, inside[0]) if len(inside) else q1
+    upperfence = max(q3, inside[-1]) if len(inside) else q3
+    outliers = np.unique(values[(values < lowerfence) | (values > upperfence)])
+    return {
+        'q1': float(q1), 'median': float(median), 'q3': float(q3),
+        'lowerfence': float(lowerfence), 'upperfence': float(upperfence),
+        'outliers': outliers,
+    }
+
+
+class RenterSummary:
+    """Everything the renter tab shows for one (year, province) selection."""
+
+    def __init__(self, kpi_city, kpi_renters, kpi_budget, geo, budget_box, lease, preference, top_cities):
+        self.kpi_city = kpi_city
+        self.kpi_renters = kpi_renters
+        self.kpi_budget = kpi_budget
+        self.geo = geo
+        self.budget_box = budget_box
+        self.lease = lease
+        self.preference = preference
+        self.top_cities = top_cities
+
+
+class RenterAnalytics:
+    """
+    Precomputed renter-tab aggregates for every year and province selection.
+
+    The renters frame is factorized once, and a RenterSummary is built for each
+    (year, province) pair, including 'All' on either side, at load time. Each
+    summary matches what update_dashboard used to compute from a filtered
+    copy of the frame: counts keep pandas' ordering, distinct IDs are exact,
+    and the budget box plot is reduced to its quartiles, whiskers and outliers.
+    """
+
+    def __init__(self, df):
+        self.n_rows = len(df)
+        registered = pd.to_datetime(df['Registered At'], errors='coerce')
+        self._year = registered.dt.year.to_numpy(dtype=float)
+        self._province_codes, provinces = pd.factorize(df['province_id_upper'])
+        self._province_lookup = {p: i for i, p in enumerate(provinces)}
+
+        self._city_codes, self._cities = pd.factorize(df['City_extracted'])
+        self._id_codes, _ = pd.factorize(df['ID'])
+        self._preference_codes, self._preferences = pd.factorize(df['Prefer Live With'])
+        self._renter_city_codes, self._renter_cities = pd.factorize(df['city'])
+        self._budget = df['Budget'].to_numpy(dtype=float)
+        self._geo_codes, self._geo_keys = _group_codes(df, ['City_extracted', 'Latitude', 'Longitude'])
+        lease_keys = pd.DataFrame({'Year': registered.dt.year, 'Lease Term': df['Lease Term']})
+        self._lease_codes, self._lease_keys = _group_codes(lease_keys, ['Year', 'Lease Term'])
+
+        self.years = sorted(int(y) for y in np.unique(self._year[~np.isnan(self._year)]))
+        self.provinces = sorted(provinces)
+        self._summaries = {}
+        self._lock = threading.Lock()
+        for year in ['All'] + self.years:
+            for province in ['All'] + self.provinces:
+                self._summaries[(year, province)] = self._summarize(year, province)
+
+    @staticmethod
+    def _key(selected_year, selected_province):
+        year = 'All' if selected_year is None or selected_year == 'All' else int(selected_year)
+        province = 'All' if selected_province is None or selected_province == 'All' else selected_province
+        return year, province
+
+    def summary(self, selected_year, selected_province):
+        """
+        Returns the RenterSummary for a dropdown selection.
+
+        Args:
+            selected_year: A registration year, 'All' or None.
+            selected_province: A province code, 'All' or None.
+
+        Returns:
+            RenterSummary: The precomputed aggregates for the selection.
+        """
+        key = self._key(selected_year, selected_province)
+        summary = self._summaries.get(key)
+        if summary is None:
+            # A year or province with no renters; cheap, but keep it for next time
+            summary = self._summarize(*key)
+            with self._lock:
+                self._summaries[key] = summary
+        return summary
+
+    def _rows(self, year, province):
+        mask = np.ones(self.n_rows, dtype=bool)
+        if year != 'All':
+            mask &= self._year == year
+        if province != 'All':
+            mask &= self._province_codes == self._province_lookup.get(province, -2)
+        return np.flatnonzero(mask)
+
+    def _summarize(self, year, province):
+        rows = self._rows(year, province)
+
+        # KPI 1: Top City
+        city_counts = _value_counts(self._city_codes, self._cities, rows, 'City_extracted')
+        if not city_counts.empty:
+            kpi_city = f"{city_counts.index[0]} ({int(city_counts.iloc[0])})"
+        else:
+            kpi_city = "N/A (0)"
+
+        # KPI 2: Unique Renters
+        ids = self._id_codes[rows]
+        kpi_renters = f"{len(np.unique(ids[ids >= 0])):,}"
+
+        # KPI 3: Avg Budget
+        budget = self._budget[rows]
+        budget = budget[~np.isnan(budget)]
+        kpi_budget = f"{budget.mean():.1f}" if len(budget) else "N/A"
+
+        preference = _value_counts(self._preference_codes, self._preferences, rows, 'Prefer Live With').reset_index()
+        preference.columns = ['Prefer Live With', 'Count']
+        top_cities = _value_counts(self._renter_city_codes, self._renter_cities, rows, 'city').head(5).reset_index()
+        top_cities.columns = ['city', 'Count']
+
+        return RenterSummary(
+            kpi_city=kpi_city,
+            kpi_renters=kpi_renters,
+            kpi_budget=kpi_budget,
+            geo=_group_sizes(self._geo_codes, self._geo_keys, rows, 'Registrations'),
+            budget_box=box_stats(budget[budget <= BUDGET_PLOT_MAX]),
+            lease=_group_sizes(self._lease_codes, self._lease_keys, rows, 'Count'),
+            preference=preference,
+            top_cities=top_cities,
+        )
@@ -0,0 +1,267 @@
+import ast
+import contextlib
+import hashlib
+import json
+import os
+import shutil
+import time
+import pandas as pd
+from data_loader import DATA_DIR, DATA_FILES, load_data
+from list_parser import ListColumn
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; there every process builds its own snapshot
+    fcntl = None
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pyarrow is optional; without it we always read the CSVs
+    pa = None
+    feather = None
+
+_SNAPSHOT_ERRORS = (OSError, ValueError, TypeError) + ((pa.ArrowException,) if pa else ())
+
+SNAPSHOT_DIR = os.path.join(DATA_DIR, '.snapshot')
+MANIFEST_NAME = 'manifest.json'
+# The parsed property list columns, next to the frames
+PROPERTY_LISTS_NAME = 'property_lists.arrow'
+# Bump when load_data() starts producing differently prepared frames
+SNAPSHOT_FORMAT = 2
+
+
+def file_fingerprint(path, previous=None):
+    """
+    Returns the size, mtime and SHA-256 of a source file.
+
+    If `previous` has the same size and mtime, its hash is reused instead of
+    re-reading the file.
+
+    Args:
+        path (str): Path of the source file.
+        previous (dict, optional): A fingerprint from an earlier run.
+
+    Returns:
+        dict: The fingerprint with 'size', 'mtime_ns' and 'sha256' keys.
+    """
+    stat = os.stat(path)
+    fingerprint = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if previous and all(previous.get(k) == fingerprint[k] for k in ('size', 'mtime_ns')):
+        fingerprint['sha256'] = previous['sha256']
+        return fingerprint
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    fingerprint['sha256'] = digest.hexdigest()
+    return fingerprint
+
+
+def _read_manifest(snapshot_dir):
+    try:
+        with open(os.path.join(snapshot_dir, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _sources_match(manifest):
+    """Checks that every source CSV still has the hash recorded in the manifest."""
+    if manifest is None or manifest.get('format') != SNAPSHOT_FORMAT:
+        return False
+    recorded = manifest.get('sources', {})
+    for name, path in DATA_FILES.items():
+        previous = recorded.get(name)
+        if previous is None or not os.path.exists(path):
+            return False
+        if file_fingerprint(path, previous)['sha256'] != previous['sha256']:
+            return False
+    return True
+
+
+def sources_digest(snapshot_dir=SNAPSHOT_DIR):
+    """
+    Returns one SHA-256 over the content of all source CSVs.
+
+    Hashes recorded in the snapshot manifest are reused for files whose size
+    and mtime are unchanged, so this is cheap after the first load.
+
+    Args:
+        snapshot_dir (str): Directory holding the snapshot manifest.
+
+    Returns:
+        str: A hex digest identifying the current data.
+    """
+    recorded = (_read_manifest(snapshot_dir) or {}).get('sources', {})
+    digest = hashlib.sha256()
+    for name, path in DATA_FILES.items():
+        digest.update(f"{name}:{file_fingerprint(path, recorded.get(name))['sha256']};".encode())
+    return digest.hexdigest()
+
+
+def _list_column_to_arrow(column):
+    """A ListColumn as an Arrow list array of dictionary-encoded items; overrides are not included."""
+    items = pa.DictionaryArray.from_arrays(pa.array(column.codes), pa.array(column.vocab, type=pa.string()))
+    return pa.LargeListArray.from_arrays(pa.array(column.offsets), items, mask=pa.array(column.is_null))
+
+
+def _list_column_from_arrow(array, overrides):
+    """The ListColumn _list_column_to_arrow wrote, with its overrides from the manifest."""
+    array = array.combine_chunks()
+    items = array.values
+    return ListColumn(
+        array.offsets.to_numpy(),
+        items.indices.to_numpy(),
+        items.dictionary.to_numpy(zero_copy_only=False).astype(object),
+        array.is_null().to_numpy(zero_copy_only=False),
+        {int(i): ast.literal_eval(value) for i, value in overrides.items()},
+    )
+
+
+def _set_property_lists(properties, lists, property_lists):
+    """Hands the ListColumns to the caller's dict, or puts them in the frame as Python lists without one."""
+    if property_lists is not None:
+        property_lists.update(lists)
+        return
+    for col, column in lists.items():
+        properties[col] = pd.Series(column.to_lists(), index=properties.index, dtype=object)
+
+
+def read_snapshot(snapshot_dir=SNAPSHOT_DIR, property_lists=None):
+    """
+    Reads the prepared frames from the snapshot, if it is still current.
+
+    The Arrow files are memory-mapped. The property list columns are read as
+    ListColumns into `property_lists` if it is given, like load_data() does;
+    otherwise they are rebuilt as Python lists in the properties frame.
+
+    Args:
+        snapshot_dir (str): Directory holding the snapshot files.
+        property_lists (dict, optional): Filled with the parsed list columns.
+
+    Returns:
+        tuple or None: The four frames, or None if there is no valid snapshot.
+    """
+    if feather is None:
+        return None
+    manifest = _read_manifest(snapshot_dir)
+    if not _sources_match(manifest):
+        return None
+
+    frames = [feather.read_table(os.path.join(snapshot_dir, f'{name}.arrow'), memory_map=True).to_pandas()
+              for name in DATA_FILES]
+    table = feather.read_table(os.path.join(snapshot_dir, PROPERTY_LISTS_NAME), memory_map=True)
+    overrides = manifest['list_overrides']
+    lists = {col: _list_column_from_arrow(table.column(col), overrides[col]) for col in table.column_names}
+    _set_property_lists(frames[0], lists, property_lists)
+    return tuple(frames)
+
+
+def write_snapshot(frames, property_lists, snapshot_dir=SNAPSHOT_DIR, sources=None):
+    """
+    Writes the prepared frames to an uncompressed Arrow (Feather v2) snapshot.
+
+    Files are written to a temporary directory that then replaces the old
+    snapshot, so readers never see a half-written one.
+
+    Args:
+        frames (tuple): The four frames returned by load_data().
+        property_lists (dict): The ListColumns load_data() parsed the
+            properties' list columns into.
+        snapshot_dir (str): Directory to write the snapshot to.
+        sources (dict, optional): Fingerprints of the source CSVs taken before
+            the frames were loaded. Computed now if not given.
+    """
+    if feather is None:
+        return
+    manifest = {
+        'format': SNAPSHOT_FORMAT,
+        'created_at': time.time(),
+        'sources': sources or {name: file_fingerprint(path) for name, path in DATA_FILES.items()},
+        # Rows that parsed to something other than a list of strings, as literals
+        'list_overrides': {col: {str(i): repr(value) for i, value in column.overrides.items()}
+                           for col, column in property_lists.items()},
+    }
+    tmp_dir = f'{snapshot_dir}.tmp-{os.getpid()}'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    try:
+        for name, frame in zip(DATA_FILES, frames):
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            feather.write_feather(table, os.path.join(tmp_dir, f'{name}.arrow'), compression='uncompressed')
+        lists = pa.table({col: _list_column_to_arrow(column) for col, column in property_lists.items()})
+        feather.write_feather(lists, os.path.join(tmp_dir, PROPERTY_LISTS_NAME), compression='uncompressed')
+        with open(os.path.join(tmp_dir, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        old_dir = f'{snapshot_dir}.old-{os.getpid()}'
+        if os.path.exists(snapshot_dir):
+            os.replace(snapshot_dir, old_dir)
+        os.replace(tmp_dir, snapshot_dir)
+        shutil.rmtree(old_dir, ignore_errors=True)
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+@contextlib.contextmanager
+def snapshot_lock(snapshot_dir=SNAPSHOT_DIR):
+    """
+    Holds an exclusive lock on the snapshot across processes.
+
+    Server workers reloading the same changed CSVs take it around
+    load_prepared(), so the first one parses the CSVs and writes the snapshot
+    and the others then read that snapshot.
+    """
+    if fcntl is None:
+        yield
+        return
+    with open(f'{snapshot_dir}.lock', 'a') as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def load_prepared(timings=None, snapshot_dir=SNAPSHOT_DIR, property_lists=None):
+    """
+    Returns the prepared frames from the snapshot, or from the CSVs on a miss.
+
+    On a miss (first start, or a source CSV changed) the frames are built with
+    load_data() and a new snapshot is written for the next start.
+
+    Args:
+        timings (dict, optional): Filled with per-step load timings.
+        snapshot_dir (str): Directory holding the snapshot files.
+        property_lists (dict, optional): Filled with the properties' list
+            columns as ListColumns, as load_data() does. Without it they are
+            Python lists in the properties frame.
+
+    Returns:
+        tuple: The properties, contracts, renters and city DataFrames.
+    """
+    if timings is None:
+        timings = {}
+    start = time.perf_counter()
+    lists = {}
+    try:
+        frames = read_snapshot(snapshot_dir, lists)
+    except _SNAPSHOT_ERRORS as e:
+        print(f"Ignoring unreadable snapshot in '{snapshot_dir}': {e}")
+        frames, lists = None, {}
+    if frames is None:
+        # Fingerprint before loading so a CSV edited mid-load invalidates the snapshot
+        sources = {name: file_fingerprint(path) for name, path in DATA_FILES.items()} if feather else None
+        frames = load_data(timings, lists)
+        step = time.perf_counter()
+        try:
+            write_snapshot(frames, lists, snapshot_dir, sources)
+        except _SNAPSHOT_ERRORS as e:
+            print(f"Could not write snapshot to '{snapshot_dir}': {e}")
+        timings['write_snapshot'] = time.perf_counter() - step
+    else:
+        timings['read_snapshot'] = timings['total'] = time.perf_counter() - start
+
+    _set_property_lists(frames[0], lists, property_lists)
+    return frames
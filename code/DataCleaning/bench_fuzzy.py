@@ -0,0 +1,138 @@
+"""
+Benchmarks FuzzyNormalizer against the notebooks' per-row process.extractOne.
+
+- renters: clean_city's fuzzy step in renters_cleaning_eda.ipynb, matching
+  each City_extracted value of cleaned_renters.csv (20k rows) against the
+  distinct values. The unblocked baseline is timed on a sample and
+  extrapolated.
+- hosts: fuzzy_match_to_abbr in hosts_cleaning.ipynb, matching the Province
+  column of the hosts export (5k rows) to the province names.
+
+Run from code/DataCleaning (needs fuzzywuzzy, and rapidfuzz for the fast scorer):
+    python bench_fuzzy.py [--sample 300]
+"""
+import argparse
+import re
+import time
+import pandas as pd
+from fuzzywuzzy import process
+from fuzzy_normalizer import SCORER_BACKEND, FuzzyNormalizer
+
+RENTERS_PATH = "cleaned_renters.csv"
+HOSTS_PATH = "hosts_2025_05_20_1747761789.csv"
+
+CANONICAL_NAMES = {
+    'British Columbia': 'BC',
+    'Alberta': 'AB',
+    'Saskatchewan': 'SK',
+    'Manitoba': 'MB',
+    'Ontario': 'ON',
+    'Quebec': 'QC',
+    'Nova Scotia': 'NS',
+    'New Brunswick': 'NB',
+    'Newfoundland and Labrador': 'NL',
+    'Prince Edward Island': 'PE',
+    'Yukon': 'YT',
+    'Northwest Territories': 'NT',
+    'Nunavut': 'NU'
+}
+ABBREVIATIONS = set(CANONICAL_NAMES.values())
+CITY_CUTOFF = 85
+PROVINCE_CUTOFF = 80
+
+
+def clean_text(x):
+    if pd.isnull(x):
+        return ''
+    return re.sub(r'[^\w\s]', '', str(x)).strip().lower()
+
+
+def legacy_province(name):
+    if not name:
+        return 'Unknown'
+    if name.upper() in ABBREVIATIONS:
+        return name.upper()
+    result = process.extractOne(name, CANONICAL_NAMES.keys(), score_cutoff=PROVINCE_CUTOFF)
+    return 'Unknown' if result is None else CANONICAL_NAMES.get(result[0], 'Unknown')
+
+
+def normalized_province(names, normalizer):
+    def to_abbr(name):
+        if not name:
+            return 'Unknown'
+        if name.upper() in ABBREVIATIONS:
+            return name.upper()
+        result = normalizer.match(name)
+        return 'Unknown' if result is None else CANONICAL_NAMES[result[0]]
+    return names.map(to_abbr)
+
+
+def legacy_city(city, choices):
+    match, score = process.extractOne(city, choices)
+    return match if score >= CITY_CUTOFF and match != city else city
+
+
+def normalized_city(city, normalizer, block=None):
+    result = normalizer.match(city, block)
+    return result[0] if result is not None and result[1] >= CITY_CUTOFF and result[0] != city else city
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def bench_renters(sample):
+    renters = pd.read_csv(RENTERS_PATH)
+    cities = renters['City_extracted'].dropna().astype(str)
+    choices = cities.unique()
+    rows = cities.sample(min(sample, len(cities)), random_state=0)
+    print(f"renters: {len(cities):,} city values, {len(choices):,} distinct choices")
+
+    legacy, seconds = timed(lambda: rows.map(lambda city: legacy_city(city, choices)))
+    print(f"  extractOne per row        {seconds / len(rows) * len(cities):8.2f} s (extrapolated from {len(rows)} rows)")
+
+    normalizer = FuzzyNormalizer(choices)
+    blocked, seconds = timed(lambda: cities.map(lambda city: normalized_city(city, normalizer)))
+    agree = (blocked.loc[rows.index] == legacy).mean()
+    print(f"  blocked + memoized        {seconds:8.2f} s  {agree:.1%} agree on the sample  "
+          f"memo hit rate {normalizer.stats()['hit_rate']:.1%}")
+
+    # Province blocks: each choice belongs to the province it is most often registered with
+    province = normalized_province(renters['Province'].map(clean_text), FuzzyNormalizer(CANONICAL_NAMES, score_cutoff=PROVINCE_CUTOFF))
+    province = province.loc[cities.index].where(lambda p: p != 'Unknown')
+    labels = pd.DataFrame({'city': cities, 'province': province}).dropna().groupby('city')['province'].agg(
+        lambda p: p.mode().iloc[0])
+    normalizer = FuzzyNormalizer(choices, [labels.get(choice) for choice in choices])
+    by_province, seconds = timed(lambda: pd.Series(
+        [normalized_city(city, normalizer, None if pd.isna(p) else p) for city, p in zip(cities, province)],
+        index=cities.index))
+    agree = (by_province.loc[rows.index] == legacy).mean()
+    print(f"  + province blocks         {seconds:8.2f} s  {agree:.1%} agree on the sample")
+
+
+def bench_hosts():
+    hosts = pd.read_csv(HOSTS_PATH)
+    names = hosts['Province'].map(clean_text)
+    print(f"hosts: {len(names):,} province values, {names.nunique():,} distinct")
+
+    legacy, seconds = timed(lambda: names.map(legacy_province))
+    print(f"  extractOne per row        {seconds:8.2f} s")
+    normalizer = FuzzyNormalizer(CANONICAL_NAMES, score_cutoff=PROVINCE_CUTOFF)
+    memoized, seconds = timed(lambda: normalized_province(names, normalizer))
+    print(f"  memoized                  {seconds:8.2f} s  {(memoized == legacy).mean():.1%} agree  "
+          f"memo hit rate {normalizer.stats()['hit_rate']:.1%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sample", type=int, default=300, help="renter rows timed with the unblocked baseline")
+    args = parser.parse_args()
+    print(f"scorer backend: {SCORER_BACKEND}")
+    bench_renters(args.sample)
+    bench_hosts()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Checks that etl.py only re-cleans what changed.
+
+Runs every dataset twice on the same exports into a temporary output folder
+and expects the second run to find no new, changed or removed rows and to
+leave the cleaned CSVs byte for byte as the first run wrote them. Does the
+same with a copy of each export that has some IDs and Updated At values
+missing, as real exports do.
+
+Then makes a later export with a few rows edited, a couple deleted and one
+appended, and expects the incremental run over it to re-clean, drop and add
+those rows, leaving cleaned CSVs byte for byte like a --full run of the
+later export into an empty folder. Exits non-zero otherwise.
+
+Run from code/DataCleaning:
+    python check_etl.py [--raw-dir exports] [--datasets renters hosts]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import pandas as pd
+import etl
+
+# Every this many rows of the copy lose their ID and Updated At
+MISSING_EVERY = 7
+# Rows of the later export that take another row's values, and rows deleted from it
+EDITED_ROWS = [3, 10, 25]
+DELETED_ROWS = [5, 6]
+# Name of the later export: a newer timestamp than any real export
+LATER_EXPORT = "{prefix}_2099_01_01_4070908800.csv"
+
+
+def _read_outputs(dataset, out_dir):
+    contents = {}
+    for output in dataset.outputs:
+        with open(os.path.join(out_dir, output), "rb") as f:
+            contents[output] = f.read()
+    return contents
+
+
+def _with_missing_keys(dataset, raw_path, tmp_dir):
+    """A copy of the export with the row key and version columns blanked in some rows."""
+    raw = pd.read_csv(raw_path, dtype=str, keep_default_na=False)
+    rows = raw.index[::MISSING_EVERY]
+    for column in [dataset.id_column, etl.VERSION_COLUMN]:
+        if column in raw.columns:
+            raw.loc[rows, column] = ""
+    path = os.path.join(tmp_dir, f"{dataset.prefix}_missing_keys.csv")
+    raw.to_csv(path, index=False)
+    return path
+
+
+def _run_twice(dataset, raw_path, out_dir, context):
+    """Whether a second run on the same export changes nothing, and the second run's summary."""
+    first = etl.run_dataset(dataset, raw_path, out_dir, context)
+    written = _read_outputs(dataset, out_dir)
+    second = etl.run_dataset(dataset, raw_path, out_dir, context)
+    ok = second["changed"] == 0 and second["removed"] == 0 and _read_outputs(dataset, out_dir) == written
+    return ok, first, second
+
+
+def _bump_versions(values):
+    """Later Updated At values in the export's own format (a different format would not parse like the rest)."""
+    return values.str.replace(r"^\d{4}", "2099", regex=True).where(values.str.match(r"^\d{4}"), "2099")
+
+
+def _later_export(dataset, raw_path, raw_dir):
+    """
+    Copies the export into raw_dir with a later export next to it.
+
+    Returns:
+        tuple: The copy's path, and how many rows the later export edits and appends.
+    """
+    raw = pd.read_csv(raw_path, dtype=str, keep_default_na=False)
+    os.makedirs(raw_dir)
+    raw.to_csv(os.path.join(raw_dir, os.path.basename(raw_path)), index=False)
+
+    later = raw.copy()
+    keep = [column for column in later.columns if column == dataset.id_column]
+    for row in EDITED_ROWS:
+        # The values of a row from the other end of the export, under the edited row's ID
+        source = len(later) - 1 - row
+        later.loc[row, later.columns.difference(keep)] = raw.loc[source, later.columns.difference(keep)]
+        if etl.VERSION_COLUMN in later.columns:
+            later.loc[[row], etl.VERSION_COLUMN] = _bump_versions(later.loc[[row], etl.VERSION_COLUMN])
+    appended = raw.iloc[[0]].copy()
+    if dataset.id_column:
+        ids = pd.to_numeric(raw[dataset.id_column], errors="coerce")
+        appended[dataset.id_column] = str(int(ids.max()) + 1)
+    if etl.VERSION_COLUMN in appended.columns:
+        appended[etl.VERSION_COLUMN] = _bump_versions(appended[etl.VERSION_COLUMN])
+    later = pd.concat([later.drop(index=DELETED_ROWS), appended], ignore_index=True)
+    later.to_csv(os.path.join(raw_dir, LATER_EXPORT.format(prefix=dataset.prefix)), index=False)
+    return os.path.join(raw_dir, os.path.basename(raw_path)), len(EDITED_ROWS) + 1
+
+
+def _run_changed(dataset, raw_path, tmp_dir, context):
+    """
+    Whether an incremental run over a changed export matches a full run of it.
+
+    Returns:
+        tuple: The check's result, and the incremental run's summary.
+    """
+    raw_dir = os.path.join(tmp_dir, dataset.name, "changed_exports")
+    first_path, changed_rows = _later_export(dataset, raw_path, raw_dir)
+    later_path = etl.latest_export(raw_dir, dataset.prefix)
+
+    out_dir = os.path.join(tmp_dir, dataset.name, "incremental")
+    full_dir = os.path.join(tmp_dir, dataset.name, "full")
+    os.makedirs(out_dir)
+    os.makedirs(full_dir)
+    etl.run_dataset(dataset, first_path, out_dir, context)
+    summary = etl.run_dataset(dataset, later_path, out_dir, context)
+    etl.run_dataset(dataset, later_path, full_dir, context, full=True)
+    ok = (later_path != first_path
+          and summary["changed"] >= changed_rows and summary["removed"] >= len(DELETED_ROWS)
+          and _read_outputs(dataset, out_dir) == _read_outputs(dataset, full_dir))
+    return ok, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--raw-dir", default=".", help="folder with the timestamped export CSVs")
+    parser.add_argument("--cities", default="canadacities.csv")
+    parser.add_argument("--datasets", nargs="+", choices=[d.name for d in etl.DATASETS],
+                        default=[d.name for d in etl.DATASETS])
+    args = parser.parse_args()
+
+    context = etl.Context(args.cities)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for dataset in etl.DATASETS:
+            raw_path = etl.latest_export(args.raw_dir, dataset.prefix)
+            if dataset.name not in args.datasets or raw_path is None:
+                continue
+            variants = [("export", raw_path), ("missing keys", _with_missing_keys(dataset, raw_path, tmp_dir))]
+            for variant, path in variants:
+                out_dir = os.path.join(tmp_dir, dataset.name, variant.replace(" ", "_"))
+                os.makedirs(out_dir)
+                ok, first, second = _run_twice(dataset, path, out_dir, context)
+                print(f"{dataset.name:<12} {variant:<14} {'ok' if ok else 'RE-CLEANED':<10} {first['rows']:,} rows, "
+                      f"second run: {second['changed']:,} new or changed, {second['removed']:,} removed")
+                results.append(ok)
+
+            ok, summary = _run_changed(dataset, raw_path, tmp_dir, context)
+            print(f"{dataset.name:<12} {'changed export':<14} {'ok' if ok else 'DIFFERS':<10} "
+                  f"{summary['rows']:,} rows, {summary['changed']:,} new or changed, {summary['removed']:,} removed, "
+                  f"{'same as' if ok else 'unlike'} a full run")
+            results.append(ok)
+
+    if not results:
+        print(f"no exports in {args.raw_dir}")
+    sys.exit(0 if results and all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
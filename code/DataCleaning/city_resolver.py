@@ -0,0 +1,226 @@
+"""
+Resolves free-text city fields against the canadacities.csv reference list.
+
+The cleaning notebooks used to scan every reference city for every row;
+CityResolver builds its lookup structures once:
+
+- a hash map from lowercase name to reference name, for exact matches
+  (renters' "Looking In Address" parts);
+- an Aho-Corasick automaton over all lowercase names, which finds the
+  longest reference name contained in a string in one pass over it
+  (properties' "City").
+
+Both notebooks' reference lists and province overrides live here, so the
+cleaning steps and the ETL share one definition.
+"""
+from collections import deque
+import numpy as np
+import pandas as pd
+
+CITIES_PATH = "canadacities.csv"
+
+# Reference names replaced before matching
+CITY_ALIASES = {"Westbank": "West Kelowna"}
+
+# Places missing from canadacities.csv, added by property_cleaning_eda.ipynb
+PROPERTY_EXTRA_CITIES = [
+    "Langley Township", "Revelstoke", "Lower Sackville", "Middle Sackville", "Upper Sackville",
+    "Okanagan Falls", "Lower Truro", "Greater Sudbury", "Stayner", "Windsor Junction",
+]
+
+# renters_cleaning_eda.ipynb adds a few more
+RENTER_EXTRA_CITIES = PROPERTY_EXTRA_CITIES + [
+    "Revelstoke", "Richmond Hill", "Okanagan", "Bedford", "Bible Hill", "Lower Sackville",
+    "Port Hawkesbury", "Windsor", "Scarborough", "Lower Sackville",
+]
+
+# Ambiguous city names pinned to the province the renters actually mean
+PROVINCE_OVERRIDES = {
+    "BC": ["Richmond", "Victoria", "Armstrong"],
+    "ON": ["Richmond Hill", "Waterloo", "Alliston", "Lambton", "Rosedale", "Lakeshore"],
+    "NB": ["St. Andrews", "Woodstock", "Perth-Andover"],
+    "AB": ["Cochrane"],
+    "NS": ["Windsor", "Dalhousie University", "Bedford", "Amherst", "Westmount"],
+}
+
+# Provinces of the extra cities, appended to the reference table
+EXTRA_CITY_PROVINCE = {
+    "Langley Township": "BC",
+    "Revelstoke": "BC",
+    "Lower Sackville": "NS",
+    "Middle Sackville": "NS",
+    "Upper Sackville": "NS",
+    "Okanagan Falls": "BC",
+    "Lower Truro": "NS",
+    "Greater Sudbury": "ON",
+    "Stayner": "ON",
+    "Windsor Junction": "NS",
+    "Okanagan": "BC",
+    "Bible Hill": "NS",
+    "Port Hawkesbury": "NS",
+    "Scarborough": "ON",
+    "Bedford": "NS",
+    "Durham": "ON",
+}
+
+
+def load_reference(path: str = CITIES_PATH) -> pd.DataFrame:
+    """canadacities.csv with CITY_ALIASES applied to the city column."""
+    cities = pd.read_csv(path)
+    cities["city"] = cities["city"].replace(CITY_ALIASES)
+    return cities
+
+
+def province_table(reference: pd.DataFrame) -> pd.DataFrame:
+    """
+    The lowercase city -> province_id table used to check renters' provinces.
+
+    Applies PROVINCE_OVERRIDES and appends EXTRA_CITY_PROVINCE. City names
+    found in several provinces keep one row per province, as in the notebook.
+
+    Args:
+        reference (pd.DataFrame): The output of load_reference().
+
+    Returns:
+        pd.DataFrame: Columns 'city' and 'province_id', both lowercase.
+    """
+    table = reference[["city", "province_id"]].copy()
+    for province, cities in PROVINCE_OVERRIDES.items():
+        table.loc[table["city"].isin(cities), "province_id"] = province
+    extra = pd.DataFrame({
+        "city": list(EXTRA_CITY_PROVINCE.keys()),
+        "province_id": list(EXTRA_CITY_PROVINCE.values()),
+    })
+    table = pd.concat([table, extra], ignore_index=True)
+    table["city"] = table["city"].str.lower()
+    table["province_id"] = table["province_id"].str.lower()
+    return table
+
+
+class _Automaton:
+    """Aho-Corasick automaton reporting the longest pattern found in a text."""
+
+    def __init__(self, patterns: list):
+        self.patterns = patterns
+        self.goto = [{}]
+        # Best (longest, then earliest) pattern ending at each state, as (length, -rank, index)
+        self.best = [None]
+        for rank, pattern in enumerate(patterns):
+            state = 0
+            for char in pattern:
+                nxt = self.goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][char] = nxt
+                    self.goto.append({})
+                    self.best.append(None)
+                state = nxt
+            candidate = (len(pattern), -rank, rank)
+            if self.best[state] is None or candidate > self.best[state]:
+                self.best[state] = candidate
+
+        # Breadth-first failure links; each state inherits the best match of its suffix state
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self.goto[state].items():
+                queue.append(nxt)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[nxt] = self.goto[fallback].get(char, 0)
+                inherited = self.best[self.fail[nxt]]
+                if inherited is not None and (self.best[nxt] is None or inherited > self.best[nxt]):
+                    self.best[nxt] = inherited
+
+    def longest_match(self, text: str):
+        """The longest pattern occurring in text (earliest in the list on ties), or None."""
+        goto, fail, best = self.goto, self.fail, self.best
+        state, found = 0, None
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if best[state] is not None and (found is None or best[state] > found):
+                found = best[state]
+        return None if found is None else self.patterns[found[2]]
+
+
+class CityResolver:
+    """
+    Matches raw city strings against a list of reference city names.
+
+    Args:
+        cities (list): Reference names. Matching is case-insensitive; on
+            ties the name earlier in the list wins.
+    """
+
+    def __init__(self, cities: list):
+        self.names = [city.lower() for city in cities]
+        self._exact = {}
+        for city, name in zip(cities, self.names):
+            self._exact.setdefault(name, city)
+        self._automaton = _Automaton(self.names)
+
+    def exact(self, name: str):
+        """The reference name equal to name ignoring case, or None."""
+        return self._exact.get(name.lower())
+
+    def longest_substring(self, text: str):
+        """The longest lowercase reference name contained in text, or None."""
+        return self._automaton.longest_match(text.lower())
+
+    def match_city(self, city):
+        """
+        Title-cased longest reference name inside a property's City value.
+
+        Non-strings are returned unchanged, and so are strings containing no
+        reference name (match_city in property_cleaning_eda.ipynb).
+        """
+        if not isinstance(city, str):
+            return city
+        match = self.longest_substring(city)
+        return match.title() if match is not None else city
+
+    def extract_city(self, address):
+        """
+        The reference name of the last comma-separated part of address that is
+        a city, or None (extract_city in renters_cleaning_eda.ipynb).
+        """
+        if isinstance(address, str) and address.strip():
+            parts = [part.strip() for part in address.split(",") if part.strip()]
+            for part in reversed(parts):
+                city = self.exact(part)
+                if city is not None:
+                    return city
+        return None
+
+    def match_series(self, values: pd.Series) -> pd.Series:
+        """match_city over a column, resolving each distinct value once."""
+        return _map_unique(values, self.match_city)
+
+    def extract_series(self, values: pd.Series) -> pd.Series:
+        """extract_city over a column, resolving each distinct value once."""
+        return _map_unique(values, self.extract_city)
+
+
+def _map_unique(values: pd.Series, func) -> pd.Series:
+    codes, uniques = pd.factorize(values)
+    resolved = [func(value) for value in uniques]
+    # Missing values get code -1, i.e. the last slot
+    missing = values[codes == -1]
+    resolved.append(func(missing.iloc[0]) if len(missing) else None)
+    lookup = np.empty(len(resolved), dtype=object)
+    lookup[:] = resolved
+    return pd.Series(lookup[codes], index=values.index, name=values.name)
+
+
+def property_resolver(reference: pd.DataFrame) -> CityResolver:
+    """The resolver property_cleaning_eda.ipynb uses for the City column."""
+    return CityResolver([c.lower() for c in list(reference["city"]) + PROPERTY_EXTRA_CITIES])
+
+
+def renter_resolver(reference: pd.DataFrame) -> CityResolver:
+    """The resolver renters_cleaning_eda.ipynb uses for Looking In Address."""
+    return CityResolver([c.lower() for c in list(reference["city"]) + RENTER_EXTRA_CITIES])
@@ -0,0 +1,565 @@
+"""
+The cleaning steps of the DataCleaning notebooks as functions over DataFrames.
+
+Each clean_* function takes raw export rows (any subset of an export) and
+returns their cleaned rows, following the notebook cells it names. Extra
+columns on the input are passed through, which lets etl.py tag rows with
+their key. Values a notebook derived from the whole dataset (the countries
+and provinces renters' cities are checked against, the cities clean_city
+matches against) are passed in by the caller.
+"""
+import contextlib
+import io
+import os
+import re
+import sys
+import numpy as np
+import pandas as pd
+from city_resolver import province_table
+from fuzzy_normalizer import FuzzyNormalizer
+
+# The contract length and postal code rules are shared with the modelling code
+PRICE_PREDICTIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'PricePredictions')
+if PRICE_PREDICTIONS_DIR not in sys.path:
+    sys.path.append(PRICE_PREDICTIONS_DIR)
+from contract_features import CONTRACT_LENGTH_COLUMN, POSTAL_CODE_PATTERN, contract_length_months  # noqa: E402
+
+# property_cleaning_eda.ipynb
+PROPERTY_DROP_COLUMNS = ["Host Email", "Host Name", "Address"]
+PROPERTY_PROVINCES = {
+    'Alberta': 'AB',
+    'British Columbia': 'BC',
+    'Manitoba': 'MB',
+    'New Brunswick': 'NB',
+    'Newfoundland and Labrador': 'NL',
+    'Nova Scotia': 'NS',
+    'Ontario': 'ON',
+    'Prince Edward Island': 'PE',
+    'Quebec': 'QC',
+    'Québec': 'QC',
+    'Saskatchewan': 'SK',
+    'Northwest Territories': 'NT',
+    'Nunavut': 'NU',
+    'Yukon': 'YT',
+    'Ont': 'ON',
+    'B.C': 'BC',
+}
+PROPERTY_LIST_COLUMNS = ["Facilities", "Household Items", "Furnishings", "Safety Features", "Amenities", "House Rules"]
+
+# renters_cleaning_eda.ipynb
+RENTER_DROP_COLUMNS = ['Name', 'Email', 'Phone Number']
+COUNTRY_MAPPING = {
+    # United States
+    'Usa': 'United States',
+    'Us': 'United States',
+    'United States Of America': 'United States',
+
+    # United Kingdom
+    'Uk': 'United Kingdom',
+    'England': 'United Kingdom',
+
+    # Canada
+    'Ca': 'Canada',
+    'Can': 'Canada',
+    'Canada, Bc': 'Canada',
+    'Canada Bc': 'Canada',
+    'Bc Canada': 'Canada',
+    'Canada’S': 'Canada',
+    'Canada ????????': 'Canada',
+    'Canada L': 'Canada',
+    'British Colombia': 'Canada',
+
+    # China
+    'Hk': 'China',
+    'Hongkong': 'China',
+    'Hksar': 'China',
+    'Macau': 'China',
+    'Taiwan': 'China',
+    'Hong Kong': 'China',
+
+    # South Korea
+    'Korea': 'South Korea',
+    'Republic Of Korea': 'South Korea',
+    'Korea, South': 'South Korea',
+
+    # Vietnam
+    'Viet Nam': 'Vietnam',
+
+    # Italy
+    'Italia': 'Italy',
+
+    # Brazil
+    'Br': 'Brazil',
+
+    # Sri Lanka
+    'Sl': 'Sri Lanka',
+
+    # Dominican Republic
+    'República Dominicana': 'Dominican Republic',
+
+    # Cayman Islands
+    'Grand Cayman Island': 'Cayman Islands'
+}
+INVALID_PROVINCES = ['', 'choose...', 'outside usa', '1']
+RENTER_PROVINCE_MAPPING = {
+    # Canadian provinces and abbreviations
+    'Bc': 'British Columbia',
+    'British  Columbia': 'British Columbia',
+    'British Colombia': 'British Columbia',
+    'Ns Canada': 'Nova Scotia',
+    'Ns': 'Nova Scotia',
+    'Nf': 'Newfoundland',
+    'Nl': 'Newfoundland',
+    'Nb': 'New Brunswick',
+    'Mb': 'Manitoba',
+    'On': 'Ontario',
+    'Ontario': 'Ontario',
+    'Sk': 'Saskatchewan',
+    'Sask': 'Saskatchewan',
+    'Qc': 'Quebec',
+    'Qubec': 'Quebec',
+    'Quebec': 'Quebec',
+    'Albert': 'Alberta',
+    'Alberta': 'Alberta',
+    'Ca-Ab': 'Alberta',
+
+    # US states and abbreviations
+    'Ca': 'California',
+    'Az': 'Arizona',
+    'Arizona': 'Arizona',
+    'Il': 'Illinois',
+    'Illinois': 'Illinois',
+    'Ny': 'New York',
+    'New York': 'New York',
+    'Washington': 'Washington',
+
+    # German states (Länder)
+    'North Rhine Westphalia': 'North Rhine-Westphalia',
+    'Nordrhein-Westfalen': 'North Rhine-Westphalia',
+    'Northrhine-Westfalia': 'North Rhine-Westphalia',
+    'Rheinland Pfalz': 'Rhineland-Palatinate',
+    'Lower Saxony': 'Lower Saxony',
+    'Hessen': 'Hesse',
+
+    # Indian states
+    'Karnataka': 'Karnataka',
+    'Tamil Nadu': 'Tamil Nadu',
+    'Tamilnadu': 'Tamil Nadu',
+    'Andhra Pradesh': 'Andhra Pradesh',
+    'Madhya Pradesh': 'Madhya Pradesh',
+    'Punjab': 'Punjab',
+    'Haryana': 'Haryana',
+    'Gujarat': 'Gujarat',
+    'GUJARAT': 'Gujarat',
+    'Maharashtra': 'Maharashtra',
+    'Uttar Pradesh': 'Uttar Pradesh',
+
+    # Mexican states and cities
+    'Mexico City': 'Mexico City',
+    'Estado De Mexico': 'State of Mexico',
+    'Morelos': 'Morelos',
+    'Jalisco': 'Jalisco',
+    'Durango': 'Durango',
+
+    # Colombian departments
+    'Bogota': 'Bogotá',
+    'Valle Del Cauca': 'Valle del Cauca',
+    'Norte De Santander': 'Norte de Santander',
+    'Cundinamarca': 'Cundinamarca',
+    'Antioquia': 'Antioquia',
+    'Arauca': 'Arauca',
+
+    # Other countries and regions
+    'Tehran': 'Tehran',
+    'Gyeongsangnam-Do': 'Gyeongsangnam-do',
+    'Shanghai': 'Shanghai',
+    'Bay Of Plenty': 'Bay of Plenty',
+    'Sichuan': 'Sichuan',
+    'Greater Accra': 'Greater Accra',
+    'Gauteng': 'Gauteng',
+    'Misamis Oriental': 'Misamis Oriental',
+    'Jawa Timur': 'East Java',
+    'Selangor': 'Selangor',
+    'Fars': 'Fars',
+    'Lima': 'Lima',
+    'Yukon': 'Yukon',
+    'Carabobo': 'Carabobo',
+    'Zug': 'Zug',
+    'Kingston': 'Kingston',
+    'Federal Capital Territory': 'Federal Capital Territory',
+    'Victoria': 'Victoria',
+    'Krems': 'Krems',
+    'Province 3 ( प्रदेश नं ३ )': 'Province 3',
+    'Province 3': 'Province 3',
+    'Alpes Maritimes': 'Alpes-Maritimes',
+    'Spanish Town': 'Spanish Town',
+    'Kanagawa-Ken': 'Kanagawa',
+    'New Territories': 'New Territories',
+    'Shandong': 'Shandong',
+    'Isfahan': 'Isfahan',
+    'Giza': 'Giza',
+    'Hebei': 'Hebei',
+    'Bagmati': 'Bagmati',
+    'Kathmandu': 'Kathmandu',
+    'Akita Prefecture': 'Akita Prefecture',
+    'Pe': 'Prince Edward Island',
+    'North Western Province': 'North Western Province',
+    'Kowloon': 'Kowloon',
+    'Mashonaland East': 'Mashonaland East',
+    'Yunnan': 'Yunnan',
+    'Chisinau': 'Chișinău',
+    'St Andrew': 'St Andrew',
+    'Nouvelle Aquitaine': 'Nouvelle-Aquitaine',
+    'Dubai': 'Dubai',
+    'Western Australia': 'Western Australia',
+    'Northamptonshire': 'Northamptonshire',
+    'Worcestershire': 'Worcestershire',
+
+    # Miscellaneous / unclear
+    'Atlantageorgia': 'Atlanta, Georgia',
+    'Villa Alemana': 'Villa Alemana',
+    'Paschim Vihar': 'Paschim Vihar',
+    'Harare': 'Harare',
+    'Lagos': 'Lagos',
+    'Laguna': 'Laguna',
+    'Goa': 'Goa',
+    'Ondo': 'Ondo',
+    'Guayas': 'Guayas',
+    'Metro Manila': 'Metro Manila',
+    'Merkaz': 'Merkaz',
+    'Saga': 'Saga',
+}
+NON_CITY_WORDS = [
+    'Ontario', 'Alberta', 'Bc', 'Bc.', 'Ont', 'Ont.', 'AB', 'BC', 'ON',
+    'Haldimand County', 'County', 'Rd', 'Road', 'Street', 'St', 'Ave', 'Avenue',
+    'Lane', 'Dr', 'Drive', 'Highway', 'Hwy', 'House', 'Mile', 'Mt.', 'Mount',
+    '', 'Rr1 Mt. Elgin', 'City', 'Town', 'Village', 'Region', 'District'
+]
+SPELLING_CORRECTIONS = {
+    'Kelowma': 'Kelowna',
+    'Mississuaga': 'Mississauga',
+    'Prince Georee': 'Prince George',
+    'Whitehose': 'Whitehorse',
+    'Fort Mcmurray': 'Fort McMurray',
+    '150 Mile': '150 Mile House',
+    'North Vancouver': 'North Vancouver',
+    'West Vancouver': 'West Vancouver',
+    '基洛纳': 'Kelowna',
+    '溫哥華': 'Vancouver',
+    '토론토': 'Toronto',
+    '萨尼亚': 'Sarnia',
+    '哈利法克斯': 'Halifax',
+    'バンクーバー ': 'Vancouver',
+    'Ванкувер': 'Vancouver',
+    'Оттава': 'Ottawa',
+    'Галіфакс': 'Halifax',
+    'トロント': 'Toronto',
+    '킬로나': 'Kelowna',
+    'Westbank': 'West Kelowna',
+    'Scarborough': 'Toronto',
+    'Etobicoke': 'Toronto',
+    'Hull': 'Gatineau'
+}
+CITY_MATCH_CUTOFF = 85
+
+# hosts_cleaning.ipynb
+HOST_PROVINCES = {
+    'British Columbia': 'BC',
+    'Alberta': 'AB',
+    'Saskatchewan': 'SK',
+    'Manitoba': 'MB',
+    'Ontario': 'ON',
+    'Quebec': 'QC',
+    'Nova Scotia': 'NS',
+    'New Brunswick': 'NB',
+    'Newfoundland and Labrador': 'NL',
+    'Prince Edward Island': 'PE',
+    'Yukon': 'YT',
+    'Northwest Territories': 'NT',
+    'Nunavut': 'NU'
+}
+HOST_CITY_REMOVE_TERMS = [' bc', ' ns', ' nb', ' qc', ' on', ' ab', ' pe', ' sk', ' nl', ' mb', ' ohio', ' canada']
+HOST_DROP_COLUMNS = ['Name', 'Email', 'Phone Number', 'Postal Code', 'Verification Status', 'Self Describe Gender',
+                     'Schedules']
+
+# contracts_cleaning.ipynb
+CONTRACT_PROVINCES = {
+    'Alberta': 'AB',
+    'British Columbia': 'BC',
+    'Manitoba': 'MB',
+    'New Brunswick': 'NB',
+    'Newfoundland and Labrador': 'NL',
+    'Nova Scotia': 'NS',
+    'Ontario': 'ON',
+    'Prince Edward Island': 'PE',
+    'Quebec': 'QC',
+    'Saskatchewan': 'SK',
+    'Northwest Territories': 'NT',
+    'Nunavut': 'NU',
+    'Yukon': 'YT'
+}
+CONTRACT_PROVINCES.update({abbr: abbr for abbr in CONTRACT_PROVINCES.values()})
+CONTRACT_DATE_COLUMNS = [
+    'Start Date', 'End Date', 'Created Date', 'Signed Date',
+    'Contract Termination Date', 'Deadline', 'Created At', 'Updated At'
+]
+
+
+def _is_test_listing(titles: pd.Series) -> pd.Series:
+    return titles.str.contains('test|demo', case=False, na=False)
+
+
+def _split_list(values: pd.Series) -> pd.Series:
+    """'a, b' -> ['a', 'b'], leaving missing values as they are."""
+    return values.str.split(",").map(lambda x: [item.strip() for item in x] if isinstance(x, list) else x)
+
+
+def clean_properties(raw: pd.DataFrame, resolver) -> pd.DataFrame:
+    """
+    Cleans property export rows (property_cleaning_eda.ipynb, "Data Cleaning").
+
+    Args:
+        raw (pd.DataFrame): Rows of the properties export.
+        resolver (CityResolver): city_resolver.property_resolver().
+
+    Returns:
+        pd.DataFrame: The rows of properties_clean_list.csv.
+    """
+    prop = raw.drop(columns=PROPERTY_DROP_COLUMNS, errors='ignore')
+    prop = prop[~_is_test_listing(prop['Property Title'])].copy()
+
+    prop['Province'] = prop['Province'].replace(PROPERTY_PROVINCES).str.upper()
+
+    # Postal codes: no spaces or dashes, upper case, then "A1A 1A1"
+    postal = prop['Postal Code'].str.replace(r'\s+', '', regex=True).str.upper().str.replace('-', '', regex=False)
+    prop['Postal Code'] = postal.str[:3] + ' ' + postal.str[3:]
+
+    for column in PROPERTY_LIST_COLUMNS:
+        if column in prop.columns:
+            prop[column] = _split_list(prop[column])
+
+    prop['City_clean'] = resolver.match_series(prop['City'])
+    return prop
+
+
+def _convert_countries(countries: pd.Series) -> pd.Series:
+    """country_converter's short names, converting each distinct value once."""
+    import country_converter as coco
+
+    uniques = countries.dropna().unique().tolist()
+    # country_converter reports every unknown name; the notebooks silence it too
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        converted = coco.CountryConverter().convert(names=uniques, to='name_short') if uniques else []
+    if isinstance(converted, str):
+        converted = [converted]
+    return countries.map(dict(zip(uniques, converted))).fillna('not found')
+
+
+def _clean_country(value):
+    if isinstance(value, str):
+        parts = [part.strip().title() for part in value.split('/')]
+        return ' / '.join(parts)
+    return value
+
+
+def clean_renter_countries(raw: pd.DataFrame, known_countries=()) -> pd.DataFrame:
+    """
+    Cleans renter export rows to cleaned_country_renters.csv rows
+    (renters_cleaning_eda.ipynb, "Standardize the Country column" and
+    "Standardize Province").
+
+    Args:
+        raw (pd.DataFrame): Rows of the renters export.
+        known_countries: Country_cleaned values of the renters already
+            cleaned; a province equal to any country (in this batch or
+            these) drops the row.
+
+    Returns:
+        pd.DataFrame: The cleaned rows.
+    """
+    renters = raw.drop(RENTER_DROP_COLUMNS, axis=1, errors='ignore')
+    renters = renters[_convert_countries(renters['Country']) != 'not found'].copy()
+    renters['Country_cleaned'] = renters['Country'].apply(_clean_country).replace(COUNTRY_MAPPING)
+
+    # str() of a missing province is 'nan', which the filters below keep, as in the notebook
+    renters['Province_cleaned'] = renters['Province'].map(str).str.strip()
+    renters['Province_cleaned_lower'] = renters['Province_cleaned'].str.lower()
+    renters = renters[
+        renters['Province_cleaned_lower'].notna() &
+        ~renters['Province_cleaned_lower'].str.isnumeric() &
+        ~renters['Province_cleaned_lower'].isin(INVALID_PROVINCES)
+    ].copy()
+    renters['Province_cleaned'] = renters['Province_cleaned'].str.title()
+
+    valid_countries = set(renters['Country_cleaned'].dropna().astype(str)) | set(known_countries)
+    renters = renters[~renters['Province_cleaned'].isin(valid_countries)].copy()
+    renters['Province_cleaned'] = renters['Province_cleaned'].replace(RENTER_PROVINCE_MAPPING)
+    return renters
+
+
+def _last_address_part(address):
+    if pd.isna(address):
+        return address
+    parts = address.split(',')
+    if len(parts) > 1:
+        return parts[-1].strip()
+    return address.strip()
+
+
+_NON_CITY_RE = re.compile('|'.join(r'\b' + re.escape(word.lower()) + r'\b' for word in NON_CITY_WORDS))
+
+
+def _is_non_city(city):
+    return _NON_CITY_RE.search(city.lower()) is not None
+
+
+def _renter_city(city, normalizer):
+    if pd.isna(city):
+        return None
+    city = city.strip()
+    if city == '':
+        return None
+    city = SPELLING_CORRECTIONS.get(city, city)
+    if _is_non_city(city):
+        return None
+    parts = city.split()
+    if len(parts) > 2:
+        city = ' '.join(parts[:2])
+    if _is_non_city(city):
+        return None
+    result = normalizer.match(city)
+    if result is not None and result[1] >= CITY_MATCH_CUTOFF and result[0] != city:
+        city = result[0]
+    return city
+
+
+def clean_renters(raw: pd.DataFrame, countries: pd.DataFrame, resolver, reference: pd.DataFrame,
+                  known_cities=()) -> pd.DataFrame:
+    """
+    Cleans renter export rows to cleaned_renters.csv rows
+    (renters_cleaning_eda.ipynb, "Standardize City" to "Output").
+
+    Args:
+        raw (pd.DataFrame): Rows of the renters export.
+        countries (pd.DataFrame): All cleaned_country_renters.csv rows; home
+            cities equal to one of their countries or provinces are dropped.
+        resolver (CityResolver): city_resolver.renter_resolver().
+        reference (pd.DataFrame): city_resolver.load_reference().
+        known_cities: City_extracted values of the renters already cleaned,
+            which clean_city may correct a city to, besides this batch's.
+
+    Returns:
+        pd.DataFrame: The cleaned rows, one per matching province of the
+            renter's Looking In city.
+    """
+    renters = raw.drop(RENTER_DROP_COLUMNS, axis=1, errors='ignore')
+    renters['City_extracted'] = renters['City'].apply(_last_address_part).str.title()
+    renters = renters[~renters['City_extracted'].isin(countries['Country_cleaned'].unique())]
+    renters = renters[~renters['City_extracted'].isin(countries['Province_cleaned'].unique())].copy()
+
+    city_unique = pd.unique(pd.Series(list(known_cities) + list(renters['City_extracted']), dtype=object))
+    normalizer = FuzzyNormalizer(city_unique)
+    renters['City_cleaned'] = renters['City_extracted'].map(lambda city: _renter_city(city, normalizer))
+
+    renters['Looking In City_extracted'] = resolver.extract_series(renters['Looking In Address'])
+    renters['city_lower'] = renters['Looking In City_extracted'].str.lower()
+    renters['state_lower'] = renters['Looking In State'].str.lower()
+
+    merged = renters.merge(province_table(reference), how='left', left_on='city_lower', right_on='city')
+    merged['province_match'] = merged['state_lower'] == merged['province_id']
+    merged['province_id_upper'] = merged['province_id'].str.upper()
+    merged['Looking In State_cleaned'] = merged['Looking In State']
+    condition = (merged['province_match'] == False) & (merged['Looking In City_extracted'].notna())  # noqa: E712
+    merged.loc[condition, 'Looking In State_cleaned'] = merged.loc[condition, 'province_id_upper']
+    return merged
+
+
+def _host_text(x):
+    if pd.isnull(x):
+        return ''
+    return re.sub(r'[^\w\s]', '', str(x)).strip().lower()
+
+
+def _host_city(city):
+    if pd.isnull(city):
+        return 'Unknown'
+    city = city.strip().lower()
+    for term in HOST_CITY_REMOVE_TERMS:
+        city = city.replace(term, '')
+    city = re.sub(r'\d+', '', city)
+    city = city.split(',')[-1].strip()
+    words = city.split()
+    if len(words) > 2:
+        city = words[-1]
+    return ' '.join(w.capitalize() for w in city.split())
+
+
+def known_city_names() -> set:
+    """Lowercase names of the geonamescache cities host cities are checked against."""
+    import geonamescache
+
+    return {city['name'].lower() for city in geonamescache.GeonamesCache().get_cities().values()}
+
+
+def clean_hosts(raw: pd.DataFrame, city_names: set) -> pd.DataFrame:
+    """
+    Cleans host export rows (hosts_cleaning.ipynb).
+
+    Args:
+        raw (pd.DataFrame): Rows of the hosts export.
+        city_names (set): known_city_names(); other cities become missing.
+
+    Returns:
+        pd.DataFrame: The cleaned rows, with 'Unknown' and blanks as NaN.
+    """
+    hosts = raw.fillna('')
+    hosts['Country_cleaned'] = _convert_countries(hosts['Country']).replace('not found', 'Unknown')
+
+    abbreviations = set(HOST_PROVINCES.values())
+    normalizer = FuzzyNormalizer(HOST_PROVINCES.keys(), score_cutoff=80)
+
+    def to_abbr(name):
+        if not name:
+            return 'Unknown'
+        if name.upper() in abbreviations:
+            return name.upper()
+        result = normalizer.match(name)
+        return 'Unknown' if result is None else HOST_PROVINCES.get(result[0], 'Unknown')
+
+    hosts['Province_cleaned'] = hosts['Province'].map(_host_text).map(to_abbr)
+
+    cities = hosts['City'].map(_host_city)
+    known = cities.str.strip().str.lower().isin(city_names) & cities.str.strip().ne('')
+    hosts['City_cleaned'] = cities.str.strip().where(known, 'Unknown')
+
+    hosts = hosts.drop(columns=HOST_DROP_COLUMNS, errors='ignore')
+    return hosts.replace(to_replace=['Unknown', 'NA', 'NaN', '', 'None'], value=np.nan)
+
+
+def clean_contracts(raw: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cleans rental contract export rows (contracts_cleaning.ipynb).
+
+    The one-hot Home Details columns are left to the modelling code, since
+    their set depends on every contract.
+
+    Args:
+        raw (pd.DataFrame): Rows of the contracts export.
+
+    Returns:
+        pd.DataFrame: The cleaned rows.
+    """
+    contracts = raw.copy()
+    contracts['Province'] = contracts['Province'].map(CONTRACT_PROVINCES)
+    for column in CONTRACT_DATE_COLUMNS:
+        contracts[column] = pd.to_datetime(contracts[column], errors='coerce')
+
+    contracts['Bed Type'] = contracts['Home Details'].str.extract(r'Bed Type:\s*([^;]+)')[0]
+    contracts['Property Type'] = contracts['Home Details'].str.extract(r'Property Type:\s*([^;]+)')[0]
+
+    contracts = contracts[~_is_test_listing(contracts['Room Title'])].copy()
+    contracts['Zip Code'] = contracts['Zip Code'].str.replace(r'\s+', '', regex=True).str.upper()
+    contracts['Zip Code'] = contracts['Zip Code'].where(contracts['Zip Code'].str.match(POSTAL_CODE_PATTERN))
+
+    contracts[CONTRACT_LENGTH_COLUMN] = contract_length_months(contracts['End Date'], contracts['Start Date'])
+    return contracts
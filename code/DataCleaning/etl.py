@@ -0,0 +1,270 @@
+"""
+Incremental cleaning of the Happipad exports.
+
+Runs the notebooks' cleaning steps (cleaning_rules.py) over the latest
+timestamped export of each dataset, but only for rows that are new or
+changed since the last run, and merges them into the existing cleaned CSVs.
+
+A row is identified by its ID (or, for exports without one, by a hash of
+the row) and counts as changed when its Updated At differs from last time
+(or, without that column, when any of its values do). Rows that disappear
+from the export are removed from the outputs. The state of the last run is
+kept in <out-dir>/.etl_state/, one CSV per dataset; deleting it, or passing
+--full, re-cleans everything.
+
+    python etl.py --raw-dir exports --out-dir . [--datasets renters hosts] [--full]
+"""
+import argparse
+import glob
+import io
+import os
+import re
+import time
+import numpy as np
+import pandas as pd
+import cleaning_rules
+from city_resolver import load_reference, property_resolver, renter_resolver
+
+STATE_DIR = ".etl_state"
+KEY = "__etl_key"
+VERSION_COLUMN = "Updated At"
+
+_EXPORT_RE = re.compile(r"_(\d{4}_\d{2}_\d{2})_(\d+)")
+
+
+class Dataset:
+    """
+    One export and the cleaned CSVs made from it.
+
+    Args:
+        name (str): Used for the state file and --datasets.
+        prefix (str): File name prefix of the timestamped exports.
+        outputs (list): Output file names, in the order clean returns them.
+        clean: clean(changed_rows, existing_outputs, context) -> list of
+            DataFrames, one per output, keeping the KEY column.
+        id_column (str): The row identifier, if the export has one.
+    """
+
+    def __init__(self, name, prefix, outputs, clean, id_column=None):
+        self.name = name
+        self.prefix = prefix
+        self.outputs = outputs
+        self.clean = clean
+        self.id_column = id_column
+
+
+class Context:
+    """Reference data shared by the datasets, loaded on first use."""
+
+    def __init__(self, cities_path):
+        self.cities_path = cities_path
+        self._cache = {}
+
+    def _get(self, name, build):
+        if name not in self._cache:
+            self._cache[name] = build()
+        return self._cache[name]
+
+    @property
+    def reference(self):
+        return self._get("reference", lambda: load_reference(self.cities_path))
+
+    @property
+    def property_resolver(self):
+        return self._get("property_resolver", lambda: property_resolver(self.reference))
+
+    @property
+    def renter_resolver(self):
+        return self._get("renter_resolver", lambda: renter_resolver(self.reference))
+
+    @property
+    def host_city_names(self):
+        return self._get("host_city_names", cleaning_rules.known_city_names)
+
+
+def _clean_properties(rows, existing, context):
+    return [cleaning_rules.clean_properties(rows, context.property_resolver)]
+
+
+def _clean_renters(rows, existing, context):
+    # The notebook checks cities against every renter's country and province, and
+    # corrects them towards every renter's city: use the kept rows' values too
+    previous_countries, previous_renters = existing
+    known_countries = previous_countries["Country_cleaned"].dropna() if len(previous_countries) else ()
+    countries = cleaning_rules.clean_renter_countries(rows, known_countries)
+    all_countries = pd.concat([previous_countries, countries], ignore_index=True)
+    known_cities = previous_renters["City_extracted"].drop_duplicates() if len(previous_renters) else ()
+    renters = cleaning_rules.clean_renters(rows, all_countries, context.renter_resolver, context.reference,
+                                           known_cities)
+    return [countries, renters]
+
+
+def _clean_hosts(rows, existing, context):
+    return [cleaning_rules.clean_hosts(rows, context.host_city_names)]
+
+
+def _clean_contracts(rows, existing, context):
+    return [cleaning_rules.clean_contracts(rows)]
+
+
+DATASETS = [
+    Dataset("properties", "properties", ["properties_clean_list.csv"], _clean_properties, id_column="ID"),
+    Dataset("renters", "renters", ["cleaned_country_renters.csv", "cleaned_renters.csv"], _clean_renters,
+            id_column="ID"),
+    Dataset("hosts", "hosts", ["cleaned_hosts.csv"], _clean_hosts, id_column="ID"),
+    Dataset("contracts", "rental_contracts", ["cleaned_contracts.csv"], _clean_contracts),
+]
+
+
+def latest_export(raw_dir: str, prefix: str):
+    """
+    The newest export of a dataset in raw_dir, e.g. hosts_2025_05_20_1747761789.csv.
+
+    Exports are ordered by the Unix timestamp in their name; files without one
+    (e.g. rental_contracts.csv) count as oldest, by modification time.
+    """
+    def stamp(path):
+        match = _EXPORT_RE.search(os.path.basename(path)[len(prefix):])
+        return (1, int(match.group(2))) if match else (0, os.path.getmtime(path))
+
+    paths = [p for p in glob.glob(os.path.join(raw_dir, f"{prefix}*.csv"))
+             if re.fullmatch(rf"{re.escape(prefix)}(_\d{{4}}_\d{{2}}_\d{{2}}_\d+)?( \(\d+\))?\.csv", os.path.basename(p))]
+    return max(paths, key=stamp) if paths else None
+
+
+def _row_hashes(df: pd.DataFrame) -> pd.Series:
+    return pd.util.hash_pandas_object(df.astype(str), index=False).astype(str)
+
+
+def _as_text(values: pd.Series) -> pd.Series:
+    return values.fillna("").astype(str)
+
+
+def row_keys(raw: pd.DataFrame, dataset: Dataset) -> pd.DataFrame:
+    """
+    The key and version fingerprint of every export row.
+
+    Returns:
+        pd.DataFrame: Columns 'key' (unique per row) and 'version'.
+    """
+    # Missing values become '', as they read back from the state file (keep_default_na=False)
+    base = _as_text(raw[dataset.id_column]) if dataset.id_column else _row_hashes(raw)
+    # Repeated keys (duplicate rows) are told apart by their occurrence
+    occurrence = base.groupby(base).cumcount()
+    key = base.where(occurrence == 0, base + "#" + occurrence.astype(str))
+    version = _as_text(raw[VERSION_COLUMN]) if VERSION_COLUMN in raw.columns else _row_hashes(raw)
+    return pd.DataFrame({"key": key.to_numpy(), "version": version.to_numpy()})
+
+
+def _count_column(output):
+    return f"rows:{output}"
+
+
+def _read_state(path, dataset, out_dir):
+    """The previous run's state, or None if it is missing or out of step with the outputs."""
+    if not os.path.exists(path):
+        return None
+    state = pd.read_csv(path, dtype={"key": str, "version": str}, keep_default_na=False)
+    for output in dataset.outputs:
+        column = _count_column(output)
+        out_path = os.path.join(out_dir, output)
+        if column not in state.columns or not os.path.exists(out_path):
+            return None
+    return state
+
+
+def _write_atomic(df: pd.DataFrame, path: str):
+    tmp_path = path + ".tmp"
+    df.to_csv(tmp_path, index=False, encoding="utf-8")
+    os.replace(tmp_path, path)
+
+
+def run_dataset(dataset: Dataset, raw_path: str, out_dir: str, context: Context, full: bool = False) -> dict:
+    """
+    Brings a dataset's cleaned outputs up to date with one export.
+
+    Args:
+        dataset (Dataset): What to clean.
+        raw_path (str): The export CSV.
+        out_dir (str): Where the cleaned CSVs (and .etl_state/) live.
+        context (Context): Shared reference data.
+        full (bool): Re-clean every row instead of only new/changed ones.
+
+    Returns:
+        dict: Row counts: 'rows', 'changed', 'removed'.
+    """
+    raw = pd.read_csv(raw_path)
+    keys = row_keys(raw, dataset)
+    state_path = os.path.join(out_dir, STATE_DIR, f"{dataset.name}.csv")
+    state = None if full else _read_state(state_path, dataset, out_dir)
+
+    previous = state.set_index("key") if state is not None else pd.DataFrame(columns=["version"])
+    known_version = keys["key"].map(previous["version"])
+    changed = (known_version != keys["version"]).to_numpy()
+    removed = ~previous.index.isin(keys["key"])
+    summary = {"rows": len(raw), "changed": int(changed.sum()), "removed": int(removed.sum())}
+    if state is not None and not changed.any() and not removed.any():
+        return summary
+
+    # Existing output rows, tagged with the key they came from; stale ones are dropped
+    stale = set(keys["key"][changed]) | set(previous.index[removed])
+    existing = []
+    for output in dataset.outputs:
+        if state is None:
+            existing.append(pd.DataFrame())
+            continue
+        frame = pd.read_csv(os.path.join(out_dir, output))
+        owners = np.repeat(state["key"].to_numpy(), state[_count_column(output)].to_numpy())
+        if len(owners) != len(frame):
+            # Outputs edited or written by something else: start over
+            return run_dataset(dataset, raw_path, out_dir, context, full=True)
+        frame[KEY] = owners
+        existing.append(frame[~frame[KEY].isin(stale)])
+
+    rows = raw[changed].copy()
+    rows[KEY] = keys["key"][changed].to_numpy()
+    cleaned = dataset.clean(rows, [frame.drop(columns=KEY, errors="ignore") for frame in existing], context)
+
+    position = pd.Series(np.arange(len(keys)), index=keys["key"])
+    new_state = keys.copy()
+    for output, old, new in zip(dataset.outputs, existing, cleaned):
+        # Through CSV text, so new rows are typed and formatted like the rows read back
+        new = pd.read_csv(io.StringIO(new.to_csv(index=False)), dtype={KEY: str})
+        merged = pd.concat([old, new], ignore_index=True) if len(old) else new.reset_index(drop=True)
+        merged = merged.iloc[np.argsort(merged[KEY].map(position).to_numpy(), kind="stable")]
+        counts = merged[KEY].value_counts()
+        new_state[_count_column(output)] = new_state["key"].map(counts).fillna(0).astype(int).to_numpy()
+        _write_atomic(merged.drop(columns=KEY), os.path.join(out_dir, output))
+
+    os.makedirs(os.path.dirname(state_path), exist_ok=True)
+    _write_atomic(new_state, state_path)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incrementally clean the latest Happipad exports.")
+    parser.add_argument("--raw-dir", default=".", help="folder with the timestamped export CSVs")
+    parser.add_argument("--out-dir", default=".", help="folder with the cleaned CSVs")
+    parser.add_argument("--cities", default="canadacities.csv")
+    parser.add_argument("--datasets", nargs="+", choices=[d.name for d in DATASETS],
+                        default=[d.name for d in DATASETS])
+    parser.add_argument("--full", action="store_true", help="re-clean every row")
+    args = parser.parse_args()
+
+    context = Context(args.cities)
+    for dataset in DATASETS:
+        if dataset.name not in args.datasets:
+            continue
+        raw_path = latest_export(args.raw_dir, dataset.prefix)
+        if raw_path is None:
+            print(f"{dataset.name}: no {dataset.prefix}*.csv export in {args.raw_dir}, skipped")
+            continue
+        start = time.perf_counter()
+        summary = run_dataset(dataset, raw_path, args.out_dir, context, args.full)
+        print(f"{dataset.name}: {os.path.basename(raw_path)}, {summary['rows']} rows, "
+              f"{summary['changed']} new or changed, {summary['removed']} removed "
+              f"({time.perf_counter() - start:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
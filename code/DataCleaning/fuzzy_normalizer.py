@@ -0,0 +1,164 @@
+"""
+Fuzzy normalization of free-text values (cities, provinces) to a list of choices.
+
+The notebooks called fuzzywuzzy's process.extractOne against every choice
+for every row. FuzzyNormalizer instead:
+
+- blocks the choices by an optional label (e.g. province) and by cheap keys
+  of the first word (Soundex code and two-letter prefix), and only scores
+  the choices sharing a block and a key with the value;
+- scores a block in one call with rapidfuzz, which computes the same
+  WRatio scorer in C++, falling back to fuzzywuzzy when it is not installed;
+- remembers the answer for every distinct (value, block) pair, since the
+  raw values repeat heavily.
+
+Blocking trades recall for speed: a value is only matched to choices whose
+first word sounds or starts alike. Values with no candidate in their key
+block are scored against their whole label block instead.
+"""
+import re
+from collections import defaultdict
+import pandas as pd
+
+try:
+    from rapidfuzz import fuzz, process
+    from rapidfuzz.utils import default_process as full_process
+    SCORER_BACKEND = "rapidfuzz"
+except ImportError:
+    from fuzzywuzzy import fuzz, process
+    from fuzzywuzzy.utils import full_process
+    SCORER_BACKEND = "fuzzywuzzy"
+
+_SOUNDEX_CODES = {
+    **dict.fromkeys("bfpv", "1"), **dict.fromkeys("cgjkqsxz", "2"), **dict.fromkeys("dt", "3"),
+    "l": "4", **dict.fromkeys("mn", "5"), "r": "6",
+}
+_WORD_RE = re.compile(r"[a-z]+")
+
+
+def soundex(word: str) -> str:
+    """American Soundex code of a lowercase ASCII word, e.g. 'kelowna' -> 'K450'."""
+    if not word:
+        return ""
+    code, previous = word[0].upper(), _SOUNDEX_CODES.get(word[0], "")
+    for char in word[1:]:
+        digit = _SOUNDEX_CODES.get(char, "")
+        if digit and digit != previous:
+            code += digit
+        if char not in "hw":
+            previous = digit
+    return (code + "000")[:4]
+
+
+def block_keys(value: str) -> tuple:
+    """The Soundex and prefix keys of the first word of a processed value."""
+    match = _WORD_RE.search(value)
+    if match is None:
+        return (value[:2],)
+    word = match.group(0)
+    return ("S" + soundex(word), "P" + word[:2])
+
+
+class FuzzyNormalizer:
+    """
+    Maps raw strings to the best-scoring choice within their block.
+
+    Args:
+        choices (list): The canonical values to match against.
+        choice_blocks (list, optional): A block label per choice (e.g. its
+            province), or None for a choice that belongs to every block.
+        score_cutoff (int): Matches scoring below this are rejected.
+        scorer: A fuzz scorer; WRatio, like process.extractOne's default.
+    """
+
+    def __init__(self, choices, choice_blocks=None, score_cutoff: int = 0, scorer=None):
+        self.choices = list(choices)
+        self.score_cutoff = score_cutoff
+        self.scorer = scorer or fuzz.WRatio
+        self.hits = 0
+        self.misses = 0
+        self._memo = {}
+        self._processed = [full_process(str(choice)) for choice in self.choices]
+
+        labels = list(choice_blocks) if choice_blocks is not None else [None] * len(self.choices)
+        self._shared = [i for i, label in enumerate(labels) if label is None]
+        self._by_label = defaultdict(list)
+        self._by_key = defaultdict(list)
+        for i, (label, processed) in enumerate(zip(labels, self._processed)):
+            if label is not None:
+                self._by_label[label].append(i)
+            for key in block_keys(processed):
+                self._by_key[(label, key)].append(i)
+
+    def _candidates(self, processed: str, block):
+        # Without a known label, every label's choices are candidates
+        labels = [block, None] if block in self._by_label else [None, *self._by_label]
+        keys = block_keys(processed)
+        keyed = sorted({i for label in labels for key in keys for i in self._by_key.get((label, key), ())})
+        if keyed:
+            return keyed
+        if block in self._by_label:
+            return sorted(self._by_label[block] + self._shared)
+        return list(range(len(self.choices)))
+
+    def match(self, value, block=None):
+        """
+        The best choice for value, or None if nothing reaches score_cutoff.
+
+        Args:
+            value: The raw string.
+            block: The value's block label (e.g. its province), or None to
+                consider the choices of every block.
+
+        Returns:
+            tuple or None: (choice, score), like process.extractOne.
+        """
+        if not isinstance(value, str):
+            return None
+        memo_key = (value, block)
+        if memo_key in self._memo:
+            self.hits += 1
+            return self._memo[memo_key]
+        self.misses += 1
+
+        result = None
+        processed = full_process(value)
+        if processed:
+            candidates = self._candidates(processed, block)
+            processed_candidates = [self._processed[i] for i in candidates]
+            best = process.extractOne(
+                processed, processed_candidates, scorer=self.scorer, processor=None, score_cutoff=self.score_cutoff,
+            ) if candidates else None
+            if best is not None:
+                # rapidfuzz also returns the position; fuzzywuzzy only the (first best) choice
+                position = best[2] if len(best) > 2 else processed_candidates.index(best[0])
+                result = (self.choices[candidates[position]], best[1])
+        self._memo[memo_key] = result
+        return result
+
+    def normalize(self, values: pd.Series, blocks: pd.Series = None, default=None) -> pd.Series:
+        """
+        Best choice for every value of a column.
+
+        Args:
+            values (pd.Series): The raw strings.
+            blocks (pd.Series, optional): A block label per row.
+            default: What unmatched values map to; None keeps the raw value.
+
+        Returns:
+            pd.Series: The matched choices, aligned with values.
+        """
+        labels = [None if pd.isna(b) else b for b in blocks] if blocks is not None else [None] * len(values)
+        resolved = []
+        for value, block in zip(values, labels):
+            result = self.match(value, block)
+            resolved.append(result[0] if result is not None else (value if default is None else default))
+        return pd.Series(resolved, index=values.index, name=values.name, dtype=object)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,54 @@
+"""
+Benchmarks listings/minute of per-listing prompts against multi-listing batches.
+
+Needs a running Ollama server (or anything speaking its HTTP API):
+    python bench_extraction.py --input nlp_text_contracts.csv --sample 40 --batch-sizes 1 4 8
+"""
+import argparse
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from ollama_extract import OllamaHTTPBackend, extract_batch, load_listings
+
+
+class CountingBackend:
+    """Wraps a backend to count the requests it sends."""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def generate(self, prompt: str) -> str:
+        with self._lock:
+            self.calls += 1
+        return self.backend.generate(prompt)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--input", default="nlp_text_contracts.csv")
+    parser.add_argument("--model", default="mistral")
+    parser.add_argument("--url", default="http://localhost:11434")
+    parser.add_argument("--sample", type=int, default=40, help="listings per run")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4, 8])
+    args = parser.parse_args()
+
+    texts = load_listings(args.input)["text_input"].head(args.sample).tolist()
+    for batch_size in args.batch_sizes:
+        backend = CountingBackend(OllamaHTTPBackend(args.model, args.url))
+        batches = [texts[i:i + batch_size] for i in range(0, len(texts), batch_size)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as pool:
+            results = [r for batch in pool.map(lambda b: extract_batch(b, backend), batches) for r in batch]
+        elapsed = time.perf_counter() - start
+        # Requests beyond one per batch are single-listing retries of invalid items
+        retries = backend.calls - sum(1 for b in batches if len(b) > 1)
+        unknown = sum(all(v == "unknown" for v in r.values()) for r in results)
+        print(f"batch size {batch_size:>2}: {len(texts) / elapsed * 60:8.1f} listings/min  "
+              f"{backend.calls:>4} requests  {retries:>4} single-listing requests  {unknown:>3} all-unknown")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+
+
+def normalize_text(text: str) -> str:
+    """Collapses whitespace and case so reposts of the same listing share a key."""
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+
+class ExtractionCache:
+    """
+    Persistent cache of LLM extraction results in a SQLite file.
+
+    Results are keyed by a hash of the normalized listing text, the model name
+    and the prompt version, so changing the model or the prompt/schema starts
+    from a clean cache while old entries stay on disk. Answers to a prompt
+    narrowed to some of the fields are stored under a separate `variant`.
+    """
+
+    def __init__(self, path: str, model: str, prompt_version: str):
+        self.path = path
+        self.model = model
+        self.prompt_version = prompt_version
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS extractions ("
+                "key TEXT PRIMARY KEY, model TEXT, prompt_version TEXT, result TEXT)"
+            )
+
+    def key(self, text: str, variant: str = "") -> str:
+        payload = f"{self.model}\x00{self.prompt_version}\x00{normalize_text(text)}"
+        if variant:
+            payload += f"\x00{variant}"
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, text: str, variant: str = ""):
+        """Returns the cached result for text, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM extractions WHERE key = ?", (self.key(text, variant),)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, text: str, result: dict, variant: str = ""):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO extractions VALUES (?, ?, ?, ?)",
+                (self.key(text, variant), self.model, self.prompt_version, json.dumps(result)),
+            )
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        self._conn.close()
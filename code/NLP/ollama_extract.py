@@ -1,36 +1,100 @@
 import pandas as pd
+import argparse
+import csv
+import hashlib
 import subprocess
 import json
+import os
+import urllib.request
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from tqdm import tqdm
+from extraction_cache import ExtractionCache
+from rule_extractor import extract_rules
+
+# Fields the model is asked to extract for every listing
+FIELDS = [
+    "number_of_people",
+    "bedrooms",
+    "pets_allowed",
+    "property_size",
+    "shared_spaces",
+    "bathroom_type",
+    "nearby_amenities",
+    "unique_features",
+]
+
+# Step 1: Backends that send a prompt to a local model and return its text output
+class OllamaCLIBackend:
+    """Runs `ollama run <model>` once per prompt."""
+
+    def __init__(self, model: str = "mistral"):
+        self.model = model
+
+    def generate(self, prompt: str) -> str:
+        result = subprocess.run(
+            ["ollama", "run", self.model],
+            input=prompt.encode(),
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE
+        )
+        return result.stdout.decode().strip()
+
+
+class OllamaHTTPBackend:
+    """
+    Calls the Ollama HTTP API (POST /api/generate) of a running server.
+
+    The model stays loaded between requests, unlike the CLI backend. Any server
+    speaking the same API (e.g. a local fake for tests) can be used via base_url.
+    """
+
+    def __init__(self, model: str = "mistral", base_url: str = "http://localhost:11434", timeout: float = 300):
+        self.model = model
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def generate(self, prompt: str) -> str:
+        body = json.dumps({"model": self.model, "prompt": prompt, "stream": False}).encode()
+        request = urllib.request.Request(
+            f"{self.base_url}/api/generate", data=body, headers={"Content-Type": "application/json"}
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.loads(response.read().decode())["response"].strip()
+
 
-# Step 1: Define function to query Ollama
 def query_ollama(prompt: str, model: str = "mistral") -> str:
-    result = subprocess.run(
-        ["ollama", "run", model],
-        input=prompt.encode(),
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE
-    )
-    return result.stdout.decode().strip()
+    return OllamaCLIBackend(model).generate(prompt)
 
 # Step 2: Extract structured info from one listing (title + description)
-def extract_info_from_text(text: str) -> dict:
-    prompt = f"""
+# One schema line per field, in FIELDS order
+SCHEMA_LINES = {
+    "number_of_people": "integer or 'unknown'",
+    "bedrooms": "integer or 'unknown'",
+    "pets_allowed": "true, false, or 'unknown'",
+    "property_size": "'small', 'medium', 'large', or 'unknown'",
+    "shared_spaces": "comma-separated string or 'unknown'",
+    "bathroom_type": "'private', 'shared', or 'unknown'",
+    "nearby_amenities": "comma-separated string from [bus, store, recreation centre/pool, school and university] or 'unknown'",
+    "unique_features": "semicolon-separated string or 'unknown'",
+}
+
+
+def schema_text(fields: list = FIELDS) -> str:
+    lines = ",\n".join(f'  "{field}": "{SCHEMA_LINES[field]}"' for field in fields)
+    return "{\n" + lines + "\n}"
+
+
+SCHEMA = schema_text()
+
+
+def build_prompt(text: str, fields: list = FIELDS) -> str:
+    return f"""
 You are a rental listing extractor. You will receive one rental listing description.
 Extract structured information and return it as a **JSON object** with the following flat schema.
 If a field is missing or unclear, use "unknown" or leave it empty.
 
 Schema:
-{{
-  "number_of_people": "integer or 'unknown'",
-  "bedrooms": "integer or 'unknown'",
-  "pets_allowed": "true, false, or 'unknown'",
-  "property_size": "'small', 'medium', 'large', or 'unknown'",
-  "shared_spaces": "comma-separated string or 'unknown'",
-  "bathroom_type": "'private', 'shared', or 'unknown'",
-  "nearby_amenities": "comma-separated string from [bus, store, recreation centre/pool, school and university] or 'unknown'",
-  "unique_features": "semicolon-separated string or 'unknown'"
-}}
+{schema_text(fields)}
 
 Input listing:
 \"{text}\"
@@ -40,36 +104,334 @@ Instructions:
 - Output only a **valid JSON object**, with no surrounding text or explanation.
     """
 
+
+def build_batch_prompt(texts: list, fields: list = FIELDS) -> str:
+    listings = "\n".join(f"<<<LISTING {i}>>>\n{text}\n<<<END>>>" for i, text in enumerate(texts))
+    return f"""
+You are a rental listing extractor. You will receive {len(texts)} rental listing descriptions,
+numbered from 0, each between <<<LISTING n>>> and <<<END>>> markers.
+For each listing, extract structured information as a JSON object with the following flat schema,
+plus a "listing" field holding the listing number.
+If a field is missing or unclear, use "unknown" or leave it empty.
+
+Schema:
+{schema_text(fields)}
+
+Input listings:
+{listings}
+
+Instructions:
+- All other fields should be inferred or filled with "unknown" if not present.
+- Output only a **valid JSON array** of exactly {len(texts)} objects, one per listing in order,
+  with no surrounding text or explanation.
+    """
+
+
+# Changes whenever the prompts or schema change, which invalidates cached results
+PROMPT_VERSION = hashlib.sha256(
+    (build_prompt("{text}") + build_batch_prompt(["{text}"])).encode()
+).hexdigest()[:12]
+
+
+def unknown_result(fields: list = FIELDS) -> dict:
+    return {field: "unknown" for field in fields}
+
+
+def is_valid_result(parsed, fields: list = FIELDS) -> bool:
+    """Checks an extracted item against the schema: all fields present, scalar values."""
+    return isinstance(parsed, dict) and all(
+        field in parsed and isinstance(parsed[field], (str, int, float, bool, type(None)))
+        for field in fields
+    )
+
+
+def _cache_variant(fields: list) -> str:
+    # Results for the full schema keep the keys they had before fields could be narrowed
+    return "" if list(fields) == FIELDS else ",".join(fields)
+
+
+def extract_info_from_text(text: str, backend=None, cache=None, fields: list = FIELDS) -> dict:
+    if cache is not None:
+        cached = cache.get(text, _cache_variant(fields))
+        if cached is not None:
+            return cached
+    return _query_single(text, backend, cache, fields)
+
+
+def _query_single(text: str, backend=None, cache=None, fields: list = FIELDS) -> dict:
+    backend = backend or OllamaCLIBackend()
+    try:
+        response = backend.generate(build_prompt(text, fields))
+        parsed = json.loads(response.strip())
+    except Exception:
+        return unknown_result(fields)
+    if not isinstance(parsed, dict):
+        return unknown_result(fields)
+    # Keep exactly the schema fields so every output chunk has the same columns
+    result = {field: parsed.get(field, "unknown") for field in fields}
+    # Only successful answers are cached, so failures are retried next run
+    if cache is not None:
+        cache.put(text, result, _cache_variant(fields))
+    return result
+
+
+def _query_batch(texts: list, pending: list, fields: list, results: list, backend=None, cache=None):
+    """Fills results[i] for the listings in `pending` that one batch prompt answers cleanly."""
+    backend = backend or OllamaCLIBackend()
     try:
-        response = query_ollama(prompt)
-        return json.loads(response.strip())
+        parsed = json.loads(backend.generate(build_batch_prompt([texts[i] for i in pending], fields)).strip())
     except Exception:
-        return {
-            "number_of_people": "unknown",
-            "bedrooms": "unknown",
-            "pets_allowed": "unknown",
-            "property_size": "unknown",
-            "shared_spaces": "unknown",
-            "bathroom_type": "unknown",
-            "nearby_amenities": "unknown",
-            "unique_features": "unknown"
-        }
-
-# Step 3: Load dataset
-df = pd.read_csv("nlp_text_contracts.csv")  
-
-# Step 4: Combine 'title' and 'description' as text input
-df["text_input"] = df["Property Title"].fillna('') + ". " + df["Description"].fillna('')
-
-# Step 5: Loop through each row and extract structured info
-results = []
-for text in tqdm(df["text_input"], desc="Extracting info"):
-    results.append(extract_info_from_text(text))
-
-# Step 6: Append extracted results to DataFrame
-structured_df = pd.DataFrame(results)
-df = pd.concat([df, structured_df], axis=1)
-
-# Step 7: Save to new CSV
-df.to_csv("extracted_contracts.csv", index=False)
-print("Extraction complete! Saved to extracted_contracts.csv")
\ No newline at end of file
+        return
+    if not isinstance(parsed, list):
+        return
+    numbered = all(isinstance(item, dict) and isinstance(item.get("listing"), int) for item in parsed)
+    for position, item in enumerate(parsed):
+        n = item["listing"] if numbered else position
+        if 0 <= n < len(pending) and results[pending[n]] is None and is_valid_result(item, fields):
+            result = {field: item[field] for field in fields}
+            results[pending[n]] = result
+            if cache is not None:
+                cache.put(texts[pending[n]], result, _cache_variant(fields))
+
+
+def extract_batch(texts: list, backend=None, cache=None, fields: list = FIELDS, rules: list = None) -> list:
+    """
+    Extracts several listings with one prompt that asks for a JSON array.
+
+    Each array element is validated against the schema. Listings whose element
+    is missing or invalid (or the whole batch, if the reply is not an array)
+    are re-queried one by one with extract_info_from_text, rather than being
+    replaced with the all-"unknown" result.
+
+    With `rules` (one extract_rules() dict per text), the fields the rules
+    resolved are taken from them and only the remaining fields are asked of
+    the model; a listing with nothing left is not sent at all. Listings are
+    batched together with others missing the same fields.
+
+    Returns:
+        list: One result dict per text, in order, with the keys in `fields`.
+    """
+    rules = rules or [{} for _ in texts]
+    wanted = [[field for field in fields if field not in rule] for rule in rules]
+    results = [None] * len(texts)
+    groups = {}
+    for i, (text, missing) in enumerate(zip(texts, wanted)):
+        if not missing:
+            results[i] = {}
+            continue
+        results[i] = cache.get(text, _cache_variant(missing)) if cache is not None else None
+        if results[i] is None:
+            groups.setdefault(tuple(missing), []).append(i)
+    for missing, pending in groups.items():
+        if len(pending) > 1:
+            _query_batch(texts, pending, list(missing), results, backend, cache)
+
+    # Anything the batch did not answer cleanly gets its own request
+    results = [
+        result if result is not None else _query_single(text, backend, cache, missing)
+        for text, result, missing in zip(texts, results, wanted)
+    ]
+    return [
+        {field: rule[field] if field in rule else result.get(field, "unknown") for field in fields}
+        for rule, result in zip(rules, results)
+    ]
+
+# Step 3: Stream the extraction over a CSV, writing rows as they complete
+def _add_text_input(df: pd.DataFrame, id_column: str, offset: int = 0) -> pd.DataFrame:
+    if id_column not in df.columns:
+        # Without an ID, rows are identified by their position in the input
+        df.insert(0, id_column, range(offset, offset + len(df)))
+    # Combine 'title' and 'description' as text input
+    df["text_input"] = df["Property Title"].fillna('') + ". " + df["Description"].fillna('')
+    return df
+
+
+def load_listings(input_path: str, id_column: str = "ID") -> pd.DataFrame:
+    return _add_text_input(pd.read_csv(input_path), id_column)
+
+
+def iter_listings(input_path: str, id_column: str = "ID", chunk_size: int = 50):
+    """Yields the listings of input_path as DataFrames of at most chunk_size rows."""
+    offset = 0
+    for chunk in pd.read_csv(input_path, chunksize=chunk_size):
+        yield _add_text_input(chunk, id_column, offset)
+        offset += len(chunk)
+
+
+def completed_ids(output_path: str, id_column: str = "ID") -> set:
+    """
+    IDs already written to the output by a previous (possibly interrupted) run.
+
+    A run killed while writing can leave a partial last record. The file is
+    truncated to its last complete record, so that record is extracted again
+    and the rows appended next start on a line of their own.
+    """
+    if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+        return set()
+    done = set()
+    consumed = complete = 0
+    last_line = b""
+
+    with open(output_path, "rb+") as handle:
+        def lines():
+            nonlocal consumed, last_line
+            for line in handle:
+                consumed += len(line)
+                last_line = line
+                yield line.decode("utf-8", errors="replace")
+
+        # The reader pulls only the lines of the record it returns, so `consumed` ends at that record
+        reader = csv.reader(lines(), strict=True)
+        column = None
+        try:
+            for row in reader:
+                if not last_line.endswith(b"\n"):
+                    break
+                complete = consumed
+                if column is None:
+                    column = row.index(id_column)
+                elif row:
+                    done.add(row[column])
+        except csv.Error:
+            # An unterminated quoted field: the record was cut off
+            pass
+        if complete < os.path.getsize(output_path):
+            print(f"Dropping a partial last record from {output_path}")
+            handle.truncate(complete)
+    return done
+
+
+def _output_header(output_path: str):
+    """The header of an existing output file, or None to start a new one."""
+    if not os.path.exists(output_path) or os.path.getsize(output_path) == 0:
+        return None
+    with open(output_path, newline="") as handle:
+        return next(csv.reader(handle))
+
+
+def run_extraction(input_path: str, output_path: str, backend, workers: int = 4,
+                   chunk_size: int = 50, id_column: str = "ID", cache=None, batch_size: int = 1,
+                   fields: list = FIELDS, use_rules: bool = True, order: str = "input") -> int:
+    """
+    Extracts every listing in input_path that is not yet in output_path.
+
+    The input is read `chunk_size` rows at a time and listings are sent to
+    the backend by a pool of `workers` threads, with at most 2 * workers
+    requests in flight, so memory stays flat whatever the input size. Each
+    row is appended to the output (and flushed) as soon as it can be written:
+    with order="input" rows keep the input order, with order="completion"
+    they are written as their requests finish. Either way the output can be
+    read while the job runs, and re-running after a crash skips the IDs
+    already written. With a cache, listings whose text was already extracted
+    are not sent again. With batch_size > 1, each request packs that many
+    listings into one prompt. Only `fields` are extracted; with use_rules,
+    fields that extract_rules() resolves are filled without the model.
+
+    Returns:
+        int: The number of listings extracted in this run.
+    """
+    if order not in ("input", "completion"):
+        raise ValueError(f"order must be 'input' or 'completion', not {order!r}")
+    done = completed_ids(output_path, id_column)
+    if done:
+        print(f"Resuming: {len(done)} listings already in {output_path}")
+
+    header = _output_header(output_path)
+    rule_fields = llm_skipped = extracted = 0
+
+    def batches():
+        nonlocal rule_fields, llm_skipped
+        for chunk in iter_listings(input_path, id_column, chunk_size):
+            chunk = chunk[~chunk[id_column].astype(str).isin(done)]
+            # None instead of NaN so missing values are written as empty cells, like to_csv
+            records = chunk.astype(object).where(chunk.notna(), None).to_dict("records")
+            for i in range(0, len(records), batch_size):
+                batch = records[i:i + batch_size]
+                texts = [record["text_input"] for record in batch]
+                rules = [extract_rules(text) for text in texts] if use_rules else [{} for _ in texts]
+                resolved = [sum(field in rule for field in fields) for rule in rules]
+                rule_fields += sum(resolved)
+                llm_skipped += sum(n == len(fields) for n in resolved)
+                yield batch, texts, rules
+
+    with open(output_path, "a", newline="") as handle, \
+            ThreadPoolExecutor(max_workers=workers) as pool, tqdm(desc="Extracting info") as progress:
+        writer = None
+
+        def write(batch, results):
+            nonlocal writer, extracted
+            if writer is None:
+                columns = header or list(batch[0]) + list(fields)
+                writer = csv.DictWriter(handle, fieldnames=columns, extrasaction="ignore")
+                if header is None:
+                    writer.writeheader()
+            for record, result in zip(batch, results):
+                writer.writerow({**record, **result})
+            handle.flush()
+            extracted += len(batch)
+            progress.update(len(batch))
+
+        in_flight = {}
+        for batch, texts, rules in batches():
+            if len(in_flight) >= 2 * workers:
+                if order == "input":
+                    # The oldest request holds the next rows to write
+                    oldest = next(iter(in_flight))
+                    write(in_flight.pop(oldest), oldest.result())
+                else:
+                    finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        write(in_flight.pop(future), future.result())
+            in_flight[pool.submit(extract_batch, texts, backend, cache, fields, rules)] = batch
+        pending = list(in_flight) if order == "input" else as_completed(in_flight)
+        for future in pending:
+            write(in_flight[future], future.result())
+
+    if use_rules:
+        print(f"Rules: {rule_fields} fields filled, {llm_skipped} of {extracted} listings needed no LLM call")
+    if cache is not None:
+        stats = cache.stats()
+        print(f"Cache: {stats['hits']} hits, {stats['misses']} misses ({stats['hit_rate']:.1%} hit rate)")
+    return extracted
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract structured fields from rental listings with a local LLM.")
+    parser.add_argument("--input", default="nlp_text_contracts.csv")
+    parser.add_argument("--output", default="extracted_contracts.csv")
+    parser.add_argument("--backend", choices=["cli", "http"], default="cli",
+                        help="'cli' spawns `ollama run` per listing; 'http' uses the Ollama server API")
+    parser.add_argument("--model", default="mistral")
+    parser.add_argument("--url", default="http://localhost:11434", help="server URL for the http backend")
+    parser.add_argument("--workers", type=int, default=4,
+                        help="concurrent requests (match the server's OLLAMA_NUM_PARALLEL)")
+    parser.add_argument("--chunk-size", type=int, default=50, help="input rows read at a time")
+    parser.add_argument("--order", choices=["input", "completion"], default="input",
+                        help="write rows in input order, or as soon as each finishes")
+    parser.add_argument("--id-column", default="ID")
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="listings packed into one prompt; failed items are re-queried one by one")
+    parser.add_argument("--cache", default="extraction_cache.sqlite",
+                        help="SQLite file caching results by listing text, model and prompt version")
+    parser.add_argument("--no-cache", action="store_true")
+    parser.add_argument("--fields", nargs="+", choices=FIELDS, default=FIELDS,
+                        help="fields to extract; listings whose fields the rules all resolve skip the LLM")
+    parser.add_argument("--no-rules", action="store_true",
+                        help="ask the LLM for every field instead of filling literal mentions by regex first")
+    args = parser.parse_args()
+
+    if args.backend == "http":
+        backend = OllamaHTTPBackend(args.model, args.url)
+    else:
+        backend = OllamaCLIBackend(args.model)
+
+    cache = None if args.no_cache else ExtractionCache(args.cache, args.model, PROMPT_VERSION)
+
+    # Step 4: Extract, appending each row to the output CSV as it completes
+    run_extraction(args.input, args.output, backend, args.workers, args.chunk_size, args.id_column, cache,
+                   args.batch_size, args.fields, not args.no_rules, args.order)
+    print(f"Extraction complete! Saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+import re
+
+# Fields the rules below can fill without the LLM
+RULE_FIELDS = ["bedrooms", "number_of_people", "pets_allowed", "bathroom_type"]
+
+_NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8,
+    "single": 1,
+}
+_NUMBER = r"(\d{1,2}|" + "|".join(_NUMBER_WORDS) + r")"
+
+_BEDROOMS = re.compile(_NUMBER + r"[\s-]*(?:bed(?:room)?s?\b(?!\s*(?:frame|sheet|linen)s?)|br\b|bdrms?\b|bd\b)", re.I)
+_BEDROOMS_EXCLUDE = re.compile(r"\b(?:queen|king|double|twin|single|full)[\s-]+beds?\b", re.I)
+# A room rented in a larger home: the home's bedroom count is not what the listing offers
+_ROOM_RENTAL = re.compile(
+    r"\b(?:private|single|furnished|spare|master|bright|clean|one)\s+(?:bed)?room\b(?!\s+(?:suite|apartment|unit|basement))"
+    r"|\brooms?\s+(?:for\s+rent|available|#)|\bin\s+(?:a|the|this)\s+\S+[\s-]bed(?:room)?\b"
+    r"|\bsingle[\s-]family\b",
+    re.I,
+)
+_PEOPLE = re.compile(r"(?<!with\s)\b" + _NUMBER + r"\s+(?:people|persons?|occupants?|tenants?|roommates?|adults?)\b", re.I)
+
+_NO_PETS = re.compile(
+    r"\bno\s+(?:pets?|cats?|dogs?|animals?)\b|\bpets?\s+(?:are\s+)?not\s+(?:allowed|permitted|accepted)\b"
+    r"|\bnot\s+pet[\s-]friendly\b",
+    re.I,
+)
+_PETS_OK = re.compile(
+    r"\bpets?\s+(?:are\s+)?(?:allowed|welcome|ok|okay|negotiable|considered)\b|(?<!not\s)\bpet[\s-]friendly\b",
+    re.I,
+)
+
+_PRIVATE_BATH = re.compile(
+    r"\b(?:private|own|ensuite|en[\s-]suite)\s+(?:full\s+)?(?:bath(?:room)?|washroom)s?\b|\ben[\s-]?suite\b", re.I
+)
+_SHARED_BATH = re.compile(r"\bshared?\s+(?:full\s+)?(?:bath(?:room)?|washroom)s?\b", re.I)
+
+
+def _to_int(token: str) -> int:
+    token = token.lower()
+    return int(token) if token.isdigit() else _NUMBER_WORDS[token]
+
+
+def _single_number(pattern, text: str, exclude=None):
+    """The number stated by every match of pattern, or None if absent or conflicting."""
+    if exclude is not None:
+        text = exclude.sub(" ", text)
+    values = {_to_int(m.group(1)) for m in pattern.finditer(text)}
+    return str(values.pop()) if len(values) == 1 else None
+
+
+def _either(positive, negative, text: str, yes: str, no: str):
+    """yes/no if exactly one of the two patterns matches, else None."""
+    has_positive, has_negative = bool(positive.search(text)), bool(negative.search(text))
+    if has_positive == has_negative:
+        return None
+    return yes if has_positive else no
+
+
+def extract_rules(text: str) -> dict:
+    """
+    Fills the fields a listing states literally, e.g. "2 bedroom", "no pets".
+
+    A field is only returned when the text is unambiguous: conflicting
+    mentions ("private bathroom ... shared bathroom", "1 bedroom in a 4
+    bedroom house") leave it for the LLM. Values use the same strings the LLM
+    is asked for.
+
+    Args:
+        text (str): The listing title and description.
+
+    Returns:
+        dict: The resolved subset of RULE_FIELDS.
+    """
+    candidates = {
+        "bedrooms": None if _ROOM_RENTAL.search(text) else _single_number(_BEDROOMS, text, exclude=_BEDROOMS_EXCLUDE),
+        "number_of_people": _single_number(_PEOPLE, text),
+        "pets_allowed": _either(_PETS_OK, _NO_PETS, text, "true", "false"),
+        "bathroom_type": _either(_PRIVATE_BATH, _SHARED_BATH, text, "private", "shared"),
+    }
+    return {field: value for field, value in candidates.items() if value is not None}
@@ -0,0 +1,141 @@
+"""
+Checks contract_features.py against the row-wise code of contracts_analysis.ipynb.
+
+Compares the contract length with diff_months_rounded (relativedelta) on
+the contracts export plus random date pairs that cover month ends, leap
+days, times of day and contracts ending before they start, and the Home
+Details and postal code columns with the notebook's extract_items /
+MultiLabelBinarizer and regex code. Exits non-zero on any difference.
+
+Run from code/PricePredictions (needs python-dateutil and scikit-learn):
+    python check_contract_features.py [--contracts ../Dashboard/Dash/data/contracts.csv] [--pairs 200000]
+"""
+import argparse
+import sys
+import time
+import numpy as np
+import pandas as pd
+from dateutil.relativedelta import relativedelta
+from sklearn.preprocessing import MultiLabelBinarizer
+from contract_features import (CONTRACT_LENGTH_COLUMN, HOME_DETAILS_LISTS, POSTAL_CODE_PATTERN,
+                               clean_postal_codes, contract_length_months, home_details_features)
+
+DATE_COLUMNS = [
+    'Start Date', 'End Date', 'Created Date', 'Signed Date',
+    'Contract Termination Date', 'Deadline', 'Created At', 'Updated At'
+]
+
+
+def diff_months_rounded(end, start):
+    rd = relativedelta(end, start)
+    total_months = rd.years * 12 + rd.months
+    # Round up if 15 or more days
+    if rd.days >= 15:
+        total_months += 1
+    return total_months
+
+
+def legacy_length(contracts):
+    return contracts.apply(lambda row: diff_months_rounded(row['End Date'], row['Start Date']), axis=1)
+
+
+def extract_items(text, label):
+    match = pd.Series(text).str.extract(rf'{label}:\s*(.*?);')[0]
+    return match.fillna('').str.split(r',\s*')
+
+
+def binarize_column(df, column_name, prefix):
+    mlb = MultiLabelBinarizer()
+    transformed = pd.DataFrame(
+        mlb.fit_transform(df[column_name]),
+        columns=[f'{prefix}: {item}' for item in mlb.classes_],
+        index=df.index
+    )
+    return transformed
+
+
+def legacy_home_details(contracts):
+    lists = pd.DataFrame(index=contracts.index)
+    for label in HOME_DETAILS_LISTS:
+        lists[label] = extract_items(contracts['Home Details'], label)
+    one_hot = pd.concat([binarize_column(lists, label, prefix) for label, prefix in HOME_DETAILS_LISTS.items()],
+                        axis=1)
+    fields = pd.DataFrame({
+        'Bed Type': contracts['Home Details'].str.extract(r'Bed Type:\s*([^;]+)')[0],
+        'Property Type': contracts['Home Details'].str.extract(r'Property Type:\s*([^;]+)')[0],
+    })
+    return fields, one_hot
+
+
+def legacy_postal_codes(zip_codes):
+    zip_codes = zip_codes.str.replace(r'\s+', '', regex=True).str.upper()
+    return zip_codes.where(zip_codes.str.match(POSTAL_CODE_PATTERN))
+
+
+def random_date_pairs(n, seed=0):
+    """Start/end pairs biased towards month ends, leap days and short or negative spans."""
+    rng = np.random.default_rng(seed)
+    base = np.datetime64('2019-01-01') + rng.integers(0, 2500, n).astype('timedelta64[D]')
+    month_end = (base.astype('datetime64[M]') + 1).astype('datetime64[D]') - rng.integers(1, 4, n).astype('timedelta64[D]')
+    start = np.where(rng.random(n) < 0.5, month_end, base).astype('datetime64[ns]')
+    span = rng.integers(-400, 1200, n).astype('timedelta64[D]')
+    end = (start + span).astype('datetime64[ns]')
+    # A quarter of the pairs carry a time of day on either side
+    seconds = rng.integers(0, 86400, n).astype('timedelta64[s]')
+    timed = rng.random(n) < 0.25
+    start = np.where(timed & (rng.random(n) < 0.5), start + seconds, start)
+    end = np.where(timed & (rng.random(n) < 0.5), end + seconds, end)
+    return pd.DataFrame({'Start Date': start, 'End Date': end})
+
+
+def report(name, ok, legacy_seconds, vector_seconds):
+    speedup = legacy_seconds / vector_seconds if vector_seconds else float('inf')
+    print(f"{name:<26} {'identical' if ok else 'DIFFERENT':<10} row-wise {legacy_seconds:7.3f} s  "
+          f"vectorized {vector_seconds:7.3f} s  ({speedup:,.0f}x)")
+    return ok
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--contracts", default="../Dashboard/Dash/data/contracts.csv")
+    parser.add_argument("--pairs", type=int, default=200000, help="random date pairs to check the length on")
+    args = parser.parse_args()
+
+    contracts = pd.read_csv(args.contracts)
+    for column in DATE_COLUMNS:
+        contracts[column] = pd.to_datetime(contracts[column], errors='coerce')
+    # relativedelta cannot take NaT; the notebook's data has no missing start/end dates
+    dated = contracts.dropna(subset=['Start Date', 'End Date'])
+    pairs = random_date_pairs(args.pairs)
+    print(f"{len(contracts):,} contracts ({len(dated):,} with both dates), {len(pairs):,} random date pairs")
+
+    results = []
+    for name, frame in [("length (contracts)", dated), ("length (random pairs)", pairs)]:
+        expected, legacy_seconds = timed(lambda: legacy_length(frame))
+        actual, vector_seconds = timed(lambda: contract_length_months(frame['End Date'], frame['Start Date']))
+        ok = actual.equals(expected.rename(CONTRACT_LENGTH_COLUMN))
+        if not ok:
+            diff = frame[actual != expected].assign(expected=expected, actual=actual)
+            print(diff.head(10).to_string())
+        results.append(report(name, ok, legacy_seconds, vector_seconds))
+
+    (expected_fields, expected_one_hot), legacy_seconds = timed(lambda: legacy_home_details(contracts))
+    (fields, one_hot), vector_seconds = timed(lambda: home_details_features(contracts['Home Details']))
+    ok = fields.equals(expected_fields) and one_hot.equals(expected_one_hot)
+    results.append(report("Home Details", ok, legacy_seconds, vector_seconds))
+
+    expected, legacy_seconds = timed(lambda: legacy_postal_codes(contracts['Zip Code']))
+    actual, vector_seconds = timed(lambda: clean_postal_codes(contracts['Zip Code']))
+    results.append(report("postal codes", actual.equals(expected), legacy_seconds, vector_seconds))
+
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
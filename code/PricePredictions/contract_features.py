@@ -0,0 +1,193 @@
+"""
+Vectorized feature engineering for the rental contracts (contracts_analysis.ipynb).
+
+The notebook derived these columns row by row: a relativedelta per contract
+for the contract length, and a regex per row and label for Home Details.
+Here the contract length is NumPy month/day arithmetic over the date
+columns, and the Home Details text (which repeats for every contract of a
+property) is parsed once per distinct value.
+"""
+import re
+import numpy as np
+import pandas as pd
+
+CONTRACT_LENGTH_COLUMN = 'Contract Length (months, rounded)'
+
+# Home Details list fields and the prefix of their one-hot columns
+HOME_DETAILS_LISTS = {
+    'Furnishings': 'Furnishing',
+    'Safety Features': 'Safety',
+    'Amenities': 'Amenity',
+    'House Rules': 'Rule',
+}
+HOME_DETAILS_FIELDS = ['Bed Type', 'Property Type']
+
+POSTAL_CODE_PATTERN = r'^[A-Z]\d[A-Z]\d[A-Z]\d$'
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_ITEM_SEPARATOR_RE = re.compile(r',\s*')
+
+_DAY = np.timedelta64(1, 'D')
+
+
+def _add_months(start: np.ndarray, months: np.ndarray) -> np.ndarray:
+    """start + relativedelta(months=months): the day is clipped to the target month's length."""
+    start_month = start.astype('datetime64[M]')
+    start_day = start.astype('datetime64[D]')
+    target = start_month + months.astype('timedelta64[M]')
+    month_length = ((target + 1).astype('datetime64[D]') - target.astype('datetime64[D]')) // _DAY
+    day = np.minimum((start_day - start_month.astype('datetime64[D]')) // _DAY, month_length - 1)
+    return target.astype('datetime64[D]') + day.astype('timedelta64[D]') + (start - start_day)
+
+
+def contract_length_months(end, start) -> pd.Series:
+    """
+    Whole months from start to end, rounded up when 15 or more days remain.
+
+    Matches diff_months_rounded in contracts_analysis.ipynb, i.e.
+    relativedelta(end, start) years * 12 + months, plus one if its days are
+    15 or more; for contracts ending before they start that is the negative
+    month count, never rounded.
+
+    Args:
+        end (pd.Series): End dates (datetimes or parseable strings).
+        start (pd.Series): Start dates, aligned with end.
+
+    Returns:
+        pd.Series: The lengths, int64, or float64 with NaN where a date is
+            missing.
+    """
+    end = pd.to_datetime(pd.Series(end), errors='coerce')
+    start = pd.to_datetime(pd.Series(start, index=end.index), errors='coerce')
+    valid = (end.notna() & start.notna()).to_numpy()
+    e = end.to_numpy(dtype='datetime64[ns]')[valid]
+    s = start.to_numpy(dtype='datetime64[ns]')[valid]
+
+    # relativedelta's first guess from the calendar months, then stepped back
+    # while it overshoots end (towards start for negative spans)
+    months = (e.astype('datetime64[M]') - s.astype('datetime64[M]')).astype(np.int64)
+    forward = e >= s
+    shifted = _add_months(s, months)
+    while True:
+        overshoot = np.where(forward, e < shifted, e > shifted)
+        if not overshoot.any():
+            break
+        months = months + np.where(overshoot, np.where(forward, -1, 1), 0)
+        shifted = _add_months(s, months)
+
+    # relativedelta's days truncate towards zero, so negative spans never round up
+    remainder = e - shifted
+    days = np.where(remainder >= np.timedelta64(0), remainder // _DAY, -(-remainder // _DAY))
+    lengths = months + (days >= 15)
+
+    if valid.all():
+        return pd.Series(lengths, index=end.index, name=CONTRACT_LENGTH_COLUMN)
+    result = np.full(len(valid), np.nan)
+    result[valid] = lengths
+    return pd.Series(result, index=end.index, name=CONTRACT_LENGTH_COLUMN)
+
+
+def _list_pattern(label: str):
+    # As extract_items: lazy up to the next ';' on the same line, so a field
+    # without a trailing ';' (usually the last one, House Rules) is empty
+    return re.compile(rf'{label}:\s*(.*?);')
+
+
+def _field_pattern(label: str):
+    return re.compile(rf'{label}:\s*([^;]+)')
+
+
+def _parse_home_details(text):
+    if not isinstance(text, str):
+        return {label: [''] for label in HOME_DETAILS_LISTS}, {field: np.nan for field in HOME_DETAILS_FIELDS}
+    lists = {}
+    for label in HOME_DETAILS_LISTS:
+        match = _list_pattern(label).search(text)
+        lists[label] = _ITEM_SEPARATOR_RE.split(match.group(1) if match else '')
+    fields = {}
+    for field in HOME_DETAILS_FIELDS:
+        match = _field_pattern(field).search(text)
+        fields[field] = match.group(1) if match else np.nan
+    return lists, fields
+
+
+def home_details_features(details: pd.Series):
+    """
+    The Bed Type / Property Type fields and one-hot list items of Home Details.
+
+    Equivalent to cell 5 of contracts_analysis.ipynb: the one-hot columns
+    are named '<prefix>: <item>' and sorted per field, as MultiLabelBinarizer
+    names them (including the empty item of rows without the field).
+
+    Args:
+        details (pd.Series): The Home Details column.
+
+    Returns:
+        tuple: (fields, one_hot) DataFrames aligned with details; fields has
+            the HOME_DETAILS_FIELDS columns, one_hot int64 indicator columns
+            for each of HOME_DETAILS_LISTS in turn.
+    """
+    codes, uniques = pd.factorize(details, use_na_sentinel=False)
+    parsed = [_parse_home_details(text) for text in uniques]
+
+    fields = pd.DataFrame(
+        {field: np.array([p[1][field] for p in parsed], dtype=object)[codes] for field in HOME_DETAILS_FIELDS},
+        index=details.index,
+    )
+
+    blocks = []
+    for label, prefix in HOME_DETAILS_LISTS.items():
+        item_sets = [set(p[0][label]) for p in parsed]
+        classes = sorted(set().union(*item_sets)) if item_sets else []
+        position = {item: i for i, item in enumerate(classes)}
+        indicators = np.zeros((len(uniques), len(classes)), dtype=np.int64)
+        for row, items in enumerate(item_sets):
+            indicators[row, [position[item] for item in items]] = 1
+        blocks.append(pd.DataFrame(
+            indicators[codes], columns=[f'{prefix}: {item}' for item in classes], index=details.index,
+        ))
+    one_hot = pd.concat(blocks, axis=1) if blocks else pd.DataFrame(index=details.index)
+    return fields, one_hot
+
+
+def clean_postal_codes(zip_codes: pd.Series) -> pd.Series:
+    """
+    Postal codes without whitespace and uppercased, NaN where not a valid
+    Canadian code (cell 6 of contracts_analysis.ipynb).
+    """
+    codes, uniques = pd.factorize(zip_codes)
+    cleaned = []
+    for value in uniques:
+        if isinstance(value, str):
+            value = _WHITESPACE_RE.sub('', value).upper()
+            cleaned.append(value if re.match(POSTAL_CODE_PATTERN, value) else np.nan)
+        else:
+            cleaned.append(np.nan)
+    lookup = np.empty(len(cleaned) + 1, dtype=object)
+    lookup[:len(cleaned)] = cleaned
+    lookup[-1] = np.nan
+    return pd.Series(lookup[codes], index=zip_codes.index, name=zip_codes.name)
+
+
+def add_contract_features(contracts: pd.DataFrame) -> pd.DataFrame:
+    """
+    The notebook's derived contract columns, added in its column order.
+
+    Adds Bed Type, Property Type and the Home Details one-hot columns,
+    validates Zip Code and appends the contract length. Expects the date
+    columns already parsed; test/demo rows are not dropped here.
+
+    Args:
+        contracts (pd.DataFrame): The contracts export.
+
+    Returns:
+        pd.DataFrame: A new frame with the derived columns.
+    """
+    fields, one_hot = home_details_features(contracts['Home Details'])
+    contracts = contracts.copy()
+    for field in HOME_DETAILS_FIELDS:
+        contracts[field] = fields[field]
+    contracts = pd.concat([contracts, one_hot], axis=1)
+    contracts['Zip Code'] = clean_postal_codes(contracts['Zip Code'])
+    contracts[CONTRACT_LENGTH_COLUMN] = contract_length_months(contracts['End Date'], contracts['Start Date'])
+    return contracts
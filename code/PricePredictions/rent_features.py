@@ -0,0 +1,177 @@
+"""
+The rent models' inputs: the contracts export prepared as in
+contracts_analysis.ipynb, and the encoder turning it into a feature matrix.
+
+DesignEncoder replaces the notebook's per-model-cell OneHotEncoder and City
+target encoding with one fitted object that the search (rent_search.py) and
+the saved predictor reuse.
+"""
+import numpy as np
+import pandas as pd
+from contract_features import HOME_DETAILS_LISTS, add_contract_features
+
+# Bump when prepare_contracts or DesignEncoder change what the features hold
+FEATURES_VERSION = "1"
+
+TARGET = 'Room Rent'
+
+# Columns never used as features: the target and the property identifier
+EXCLUDED_COLUMNS = [TARGET, 'Property Id']
+
+CONTRACT_PROVINCES = {
+    'Alberta': 'AB',
+    'British Columbia': 'BC',
+    'Manitoba': 'MB',
+    'New Brunswick': 'NB',
+    'Newfoundland and Labrador': 'NL',
+    'Nova Scotia': 'NS',
+    'Ontario': 'ON',
+    'Prince Edward Island': 'PE',
+    'Quebec': 'QC',
+    'Saskatchewan': 'SK',
+    'Northwest Territories': 'NT',
+    'Nunavut': 'NU',
+    'Yukon': 'YT'
+}
+CONTRACT_PROVINCES.update({abbr: abbr for abbr in list(CONTRACT_PROVINCES.values())})
+
+CONTRACT_DATE_COLUMNS = [
+    'Start Date', 'End Date', 'Created Date', 'Signed Date',
+    'Contract Termination Date', 'Deadline', 'Created At', 'Updated At'
+]
+
+CITY_ENCODINGS = ('onehot', 'target', 'both')
+
+# Export columns the derived features are computed from
+SOURCE_COLUMNS = ['Room Title', 'City', 'Province', 'Zip Code', 'Home Details', 'Start Date', 'End Date',
+                  'Created Date']
+
+_INDICATOR_PREFIXES = tuple(f'{prefix}: ' for prefix in HOME_DETAILS_LISTS.values())
+
+
+def prepare_listings(raw: pd.DataFrame) -> pd.DataFrame:
+    """
+    Contracts or listings with the notebook's cleaned and derived columns.
+
+    Cells 2-10 of contracts_analysis.ipynb except the removal of test rows:
+    provinces abbreviated, dates parsed, Home Details / postal code /
+    contract length features and Created Year added. SOURCE_COLUMNS missing
+    from raw are taken as empty, so a listing to score only needs the
+    columns it has.
+
+    Args:
+        raw (pd.DataFrame): Rows in the rental contracts export's format.
+
+    Returns:
+        pd.DataFrame: The prepared rows.
+    """
+    missing = [column for column in SOURCE_COLUMNS if column not in raw.columns]
+    listings = raw.reindex(columns=list(raw.columns) + missing) if missing else raw.copy()
+    listings['Province'] = listings['Province'].map(CONTRACT_PROVINCES)
+    for column in CONTRACT_DATE_COLUMNS:
+        if column in listings.columns:
+            listings[column] = pd.to_datetime(listings[column], errors='coerce')
+    listings = add_contract_features(listings)
+    listings['Created Year'] = listings['Created Date'].dt.year
+    return listings
+
+
+def prepare_contracts(raw: pd.DataFrame) -> pd.DataFrame:
+    """
+    The contracts export as the models are trained on it: prepare_listings()
+    without the test and demo contracts.
+
+    Args:
+        raw (pd.DataFrame): The rental contracts export.
+
+    Returns:
+        pd.DataFrame: The prepared contracts.
+    """
+    contracts = prepare_listings(raw)
+    return contracts[~contracts['Room Title'].str.contains('test|demo', case=False, na=False)].copy()
+
+
+class DesignEncoder:
+    """
+    Encodes prepared contracts as the models' feature matrix.
+
+    The features are the numeric and boolean columns (except the target and
+    Property Id) followed by the City encoding of the notebook's models:
+    one-hot columns with the first city dropped and unknown cities all zero
+    (OneHotEncoder(drop='first', handle_unknown='ignore')), a City_TE column
+    with the training mean rent per city (unknown cities get the overall
+    mean), or both.
+
+    Args:
+        city_encoding (str): 'onehot', 'target' or 'both'.
+    """
+
+    def __init__(self, city_encoding: str = 'onehot'):
+        if city_encoding not in CITY_ENCODINGS:
+            raise ValueError(f"city_encoding must be one of {CITY_ENCODINGS}, not {city_encoding!r}")
+        self.city_encoding = city_encoding
+
+    @property
+    def uses_onehot(self) -> bool:
+        return self.city_encoding in ('onehot', 'both')
+
+    @property
+    def uses_target(self) -> bool:
+        return self.city_encoding in ('target', 'both')
+
+    def fit(self, contracts: pd.DataFrame, y: pd.Series = None):
+        """
+        Learns the feature columns and city categories (and the per-city mean of y).
+
+        Args:
+            contracts (pd.DataFrame): Prepared contracts.
+            y (pd.Series, optional): Rents aligned with contracts; required
+                for the target encoding.
+
+        Returns:
+            DesignEncoder: self.
+        """
+        numeric = contracts.select_dtypes(include=['number', 'bool']).columns
+        self.numeric_columns = [c for c in numeric if c not in EXCLUDED_COLUMNS]
+        self.indicator_positions = [i for i, c in enumerate(self.numeric_columns) if c.startswith(_INDICATOR_PREFIXES)]
+        self.cities = sorted(contracts['City'].dropna().unique()) if self.uses_onehot else []
+        if self.uses_target:
+            if y is None:
+                raise ValueError("the City target encoding needs y")
+            self.city_means = y.groupby(contracts['City']).mean().to_dict()
+            self.global_mean = float(y.mean())
+        self.columns = list(self.numeric_columns)
+        self.columns += [f'City_{city}' for city in self.cities[1:]]
+        if self.uses_target:
+            self.columns.append('City_TE')
+        return self
+
+    def city_codes(self, cities: pd.Series) -> np.ndarray:
+        """Position of each city in self.cities, -1 for unknown or missing ones."""
+        return pd.Categorical(cities, categories=self.cities).codes.astype(np.int64)
+
+    def transform(self, contracts: pd.DataFrame) -> np.ndarray:
+        """
+        The feature matrix of contracts, float64 with NaN for missing values.
+
+        Columns missing from contracts are taken as missing, except the
+        Home Details item indicators, which are 0 when no row being encoded
+        has the item.
+        """
+        numeric = contracts.reindex(columns=self.numeric_columns).to_numpy(dtype=np.float64, na_value=np.nan)
+        indicators = numeric[:, self.indicator_positions]
+        numeric[:, self.indicator_positions] = np.where(np.isnan(indicators), 0.0, indicators)
+        blocks = [numeric]
+        if self.uses_onehot:
+            codes = self.city_codes(contracts['City'])
+            onehot = np.zeros((len(contracts), max(len(self.cities) - 1, 0)))
+            rows = np.flatnonzero(codes >= 1)
+            onehot[rows, codes[rows] - 1] = 1.0
+            blocks.append(onehot)
+        if self.uses_target:
+            te = contracts['City'].map(self.city_means).astype(np.float64).fillna(self.global_mean)
+            blocks.append(te.to_numpy()[:, None])
+        return np.hstack(blocks)
+
+    def fit_transform(self, contracts: pd.DataFrame, y: pd.Series = None) -> np.ndarray:
+        return self.fit(contracts, y).transform(contracts)
@@ -0,0 +1,209 @@
+"""
+A saved rent-prediction model: the fitted feature encoding and regressor in one file.
+
+contracts_analysis.ipynb fits its encoders and models inside the notebook.
+RentPredictor bundles the feature derivation (rent_features.py), the fitted
+DesignEncoder and the regressor, so a caller loads one file and scores raw
+listings without refitting or re-encoding anything. Listings are scored in
+one vectorized call, whether there is one or thousands.
+
+Run from code/PricePredictions:
+    python rent_predictor.py train --contracts rental_contracts.csv --model rf --out rent_model.joblib [--search]
+    python rent_predictor.py score --model-path rent_model.joblib --input listings.csv --output scored.csv
+"""
+import argparse
+import os
+import time
+import joblib
+import numpy as np
+import pandas as pd
+from rent_features import FEATURES_VERSION, TARGET, DesignEncoder, prepare_contracts, prepare_listings
+from rent_search import (BOOSTED_MODELS, RANDOM_STATE, SEARCH_SPACES, TrialStore, early_stopping_split, fit_model,
+                         load_design_matrix, search)
+
+PREDICTION_COLUMN = 'Suggested Rent'
+
+# The notebook's models (cells 13-15, 21) for training without a search
+DEFAULT_PARAMS = {
+    'rf': {'n_estimators': 100},
+    'lgbm': {'learning_rate': 0.1, 'num_leaves': 31, 'feature_fraction': 0.8, 'bagging_fraction': 0.8,
+             'bagging_freq': 5, 'n_estimators': 500},
+    'xgb': {'n_estimators': 100, 'learning_rate': 0.1, 'max_depth': 6},
+}
+
+
+class RentPredictor:
+    """
+    Suggests monthly rents for listings in the contracts export's format.
+
+    Args:
+        encoder (DesignEncoder): Fitted on the training contracts.
+        estimator: The fitted regressor.
+        metadata (dict): How the model was trained (model, params, rows,
+            scores); saved along with it.
+    """
+
+    def __init__(self, encoder: DesignEncoder, estimator, metadata: dict):
+        self.encoder = encoder
+        self.estimator = estimator
+        self.metadata = metadata
+
+    def predict(self, listings: pd.DataFrame) -> np.ndarray:
+        """
+        Suggested rents for many listings at once.
+
+        Args:
+            listings (pd.DataFrame): Rows in the export's format. Only the
+                columns a listing has are needed; the rest count as missing.
+
+        Returns:
+            np.ndarray: One suggested rent per row.
+        """
+        if len(listings) == 0:
+            return np.empty(0)
+        X = self.encoder.transform(prepare_listings(listings))
+        return self.estimator.predict(X)
+
+    def predict_one(self, listing: dict) -> float:
+        """The suggested rent for one listing given as {column: value}."""
+        return float(self.predict(pd.DataFrame([listing]))[0])
+
+    def save(self, path: str):
+        """Saves the predictor; written to a temporary file first, so a server never loads half a model."""
+        tmp_path = path + '.tmp'
+        joblib.dump(self, tmp_path)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "RentPredictor":
+        """
+        Loads a saved predictor.
+
+        Raises:
+            ValueError: If it was saved by a version of the feature code that
+                derives its features differently.
+        """
+        predictor = joblib.load(path)
+        saved_version = predictor.metadata.get('features_version')
+        if saved_version != FEATURES_VERSION:
+            raise ValueError(f"{path} was trained with features version {saved_version}, "
+                             f"this code builds version {FEATURES_VERSION}; retrain it")
+        return predictor
+
+
+def train_predictor(contracts: pd.DataFrame, model: str = 'rf', params: dict = None,
+                    city_encoding: str = 'onehot') -> RentPredictor:
+    """
+    Fits the encoder and a regressor on prepared contracts.
+
+    Boosted models early-stop on a random 10% of the contracts, as in the
+    search.
+
+    Args:
+        contracts (pd.DataFrame): The output of prepare_contracts().
+        model (str): 'rf', 'lgbm' or 'xgb'.
+        params (dict, optional): Model parameters; DEFAULT_PARAMS otherwise.
+        city_encoding (str): See DesignEncoder.
+
+    Returns:
+        RentPredictor: The fitted predictor.
+    """
+    if model not in SEARCH_SPACES:
+        raise ValueError(f"unknown model {model!r}, expected one of {list(SEARCH_SPACES)}")
+    params = dict(DEFAULT_PARAMS[model] if params is None else params)
+    contracts = contracts[contracts[TARGET].notna()]
+    y = contracts[TARGET]
+    encoder = DesignEncoder(city_encoding)
+    X = encoder.fit_transform(contracts, y)
+    y = y.to_numpy(dtype=np.float64)
+
+    start = time.perf_counter()
+    if model in BOOSTED_MODELS:
+        rows = np.random.default_rng(RANDOM_STATE).permutation(len(y))
+        fit_rows, stop_rows = early_stopping_split(rows)
+        estimator, best_iteration = fit_model(model, params, X[fit_rows], y[fit_rows], X[stop_rows], y[stop_rows])
+    else:
+        estimator, best_iteration = fit_model(model, params, X, y)
+    if hasattr(estimator, 'n_jobs'):
+        # One listing at a time is faster without a thread pool
+        estimator.set_params(n_jobs=1)
+
+    metadata = {
+        'model': model,
+        'params': params,
+        'city_encoding': city_encoding,
+        'features_version': FEATURES_VERSION,
+        'best_iteration': best_iteration,
+        'training_rows': len(y),
+        'features': len(encoder.columns),
+        'fit_seconds': time.perf_counter() - start,
+        'trained_at': pd.Timestamp.now().isoformat(timespec='seconds'),
+    }
+    return RentPredictor(encoder, estimator, metadata)
+
+
+def train(args):
+    params = None
+    metadata = {}
+    if args.search:
+        # Reuses every trial already in the store, so a repeated search is instant
+        data = load_design_matrix(args.contracts, args.city_encoding, args.cache_dir)
+        store = TrialStore(args.store)
+        try:
+            result = search(args.model, data, store, args.candidates, verbose=False)
+        finally:
+            store.close()
+        params = result['params']
+        metadata = {'cv_rmse': result['cv_rmse'], 'test_rmse': result['test_rmse']}
+        print(f"search: {params}  CV RMSE {result['cv_rmse']:.2f}  test RMSE {result['test_rmse']:.2f}")
+
+    contracts = prepare_contracts(pd.read_csv(args.contracts))
+    predictor = train_predictor(contracts, args.model, params, args.city_encoding)
+    predictor.metadata.update(metadata)
+    predictor.save(args.out)
+    print(f"saved {args.model} trained on {predictor.metadata['training_rows']} contracts "
+          f"({predictor.metadata['features']} features) to {args.out}")
+
+
+def score(args):
+    start = time.perf_counter()
+    predictor = RentPredictor.load(args.model_path)
+    loaded = time.perf_counter()
+    listings = pd.read_csv(args.input)
+    listings[PREDICTION_COLUMN] = predictor.predict(listings).round(2)
+    scored = time.perf_counter()
+    listings.to_csv(args.output, index=False)
+    print(f"scored {len(listings)} listings in {scored - loaded:.3f} s (model loaded in {loaded - start:.3f} s), "
+          f"wrote {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train or apply a saved rent-prediction model.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    train_parser = commands.add_parser("train", help="fit and save a predictor")
+    train_parser.add_argument("--contracts", default="rental_contracts.csv")
+    train_parser.add_argument("--model", choices=list(SEARCH_SPACES), default='rf')
+    train_parser.add_argument("--city-encoding", choices=['onehot', 'target', 'both'], default='onehot')
+    train_parser.add_argument("--out", default="rent_model.joblib")
+    train_parser.add_argument("--search", action="store_true",
+                              help="use the best parameters of rent_search.py instead of the notebook's")
+    train_parser.add_argument("--candidates", type=int, default=None, help="see rent_search.py")
+    train_parser.add_argument("--store", default="rent_trials.sqlite")
+    train_parser.add_argument("--cache-dir", default=".design_cache")
+    train_parser.set_defaults(func=train)
+
+    score_parser = commands.add_parser("score", help="suggest rents for a CSV of listings")
+    score_parser.add_argument("--model-path", default="rent_model.joblib")
+    score_parser.add_argument("--input", required=True, help="listings in the contracts export's format")
+    score_parser.add_argument("--output", required=True)
+    score_parser.set_defaults(func=score)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    # Run from the imported module, so saved predictors unpickle as rent_predictor.RentPredictor
+    import rent_predictor
+    rent_predictor.main()
@@ -0,0 +1,442 @@
+"""
+Hyperparameter search for the rent models of contracts_analysis.ipynb.
+
+The notebook ran exhaustive GridSearchCV over its RandomForest and LightGBM
+grids. This search:
+
+- encodes the contracts once and caches the design matrix on disk (keyed by
+  the export's contents), so later searches on the same export skip
+  preparing and encoding it; only the City target encoding, which depends
+  on the training rows, is recomputed per fold;
+- runs successive halving: every candidate is cross-validated on a small
+  budget, and only the best 1/factor go on to the next rung with factor
+  times the budget. The budget is the number of trees for the random
+  forest (whose cost is mostly per tree on data this size) and a sample
+  of each training fold for the boosted models, which also stop adding
+  trees once a held-out slice of their training rows stops improving;
+- spreads the trials of a rung over all cores with joblib;
+- stores every trial's RMSE in a SQLite file, so a later or interrupted
+  search reuses the trials it has already run.
+
+Run from code/PricePredictions:
+    python rent_search.py --contracts rental_contracts.csv --models rf lgbm [--jobs -1] [--candidates 100]
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import math
+import os
+import random
+import sqlite3
+import time
+import warnings
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.model_selection import KFold, train_test_split
+from rent_features import FEATURES_VERSION, TARGET, DesignEncoder, prepare_contracts
+
+RANDOM_STATE = 42
+
+# The notebook's grids (cells 19 and 22); xgb searches around its fixed settings
+SEARCH_SPACES = {
+    'rf': {
+        'n_estimators': [100, 200, 300],
+        'max_depth': [5, 10, 15, 20, None],
+        'min_samples_split': [2, 5, 10],
+        'min_samples_leaf': [1, 2, 4],
+        'max_features': ['sqrt', 'log2', 0.5],
+    },
+    'lgbm': {
+        'num_leaves': [31, 50, 70],
+        'max_depth': [-1, 10, 20],
+        'learning_rate': [0.1, 0.05, 0.01],
+        'n_estimators': [100, 200, 500],
+        'feature_fraction': [0.8, 1.0],
+        'bagging_fraction': [0.8, 1.0],
+        'bagging_freq': [5, 10],
+    },
+    'xgb': {
+        'n_estimators': [100, 200, 500],
+        'learning_rate': [0.1, 0.05],
+        'max_depth': [3, 6, 9],
+        'subsample': [0.8, 1.0],
+        'colsample_bytree': [0.8, 1.0],
+    },
+}
+BOOSTED_MODELS = ('lgbm', 'xgb')
+
+# What successive halving grows per rung: a parameter of the model (taken
+# out of its grid and raised up to the grid's largest value), or 'rows'
+HALVING_RESOURCES = {'rf': 'n_estimators'}
+MIN_RESOURCES = {'rows': 100, 'n_estimators': 10}
+EARLY_STOPPING_ROUNDS = 20
+# Share of a boosted model's training rows held out to decide when to stop
+EARLY_STOPPING_FRACTION = 0.1
+
+
+def make_estimator(model: str, params: dict):
+    """
+    An unfitted regressor of the given kind, single-threaded since the
+    search runs trials in parallel instead.
+    """
+    if model == 'rf':
+        from sklearn.ensemble import RandomForestRegressor
+        return RandomForestRegressor(random_state=RANDOM_STATE, n_jobs=1, **params)
+    if model == 'lgbm':
+        from lightgbm import LGBMRegressor
+        return LGBMRegressor(objective='regression', random_state=RANDOM_STATE, n_jobs=1, verbose=-1, **params)
+    if model == 'xgb':
+        from xgboost import XGBRegressor
+        return XGBRegressor(objective='reg:squarederror', random_state=RANDOM_STATE, n_jobs=1,
+                            early_stopping_rounds=EARLY_STOPPING_ROUNDS, **params)
+    raise ValueError(f"unknown model {model!r}, expected one of {list(SEARCH_SPACES)}")
+
+
+def grid_candidates(space: dict) -> list:
+    """Every combination of a parameter grid, as dicts."""
+    names = list(space)
+    return [dict(zip(names, values)) for values in itertools.product(*(space[n] for n in names))]
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_design_matrix(contracts_path: str, city_encoding: str = 'onehot', cache_dir: str = ".design_cache") -> dict:
+    """
+    The encoded contracts, from cache_dir when this export was encoded before.
+
+    The City one-hot columns cover every city of the export (they do not
+    depend on the rents); the City_TE column, if any, is recomputed per
+    training fold by the search.
+
+    Args:
+        contracts_path (str): The rental contracts export.
+        city_encoding (str): See DesignEncoder.
+        cache_dir (str): Where encoded matrices are kept.
+
+    Returns:
+        dict: 'X' (float64 matrix), 'y', 'city_codes' (for the target
+            encoding), 'columns', 'city_encoding' and 'digest'.
+    """
+    digest = hashlib.sha256(
+        f"{_file_digest(contracts_path)}\x00{city_encoding}\x00{FEATURES_VERSION}".encode()
+    ).hexdigest()
+    cache_path = os.path.join(cache_dir, f"design_{digest[:16]}.npz")
+    if os.path.exists(cache_path):
+        with np.load(cache_path, allow_pickle=False) as cached:
+            return {
+                'X': cached['X'], 'y': cached['y'], 'city_codes': cached['city_codes'],
+                'columns': json.loads(str(cached['columns'])), 'city_encoding': city_encoding, 'digest': digest,
+            }
+
+    contracts = prepare_contracts(pd.read_csv(contracts_path))
+    contracts = contracts[contracts[TARGET].notna()]
+    encoder = DesignEncoder(city_encoding)
+    X = encoder.fit_transform(contracts, contracts[TARGET])
+    y = contracts[TARGET].to_numpy(dtype=np.float64)
+    city_codes = pd.factorize(contracts['City'])[0].astype(np.int64)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = cache_path + ".tmp.npz"
+    np.savez(tmp_path, X=X, y=y, city_codes=city_codes, columns=json.dumps(encoder.columns))
+    os.replace(tmp_path, cache_path)
+    return {'X': X, 'y': y, 'city_codes': city_codes, 'columns': encoder.columns,
+            'city_encoding': city_encoding, 'digest': digest}
+
+
+def _target_encoding(city_codes, y, fit_rows, rows):
+    # Mean rent per city over fit_rows; unknown and missing cities get the overall mean
+    codes = city_codes[fit_rows]
+    known = codes >= 0
+    size = int(city_codes.max()) + 1 if len(city_codes) else 0
+    sums = np.bincount(codes[known], weights=y[fit_rows][known], minlength=size)
+    counts = np.bincount(codes[known], minlength=size)
+    overall = float(y[fit_rows].mean())
+    means = np.where(counts > 0, sums / np.maximum(counts, 1), overall)
+    return np.where(city_codes[rows] >= 0, means[np.maximum(city_codes[rows], 0)], overall)
+
+
+def _features(data, fit_rows, rows):
+    X = data['X'][rows]
+    if data['city_encoding'] in ('target', 'both'):
+        X = X.copy()
+        X[:, -1] = _target_encoding(data['city_codes'], data['y'], fit_rows, rows)
+    return X
+
+
+def early_stopping_split(rows):
+    """Splits training rows into the rows a boosted model fits on and those it stops on."""
+    n_stop = max(1, int(len(rows) * EARLY_STOPPING_FRACTION))
+    return rows[:-n_stop], rows[-n_stop:]
+
+
+def fit_model(model: str, params: dict, X_fit, y_fit, X_stop=None, y_stop=None):
+    """
+    Fits a regressor; boosted models early-stop on (X_stop, y_stop).
+
+    Returns:
+        tuple: (estimator, best_iteration), the latter None for the forest.
+    """
+    estimator = make_estimator(model, params)
+    if model not in BOOSTED_MODELS:
+        estimator.fit(X_fit, y_fit)
+        return estimator, None
+    if model == 'lgbm':
+        from lightgbm import early_stopping
+        with warnings.catch_warnings():
+            # Recent LightGBM deprecates eval_set, which older versions need
+            warnings.simplefilter("ignore", FutureWarning)
+            estimator.fit(X_fit, y_fit, eval_set=[(X_stop, y_stop)], eval_metric='rmse',
+                          callbacks=[early_stopping(EARLY_STOPPING_ROUNDS, verbose=False)])
+        return estimator, int(estimator.best_iteration_ or params.get('n_estimators', 0))
+    estimator.fit(X_fit, y_fit, eval_set=[(X_stop, y_stop)], verbose=False)
+    return estimator, int(estimator.best_iteration) + 1
+
+
+def run_trial(model: str, params: dict, data: dict, train_rows, test_rows) -> dict:
+    """
+    Fits one candidate on train_rows and scores it on test_rows.
+
+    Returns:
+        dict: 'rmse', 'best_iteration' (boosted models, else None) and 'seconds'.
+    """
+    start = time.perf_counter()
+    y = data['y']
+    if model in BOOSTED_MODELS:
+        fit_rows, stop_rows = early_stopping_split(train_rows)
+        estimator, best_iteration = fit_model(model, params, _features(data, fit_rows, fit_rows), y[fit_rows],
+                                              _features(data, fit_rows, stop_rows), y[stop_rows])
+    else:
+        fit_rows = train_rows
+        estimator, best_iteration = fit_model(model, params, _features(data, fit_rows, fit_rows), y[fit_rows])
+    predictions = estimator.predict(_features(data, fit_rows, test_rows))
+    rmse = float(np.sqrt(np.mean((y[test_rows] - predictions) ** 2)))
+    return {'rmse': rmse, 'best_iteration': best_iteration, 'seconds': time.perf_counter() - start}
+
+
+class TrialStore:
+    """
+    Persistent record of search trials in a SQLite file.
+
+    A trial is keyed by the design matrix digest, the model, its parameters,
+    the number of training rows and the fold, so a search over the same
+    export reuses every trial an earlier search has run.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        # Trials are committed one by one; WAL keeps those commits cheap
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS trials ("
+                "key TEXT PRIMARY KEY, digest TEXT, model TEXT, params TEXT, resource INTEGER, fold TEXT, "
+                "rmse REAL, best_iteration INTEGER, seconds REAL)"
+            )
+
+    @staticmethod
+    def key(digest: str, model: str, params: dict, resource: int, fold: str) -> str:
+        payload = json.dumps([digest, model, params, resource, fold], sort_keys=True)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key: str):
+        """The stored trial as a dict, or None."""
+        row = self._conn.execute(
+            "SELECT rmse, best_iteration, seconds FROM trials WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        return {'rmse': row[0], 'best_iteration': row[1], 'seconds': row[2]}
+
+    def put(self, key: str, digest: str, model: str, params: dict, resource: int, fold: str, result: dict):
+        with self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO trials VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, digest, model, json.dumps(params, sort_keys=True), resource, fold,
+                 result['rmse'], result['best_iteration'], result['seconds']),
+            )
+
+    def close(self):
+        self._conn.close()
+
+
+def rung_resources(n_candidates: int, max_resources: int, min_resources: int, factor: int) -> list:
+    """
+    Training rows per rung: as many rungs as it takes to get down to one
+    candidate, starting no lower than min_resources and ending at max_resources.
+    """
+    n_rungs = 1 + math.ceil(math.log(max(n_candidates, 1), factor)) if n_candidates > 1 else 1
+    if min_resources < max_resources:
+        n_rungs = min(n_rungs, 1 + int(math.log(max_resources / min_resources, factor)))
+    else:
+        n_rungs = 1
+    return [max(min_resources, max_resources // factor ** (n_rungs - 1 - i)) for i in range(n_rungs)]
+
+
+def successive_halving(model: str, candidates: list, data: dict, train_rows, store: TrialStore, folds: int = 3,
+                       factor: int = 3, resource: str = 'rows', max_resources: int = None, min_resources: int = None,
+                       n_jobs: int = -1, verbose: bool = True) -> dict:
+    """
+    Cross-validated successive halving over candidates on data's train_rows.
+
+    Args:
+        model (str): A SEARCH_SPACES key.
+        candidates (list): Parameter dicts.
+        data (dict): The output of load_design_matrix().
+        train_rows (np.ndarray): Rows the search may train and validate on.
+        store (TrialStore): Where trials are looked up and recorded.
+        folds (int): Cross-validation folds.
+        factor (int): Share of candidates kept, and growth of the budget, per rung.
+        resource (str): 'rows' to train on a growing sample of each fold,
+            or a model parameter (not in the candidates) to raise instead.
+        max_resources (int): The last rung's budget; the training fold size
+            when resource is 'rows'.
+        min_resources (int): The first rung's budget (MIN_RESOURCES by default).
+        n_jobs (int): Parallel trials (joblib; -1 for all cores).
+        verbose (bool): Print a line per rung.
+
+    Returns:
+        dict: 'params' and 'cv_rmse' of the best candidate, 'rungs' (one
+            summary dict per rung) and the trials 'run' and 'reused'.
+    """
+    splits = list(KFold(folds, shuffle=True, random_state=RANDOM_STATE).split(train_rows))
+    # Fold training rows in a fixed random order, so each rung's sample extends the previous one
+    rng = np.random.default_rng(RANDOM_STATE)
+    fold_rows = [(rng.permutation(train_rows[fit]), train_rows[valid]) for fit, valid in splits]
+    fold_size = min(len(fit) for fit, _ in fold_rows)
+    if resource == 'rows':
+        max_resources = fold_size
+    if min_resources is None:
+        min_resources = MIN_RESOURCES.get(resource, 1)
+    resources = rung_resources(len(candidates), max_resources, min(min_resources, max_resources), factor)
+
+    def trial_params(i, budget):
+        return dict(candidates[i]) if resource == 'rows' else {**candidates[i], resource: budget}
+
+    surviving = list(range(len(candidates)))
+    rungs, run, reused = [], 0, 0
+    scores = {}
+    for rung, budget in enumerate(resources):
+        start = time.perf_counter()
+        n_rows = budget if resource == 'rows' else fold_size
+        results = {}
+        pending = []
+        for i in surviving:
+            params = trial_params(i, budget)
+            for fold, (fit, valid) in enumerate(fold_rows):
+                key = store.key(data['digest'], model, params, n_rows, f"{fold}/{folds}")
+                stored = store.get(key)
+                if stored is not None:
+                    results[(i, fold)] = stored
+                else:
+                    pending.append((i, fold, key, params, fit[:n_rows], valid))
+        reused += len(results)
+        run += len(pending)
+
+        def task(i, fold, key, params, fit, valid):
+            return i, fold, key, params, run_trial(model, params, data, fit, valid)
+
+        # Trials are recorded as they finish, so an interrupted rung resumes where it stopped
+        for i, fold, key, params, result in Parallel(n_jobs=n_jobs, return_as="generator_unordered")(
+                delayed(task)(*trial) for trial in pending):
+            store.put(key, data['digest'], model, params, n_rows, f"{fold}/{folds}", result)
+            results[(i, fold)] = result
+
+        scores = {i: float(np.mean([results[(i, fold)]['rmse'] for fold in range(folds)])) for i in surviving}
+        ranked = sorted(surviving, key=lambda i: (scores[i], i))
+        summary = {'rung': rung, 'resource': budget, 'candidates': len(surviving), 'run': len(pending),
+                   'reused': len(surviving) * folds - len(pending), 'best_rmse': scores[ranked[0]],
+                   'seconds': time.perf_counter() - start}
+        rungs.append(summary)
+        if verbose:
+            unit = 'rows' if resource == 'rows' else resource
+            print(f"  rung {rung}: {summary['candidates']:>4} candidates x {folds} folds, {budget:>5} {unit}  "
+                  f"{summary['run']:>5} run  {summary['reused']:>5} reused  best CV RMSE {summary['best_rmse']:.2f}  "
+                  f"({summary['seconds']:.1f} s)")
+        if rung < len(resources) - 1:
+            surviving = ranked[:max(1, math.ceil(len(ranked) / factor))]
+        else:
+            surviving = ranked
+
+    best = surviving[0]
+    return {'params': trial_params(best, resources[-1]), 'cv_rmse': scores[best], 'rungs': rungs, 'run': run, 'reused': reused}
+
+
+def search(model: str, data: dict, store: TrialStore, candidates: int = None, folds: int = 3, factor: int = 3,
+           min_resources: int = None, n_jobs: int = -1, verbose: bool = True) -> dict:
+    """
+    Searches a model's grid on the notebook's 80% training split and scores
+    the best candidate on the 20% test split.
+
+    Args:
+        candidates (int, optional): Search a random sample of this many grid
+            points instead of the whole grid.
+        Other arguments: See successive_halving().
+
+    Returns:
+        dict: successive_halving()'s result plus 'test_rmse'.
+    """
+    rows = np.arange(len(data['y']))
+    train_rows, test_rows = train_test_split(rows, test_size=0.2, random_state=RANDOM_STATE)
+    space = dict(SEARCH_SPACES[model])
+    resource = HALVING_RESOURCES.get(model, 'rows')
+    max_resources = max(space.pop(resource)) if resource != 'rows' else None
+    grid = grid_candidates(space)
+    if candidates is not None and candidates < len(grid):
+        grid = random.Random(RANDOM_STATE).sample(grid, candidates)
+
+    result = successive_halving(model, grid, data, train_rows, store, folds, factor, resource, max_resources,
+                                min_resources, n_jobs, verbose)
+    key = store.key(data['digest'], model, result['params'], len(train_rows), "test")
+    test = store.get(key)
+    if test is None:
+        test = run_trial(model, result['params'], data, train_rows, test_rows)
+        store.put(key, data['digest'], model, result['params'], len(train_rows), "test", test)
+    result['test_rmse'] = test['rmse']
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Successive-halving search for the rent models.")
+    parser.add_argument("--contracts", default="rental_contracts.csv")
+    parser.add_argument("--models", nargs="+", choices=list(SEARCH_SPACES), default=['rf', 'lgbm'])
+    parser.add_argument("--city-encoding", choices=['onehot', 'target', 'both'], default='onehot')
+    parser.add_argument("--candidates", type=int, default=None, help="random sample of the grid to search")
+    parser.add_argument("--folds", type=int, default=3)
+    parser.add_argument("--factor", type=int, default=3)
+    parser.add_argument("--min-resources", type=int, default=None,
+                        help="first rung's budget: training rows per fold (or trees for rf)")
+    parser.add_argument("--jobs", type=int, default=-1)
+    parser.add_argument("--store", default="rent_trials.sqlite", help="SQLite file recording every trial")
+    parser.add_argument("--cache-dir", default=".design_cache", help="folder for encoded design matrices")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    data = load_design_matrix(args.contracts, args.city_encoding, args.cache_dir)
+    print(f"design matrix: {data['X'].shape[0]} contracts x {data['X'].shape[1]} features "
+          f"({time.perf_counter() - start:.2f} s)")
+    store = TrialStore(args.store)
+    try:
+        for model in args.models:
+            start = time.perf_counter()
+            print(f"{model}:")
+            result = search(model, data, store, args.candidates, args.folds, args.factor, args.min_resources,
+                            args.jobs)
+            print(f"  best {result['params']}")
+            print(f"  CV RMSE {result['cv_rmse']:.2f}  test RMSE {result['test_rmse']:.2f}  "
+                  f"{result['run']} trials run, {result['reused']} reused ({time.perf_counter() - start:.1f} s)")
+    finally:
+        store.close()
+
+
+if __name__ == "__main__":
+    main()